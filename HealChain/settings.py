@@ -54,6 +54,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Evict in-process caches other workers have invalidated (HealthBridge/utils/invalidation.py)
+    'HealthBridge.utils.invalidation.InvalidationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -63,12 +65,19 @@ ROOT_URLCONF = 'HealChain.urls'
 # Django REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        # TokenAuthentication with an in-process token -> user cache
+        'HealthBridge.authentication.CachedTokenAuthentication',
+        # "Bearer <jwt>" access tokens verified against cached hospital public keys
+        'HealthBridge.authentication.SignedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
-    ]
+    ],
+    # Keyset (cursor) pagination on every list endpoint; ?page_size= up to API_MAX_PAGE_SIZE
+    'DEFAULT_PAGINATION_CLASS': 'HealthBridge.pagination.KeysetPagination',
 }
+API_PAGE_SIZE = int(os.environ.get("API_PAGE_SIZE", 50))
+API_MAX_PAGE_SIZE = int(os.environ.get("API_MAX_PAGE_SIZE", 500))
 
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
@@ -132,4 +141,81 @@ LOGIN_URL = '/accounts/login/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Append slash behavior
-APPEND_SLASH = True
\ No newline at end of file
+APPEND_SLASH = True
+
+# QR lookup cache (serialized patient cards, per process)
+QR_LOOKUP_CACHE_SIZE = int(os.environ.get("QR_LOOKUP_CACHE_SIZE", 2048))
+QR_LOOKUP_CACHE_TTL = int(os.environ.get("QR_LOOKUP_CACHE_TTL", 300))
+
+# Render patient QR images on a background thread after the Profile save commits
+QR_RENDER_ASYNC = os.environ.get("QR_RENDER_ASYNC", "True") == "True"
+
+# Hospital RSA keys: private PEMs live in HOSPITAL_KEYS_DIR, spare keys in HOSPITAL_KEYS_DIR/pool
+HOSPITAL_KEYS_DIR = os.environ.get("HOSPITAL_KEYS_DIR", "keys")
+# Peer hospitals' public PEMs (<hospital_id>.pem) for verifying signed QR codes while the database is down
+HOSPITAL_PUBLIC_KEYS_DIR = os.environ.get("HOSPITAL_PUBLIC_KEYS_DIR", "")
+KEY_POOL_TARGET = int(os.environ.get("KEY_POOL_TARGET", 20))
+KEY_POOL_LOW_WATER = int(os.environ.get("KEY_POOL_LOW_WATER", 5))
+KEY_POOL_AUTOFILL = os.environ.get("KEY_POOL_AUTOFILL", "True") == "True"
+
+# Caches. LocMem is per process; point this at a shared backend (e.g. Redis)
+# when running several workers so snapshots and their locks are shared.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "healchain",
+    }
+}
+
+# Authority dashboard snapshot: recompute at most every TTL seconds, or sooner
+# (but not more often than MIN_REFRESH) once a write has marked it stale.
+AUTHORITY_DASHBOARD_TTL = int(os.environ.get("AUTHORITY_DASHBOARD_TTL", 60))
+AUTHORITY_DASHBOARD_MIN_REFRESH = int(os.environ.get("AUTHORITY_DASHBOARD_MIN_REFRESH", 5))
+AUTHORITY_DASHBOARD_LOCK_TIMEOUT = int(os.environ.get("AUTHORITY_DASHBOARD_LOCK_TIMEOUT", 30))
+
+# Resolved caller roles/hospital for the permission classes, cached per token
+PRINCIPAL_CACHE_SIZE = int(os.environ.get("PRINCIPAL_CACHE_SIZE", 4096))
+PRINCIPAL_CACHE_TTL = int(os.environ.get("PRINCIPAL_CACHE_TTL", 60))
+
+# Token authentication cache (see HealthBridge/authentication.py)
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", 10000))
+TOKEN_CACHE_TTL = int(os.environ.get("TOKEN_CACHE_TTL", 300))
+
+# Signed access/refresh tokens (see HealthBridge/utils/tokens.py). Users with no
+# hospital are signed with the key of JWT_DEFAULT_ISSUER (a Hospital.hospital_id).
+JWT_ACCESS_TTL = int(os.environ.get("JWT_ACCESS_TTL", 300))
+JWT_REFRESH_TTL = int(os.environ.get("JWT_REFRESH_TTL", 86400))
+JWT_DEFAULT_ISSUER = os.environ.get("JWT_DEFAULT_ISSUER", "")
+PUBLIC_KEY_CACHE_TTL = int(os.environ.get("PUBLIC_KEY_CACHE_TTL", 3600))
+
+# Maximum number of signed QR codes accepted by one /api/qr-verify/ call
+SIGNED_QR_BATCH_LIMIT = int(os.environ.get("SIGNED_QR_BATCH_LIMIT", 500))
+
+# Federation change feed (see HealthBridge/utils/change_feed.py)
+CHANGE_FEED_PAGE_SIZE = int(os.environ.get("CHANGE_FEED_PAGE_SIZE", 500))
+CHANGE_FEED_MAX_PAGE_SIZE = int(os.environ.get("CHANGE_FEED_MAX_PAGE_SIZE", 5000))
+CHANGE_FEED_SETTLE_SECONDS = int(os.environ.get("CHANGE_FEED_SETTLE_SECONDS", 2))
+
+# Batched vitals ingestion (see HealthBridge/utils/vitals_ingest.py)
+VITALS_INGEST_BATCH_SIZE = int(os.environ.get("VITALS_INGEST_BATCH_SIZE", 1000))
+VITALS_INGEST_MAX_READINGS = int(os.environ.get("VITALS_INGEST_MAX_READINGS", 100000))
+VITALS_INGEST_MAX_ERRORS = int(os.environ.get("VITALS_INGEST_MAX_ERRORS", 100))
+VITALS_INGEST_MAX_SKEW_SECONDS = int(os.environ.get("VITALS_INGEST_MAX_SKEW_SECONDS", 300))
+
+# Most raw readings get_patient_vitals returns; use ?resolution=hour|day for longer ranges
+VITALS_RAW_MAX_POINTS = int(os.environ.get("VITALS_RAW_MAX_POINTS", 5000))
+
+# Cold-storage tiering (see HealthBridge/utils/archive.py): `manage.py archive_cold_data`
+# moves vitals and medical records older than these many days to Parquet under ARCHIVE_ROOT
+ARCHIVE_ROOT = os.environ.get("ARCHIVE_ROOT", os.path.join(BASE_DIR, "archive"))
+VITALS_HOT_DAYS = int(os.environ.get("VITALS_HOT_DAYS", 90))
+MEDICAL_RECORDS_HOT_DAYS = int(os.environ.get("MEDICAL_RECORDS_HOT_DAYS", 730))
+
+# Cross-process invalidation of in-process caches (see HealthBridge/utils/invalidation.py):
+# each worker reads the CacheInvalidation log at most every POLL_INTERVAL seconds
+INVALIDATION_POLL_INTERVAL = float(os.environ.get("INVALIDATION_POLL_INTERVAL", 1))
+INVALIDATION_OVERLAP = int(os.environ.get("INVALIDATION_OVERLAP", 10))
+INVALIDATION_RETENTION = int(os.environ.get("INVALIDATION_RETENTION", 86400))
+
+# Leaves the endpoint benchmarks out unless run with `manage.py test --tag benchmark`
+TEST_RUNNER = "HealthBridge.testing.TestRunner"
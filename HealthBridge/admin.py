@@ -10,6 +10,8 @@ from .models import (
     Hospital,
     HospitalAdminProfile,
     AuthorityProfile,
+    SymptomRule,
+    SymptomKeyword,
 )
 
 
@@ -97,4 +99,20 @@ class HospitalAdminProfileAdmin(admin.ModelAdmin):
 class AuthorityProfileAdmin(admin.ModelAdmin):
     list_display = ("user", "department", "designation")
     search_fields = ("user__username", "department", "designation")
-    list_filter = ("department", "designation")
\ No newline at end of file
+    list_filter = ("department", "designation")
+
+
+# ---------------------------
+# Symptom rules
+# ---------------------------
+class SymptomKeywordInline(admin.TabularInline):
+    model = SymptomKeyword
+    extra = 1
+
+
+@admin.register(SymptomRule)
+class SymptomRuleAdmin(admin.ModelAdmin):
+    list_display = ("title", "key", "urgency", "priority", "is_active")
+    search_fields = ("title", "key", "keywords__keyword")
+    list_filter = ("urgency", "is_active")
+    inlines = [SymptomKeywordInline]
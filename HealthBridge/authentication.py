@@ -0,0 +1,97 @@
+# HealthBridge/authentication.py
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, TokenAuthentication, get_authorization_header
+
+from .utils.cache import LRUCache
+from .utils.invalidation import publish, register
+from .utils.tokens import TokenError, user_from_claims, verify_token
+
+# token key -> the user's concrete field values
+token_cache = LRUCache(
+    maxsize=getattr(settings, "TOKEN_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "TOKEN_CACHE_TTL", 300),
+)
+
+
+def _evict_token(key):
+    token_cache.invalidate_tag(f"token:{key}")
+
+
+def _evict_user(user_id):
+    token_cache.invalidate_tag(f"user:{user_id}")
+
+
+def revoke_cached_token(key):
+    """Evict here at once, and in every other worker on its next invalidation poll."""
+    _evict_token(key)
+    publish("token", key)
+
+
+def revoke_cached_user(user_id):
+    _evict_user(user_id)
+    publish("user", user_id)
+
+
+register("token", _evict_token)
+register("user", _evict_user)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    DRF TokenAuthentication with an in-process LRU/TTL cache in front of the
+    Token + User join. Entries are revoked when the token is deleted (logout)
+    or the user is saved (password change, deactivation), see
+    HealthBridge/signals.py: at once in the worker that made the change, and
+    in the others within INVALIDATION_POLL_INTERVAL (utils/invalidation.py).
+
+    Every request gets a fresh User instance built from the cached field
+    values, so nothing mutable is shared between threads.
+    """
+
+    def authenticate_credentials(self, key):
+        user_model = get_user_model()
+        values = token_cache.get(key)
+        if values is None:
+            model = self.get_model()
+            try:
+                token = model.objects.select_related("user").get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_("Invalid token."))
+            if not token.user.is_active:
+                raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+
+            values = [getattr(token.user, field.attname) for field in user_model._meta.concrete_fields]
+            token_cache.set(key, values, tags=[f"token:{key}", f"user:{token.user_id}"])
+
+        user = user_model.from_db("default", [field.attname for field in user_model._meta.concrete_fields], values)
+        return user, self.get_model()(key=key, user=user)
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    Stateless authentication for `Authorization: Bearer <jwt>` access tokens
+    issued by CustomLoginView (see utils/tokens.py). Verification is a
+    signature check against the issuing hospital's cached public key; the
+    user and principal are rebuilt from the claims without any query.
+    `request.auth` is the claims dict.
+    """
+    keyword = "Bearer"
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_("Invalid bearer header."))
+        try:
+            claims = verify_token(auth[1].decode())
+        except (TokenError, UnicodeError) as exc:
+            raise exceptions.AuthenticationFailed(str(exc))
+        return user_from_claims(claims), claims
+
+    def authenticate_header(self, request):
+        return self.keyword
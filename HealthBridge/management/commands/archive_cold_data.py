@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from HealthBridge.utils.archive import archive_medical_records, archive_vitals, hot_cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        'Move vitals and medical records older than the hot window to Parquet files under ARCHIVE_ROOT '
+        '(partitioned by hospital and month). Rollups keep counting the moved rows; reads fall through '
+        'to the archive.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vitals-days', type=int, default=None,
+                            help='Days of vitals kept in the database (default: VITALS_HOT_DAYS)')
+        parser.add_argument('--records-days', type=int, default=None,
+                            help='Days of medical records kept in the database (default: MEDICAL_RECORDS_HOT_DAYS)')
+        parser.add_argument('--chunk-size', type=int, default=50000, help='Rows moved per file batch')
+        parser.add_argument('--skip-vitals', action='store_true')
+        parser.add_argument('--skip-records', action='store_true')
+
+    def handle(self, *args, **kwargs):
+        vitals_days = kwargs['vitals_days'] if kwargs['vitals_days'] is not None else settings.VITALS_HOT_DAYS
+        records_days = kwargs['records_days'] if kwargs['records_days'] is not None else settings.MEDICAL_RECORDS_HOT_DAYS
+        if vitals_days < 0 or records_days < 0 or kwargs['chunk_size'] <= 0:
+            raise CommandError('Hot windows must not be negative and --chunk-size must be positive')
+
+        if not kwargs['skip_vitals']:
+            started = time.perf_counter()
+            cutoff = hot_cutoff(vitals_days)
+            moved = archive_vitals(cutoff, chunk_size=kwargs['chunk_size'], stdout=self.stdout)
+            self.stdout.write(self.style.SUCCESS(
+                f'Archived {moved} vitals before {cutoff:%Y-%m-%d} in {time.perf_counter() - started:.1f}s'
+            ))
+        if not kwargs['skip_records']:
+            started = time.perf_counter()
+            cutoff = hot_cutoff(records_days)
+            moved = archive_medical_records(cutoff, chunk_size=kwargs['chunk_size'], stdout=self.stdout)
+            self.stdout.write(self.style.SUCCESS(
+                f'Archived {moved} medical records before {cutoff:%Y-%m-%d} in {time.perf_counter() - started:.1f}s'
+            ))
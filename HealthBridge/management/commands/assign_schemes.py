@@ -0,0 +1,62 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime, parse_date
+from HealthBridge.models import MedicalRecord, RecordTerm
+from HealthBridge.utils.schemes import reassign_schemes
+from HealthBridge.utils.terms import normalize_term
+
+
+class Command(BaseCommand):
+    help = 'Recompute eligible schemes for all (or filtered) medical records in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--hospital', help='Only records of this hospital_id')
+        parser.add_argument('--disease', help='Only records diagnosed with this disease')
+        parser.add_argument('--updated-since', help='Only records updated at or after this date/datetime')
+        parser.add_argument('--start-after', type=int, default=0, help='Skip records with id <= this value')
+        parser.add_argument('--checkpoint', help='File recording the last processed id; resumes from it if present')
+
+    def handle(self, *args, **kwargs):
+        queryset = MedicalRecord.objects.all()
+        if kwargs['hospital']:
+            queryset = queryset.filter(hospital__hospital_id=kwargs['hospital'])
+        if kwargs['disease']:
+            queryset = queryset.filter(id__in=RecordTerm.objects.filter(
+                kind=RecordTerm.DISEASE, term=normalize_term(kwargs['disease'])
+            ).values('record_id'))
+        if kwargs['updated_since']:
+            since = parse_datetime(kwargs['updated_since']) or parse_date(kwargs['updated_since'])
+            if since is None:
+                raise CommandError('--updated-since must be YYYY-MM-DD or an ISO datetime')
+            queryset = queryset.filter(updated_at__gte=since)
+
+        checkpoint = kwargs['checkpoint']
+        start_after = kwargs['start_after']
+        if checkpoint and os.path.exists(checkpoint):
+            with open(checkpoint, encoding='utf-8') as f:
+                start_after = max(start_after, int(f.read().strip() or 0))
+            self.stdout.write(f'Resuming after record {start_after}')
+
+        started = time.perf_counter()
+
+        def progress(done, total, last_id, added, removed):
+            if checkpoint:
+                with open(checkpoint, 'w', encoding='utf-8') as f:
+                    f.write(str(last_id))
+            rate = done / max(time.perf_counter() - started, 1e-9)
+            self.stdout.write(
+                f'{done}/{total} records ({done * 100 // max(total, 1)}%), '
+                f'+{added} -{removed} links, {rate:.0f} records/s'
+            )
+
+        records, added, removed = reassign_schemes(
+            queryset, chunk_size=kwargs['chunk_size'], start_after=start_after, progress=progress
+        )
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f'Re-evaluated {records} records: {added} scheme links added, {removed} removed'
+        ))
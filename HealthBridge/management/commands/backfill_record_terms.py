@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from HealthBridge.utils.terms import backfill_record_terms
+
+
+class Command(BaseCommand):
+    help = 'Build the normalized disease/symptom index (RecordTerm) for existing medical records'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **kwargs):
+        records, added, removed = backfill_record_terms(kwargs['chunk_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {records} records: {added} terms added, {removed} removed'
+        ))
@@ -0,0 +1,138 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from HealthBridge.models import Consent, Hospital, MedicalRecord, Profile, Vital
+from HealthBridge.utils.change_feed import read_feed
+
+DISEASES = ["diabetes", "hypertension", "asthma", "malaria", "dengue", "tuberculosis"]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Two-node change-feed benchmark: node B pulls medical records and vitals '
+        'from this database (node A) into an in-memory replica, for growing backlogs. '
+        'Everything runs in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backlog', type=int, nargs='+', default=[1000, 10000, 50000],
+                            help='Rows per feed to sync at each step')
+        parser.add_argument('--page-size', type=int, default=500)
+        parser.add_argument('--patients-per-1000', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **kwargs):
+        try:
+            with transaction.atomic(), override_settings(CHANGE_FEED_SETTLE_SECONDS=0):
+                self._run(kwargs)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, options):
+        rng = random.Random(options['seed'])
+        suffix = f"{rng.getrandbits(32):08x}"
+        # bulk_create skips post_save, so no keys are provisioned for the benchmark nodes
+        node_a, node_b = Hospital.objects.bulk_create([
+            Hospital(hospital_id=f"BENCH-A-{suffix}", name=f"Bench node A {suffix}", region="bench"),
+            Hospital(hospital_id=f"BENCH-B-{suffix}", name=f"Bench node B {suffix}", region="bench"),
+        ])
+        replica = {"medical_records": {}, "vitals": {}}
+        cursors = {"medical_records": None, "vitals": None}
+        patients = []
+        created = 0
+
+        self.stdout.write(
+            f"{'backlog':>8} {'pulled':>8} {'pages':>6} {'rows/s':>9} "
+            f"{'page ms p50':>12} {'page ms max':>12} {'delta 1% ms':>12}"
+        )
+        for backlog in options['backlog']:
+            # Grow node A to `backlog` rows per feed; ~10% of patients have no consent
+            patients += self._add_patients(node_a, node_b, suffix, len(patients),
+                                           backlog * options['patients_per_1000'] // 1000 - len(patients), rng)
+            self._add_rows(node_a, patients, backlog - created, rng)
+            created = backlog
+
+            pulled, pages, elapsed, page_ms = self._sync(node_b, replica, cursors, options['page_size'])
+
+            # Touch 1% of the records and measure the incremental pull
+            ids = list(MedicalRecord.objects.filter(hospital=node_a).values_list("id", flat=True))
+            touched = rng.sample(ids, max(1, len(ids) // 100))
+            MedicalRecord.objects.filter(id__in=touched).update(updated_at=timezone.now())
+            _, _, delta_elapsed, _ = self._sync(node_b, replica, cursors, options['page_size'])
+
+            self.stdout.write(
+                f"{backlog:>8} {pulled:>8} {pages:>6} {pulled / elapsed if elapsed else 0:>9.0f} "
+                f"{statistics.median(page_ms):>12.1f} {max(page_ms):>12.1f} "
+                f"{delta_elapsed * 1000:>12.1f}"
+            )
+
+        self.stdout.write(
+            f"replica: {len(replica['medical_records'])} medical records, {len(replica['vitals'])} vitals"
+        )
+
+    def _add_patients(self, node_a, node_b, suffix, start, count, rng):
+        if count <= 0:
+            return []
+        users = User.objects.bulk_create([
+            User(username=f"bench-feed-{suffix}-{start + i}") for i in range(count)
+        ])
+        profiles = Profile.objects.bulk_create([
+            Profile(user=user, migrant_id=f"BF-{suffix}-{start + i}", age=rng.randint(18, 80),
+                    gender=rng.choice("MF"), location="bench", home_hospital=node_a)
+            for i, user in enumerate(users)
+        ])
+        expires = timezone.now() + timedelta(days=30)
+        Consent.objects.bulk_create([
+            Consent(patient=profile, from_hospital=node_a, to_hospital=node_b, purpose="treatment",
+                    expires_at=expires, approved_by_patient=True, approved_by_to_hospital=True)
+            for profile in profiles if rng.random() < 0.9
+        ])
+        return profiles
+
+    def _add_rows(self, node_a, patients, count, rng):
+        if count <= 0:
+            return
+        for offset in range(0, count, 5000):
+            size = min(5000, count - offset)
+            MedicalRecord.objects.bulk_create([
+                MedicalRecord(patient=rng.choice(patients), hospital=node_a,
+                              recurring_diseases=rng.choice(DISEASES), current_symptoms="fever")
+                for _ in range(size)
+            ])
+            Vital.objects.bulk_create([
+                Vital(patient=rng.choice(patients), hospital=node_a, temperature=round(rng.uniform(36, 40), 1),
+                      blood_pressure=f"{rng.randint(100, 160)}/{rng.randint(60, 100)}", heart_rate=rng.randint(55, 120))
+                for _ in range(size)
+            ])
+
+    def _sync(self, node_b, replica, cursors, page_size):
+        """Pull every feed until caught up; node B applies each page to its replica."""
+        pulled = pages = 0
+        page_ms = []
+        started = time.perf_counter()
+        for feed in replica:
+            while True:
+                page_started = time.perf_counter()
+                page = read_feed(feed, node_b.pk, cursors[feed], page_size)
+                page_ms.append((time.perf_counter() - page_started) * 1000)
+                for row in page["results"]:
+                    replica[feed][row["id"]] = row
+                cursors[feed] = page["next_cursor"]
+                pulled += len(page["results"])
+                pages += 1
+                if not page["has_more"]:
+                    break
+        return pulled, pages, time.perf_counter() - started, page_ms
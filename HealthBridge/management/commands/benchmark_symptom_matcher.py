@@ -0,0 +1,64 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from HealthBridge.utils.symptom_matcher import SymptomMatcher, normalize_text
+
+SAMPLE_TEXTS = [
+    "I have fever and a bad cough since two days, feeling very tired",
+    "enikku pani und, thalavedana and chuma at night",
+    "mujhe bukhar hai aur sir dard, ulti bhi ho rahi hai",
+    "നെഞ്ചുവേദന and breathing problem after work",
+    "stomach pain after lunch, nausea in the evening",
+]
+
+
+def _synthetic_rules(count, keywords_per_rule, rng):
+    rules, keywords = [], []
+    for rule_id in range(count):
+        rules.append({
+            "id": rule_id, "key": f"rule-{rule_id}", "title": f"Rule {rule_id}",
+            "description": "", "priority": rng.randint(0, 1000), "urgency": "routine",
+        })
+        for _ in range(keywords_per_rule):
+            keywords.append((rule_id, "".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 12)))))
+    return rules, keywords
+
+
+class Command(BaseCommand):
+    help = 'Measure per-request symptom matching cost as the number of rules grows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rules', type=int, nargs='+', default=[10, 100, 1000, 10000])
+        parser.add_argument('--keywords-per-rule', type=int, default=6)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **kwargs):
+        rng = random.Random(kwargs['seed'])
+        texts = [rng.choice(SAMPLE_TEXTS) for _ in range(kwargs['requests'])]
+        self.stdout.write(f"{'rules':>8} {'keywords':>9} {'compile ms':>11} {'automaton us/req':>17} {'naive us/req':>13}")
+        for count in kwargs['rules']:
+            rules, keywords = _synthetic_rules(count, kwargs['keywords_per_rule'], rng)
+
+            started = time.perf_counter()
+            matcher = SymptomMatcher(rules, keywords)
+            compile_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            for text in texts:
+                matcher.match(text)
+            automaton_us = (time.perf_counter() - started) / len(texts) * 1e6
+
+            # The previous approach: one substring test per keyword
+            normalized = [normalize_text(keyword) for _, keyword in keywords]
+            started = time.perf_counter()
+            for text in texts:
+                text = normalize_text(text)
+                [keyword for keyword in normalized if keyword in text]
+            naive_us = (time.perf_counter() - started) / len(texts) * 1e6
+
+            self.stdout.write(
+                f"{count:>8} {len(keywords):>9} {compile_ms:>11.1f} {automaton_us:>17.1f} {naive_us:>13.1f}"
+            )
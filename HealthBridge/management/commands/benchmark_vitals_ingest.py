@@ -0,0 +1,98 @@
+import json
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from HealthBridge.models import Profile
+from HealthBridge.utils.synthetic import seed_dataset
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Sustained throughput of /api/vitals/ingest/: a device account posts batches of readings as a '
+        'JSON array and as NDJSON, for each transaction batch size. Everything runs in a transaction '
+        'that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=5000)
+        parser.add_argument('--readings', type=int, default=10000, help='Readings per request')
+        parser.add_argument('--requests', type=int, default=10, help='Requests per configuration')
+        parser.add_argument('--batch-size', type=int, nargs='+', default=[500, 1000, 5000])
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **kwargs):
+        try:
+            with transaction.atomic(), override_settings(ALLOWED_HOSTS=["*"]):
+                self._run(kwargs)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, options):
+        rng = random.Random(options['seed'])
+        suffix = f"{rng.getrandbits(32):08x}"
+        dataset = seed_dataset(options['patients'], seed=options['seed'], prefix=f"bench-ingest-{suffix}",
+                               records_per_patient=0, vitals_per_patient=0, consent_rate=0)
+        client = APIClient()
+        doctor = dataset["doctors"][0]
+        client.force_authenticate(doctor.user)
+        # Only the doctor's own hospital may write a patient's vitals
+        patients = list(Profile.objects.filter(migrant_id__startswith=f"BENCH-INGEST-{suffix.upper()}",
+                                               home_hospital_id=doctor.hospital_id).values_list("id", flat=True))
+
+        self.stdout.write(
+            f"{'format':>7} {'batch':>6} {'readings':>9} {'readings/s':>11} "
+            f"{'request ms p50':>15} {'request ms max':>15} {'queries/req':>12}"
+        )
+        for batch_size in options['batch_size']:
+            for fmt in ("json", "ndjson"):
+                with override_settings(VITALS_INGEST_BATCH_SIZE=batch_size):
+                    self._measure(client, fmt, batch_size, patients, options, rng)
+
+    def _payload(self, fmt, patients, count, rng):
+        now = timezone.now()
+        readings = [
+            {
+                "patient": rng.choice(patients),
+                "timestamp": (now - timedelta(seconds=rng.randint(0, 86400))).isoformat(),
+                "temperature": round(rng.uniform(36.0, 39.5), 1),
+                "blood_pressure": f"{rng.randint(100, 160)}/{rng.randint(60, 99)}",
+                "heart_rate": rng.randint(55, 120),
+            }
+            for _ in range(count)
+        ]
+        if fmt == "json":
+            return json.dumps(readings).encode(), "application/json"
+        return b"\n".join(json.dumps(reading).encode() for reading in readings), "application/x-ndjson"
+
+    def _measure(self, client, fmt, batch_size, patients, options, rng):
+        request_ms, queries, accepted, elapsed = [], 0, 0, 0.0
+        for _ in range(options['requests']):
+            body, content_type = self._payload(fmt, patients, options['readings'], rng)
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.generic("POST", "/api/vitals/ingest/", body, content_type=content_type)
+                took = time.perf_counter() - started
+            if response.status_code != 201:
+                raise RuntimeError(f"Ingest failed: {response.status_code} {response.data}")
+            elapsed += took
+            request_ms.append(took * 1000)
+            accepted += response.data["accepted"]
+            queries = max(queries, len(captured.captured_queries))
+
+        self.stdout.write(
+            f"{fmt:>7} {batch_size:>6} {accepted:>9} {accepted / elapsed:>11.0f} "
+            f"{statistics.median(request_ms):>15.1f} {max(request_ms):>15.1f} {queries:>12}"
+        )
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from HealthBridge.models import Profile
+from HealthBridge.utils.recommendation_engine import CohortRecommendationEngine
+
+
+class Command(BaseCommand):
+    help = 'Evaluate cohort recommendation rules for all profiles in bulk and store the results'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--hospital', help='Only profiles whose home hospital has this hospital_id')
+
+    def handle(self, *args, **kwargs):
+        queryset = Profile.objects.all()
+        if kwargs['hospital']:
+            queryset = queryset.filter(home_hospital__hospital_id=kwargs['hospital'])
+
+        started = time.perf_counter()
+
+        def progress(profiles, written, removed):
+            rate = profiles / max(time.perf_counter() - started, 1e-9)
+            self.stdout.write(f'{profiles} profiles evaluated, {written} written, {removed} removed ({rate:.0f} profiles/s)')
+
+        engine = CohortRecommendationEngine(chunk_size=kwargs['chunk_size'])
+        profiles, written, removed = engine.run(queryset, progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Evaluated {profiles} profiles: {written} recommendations written, {removed} removed'
+        ))
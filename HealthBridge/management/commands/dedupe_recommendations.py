@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from HealthBridge.models import Recommendation
+from HealthBridge.utils.dashboard import mark_dashboard_stale
+
+
+class Command(BaseCommand):
+    help = 'Merge duplicate rule-generated recommendations and tag the survivors with their rule_key'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Medical records per batch')
+
+    def handle(self, *args, **kwargs):
+        rule_by_title = {title: key for key, title, _, _ in Recommendation.RECORD_RULES}
+        generated = Recommendation.objects.filter(
+            medical_record__isnull=False, title__in=rule_by_title.keys()
+        )
+        record_ids = list(
+            generated.filter(rule_key__isnull=True).values_list('medical_record_id', flat=True).distinct().order_by()
+        )
+
+        merged = tagged = 0
+        chunk_size = kwargs['chunk_size']
+        for start in range(0, len(record_ids), chunk_size):
+            chunk = record_ids[start:start + chunk_size]
+            groups = {}
+            for rec in generated.filter(medical_record_id__in=chunk).order_by('id').only(
+                'id', 'medical_record_id', 'title', 'rule_key', 'read_by_patient'
+            ):
+                groups.setdefault((rec.medical_record_id, rule_by_title[rec.title]), []).append(rec)
+
+            keep, drop = [], []
+            for (_, rule_key), recs in groups.items():
+                # Prefer the row already keyed by the rule, otherwise the oldest one
+                survivor = next((rec for rec in recs if rec.rule_key == rule_key), recs[0])
+                duplicates = [rec for rec in recs if rec is not survivor]
+                if survivor.rule_key != rule_key:
+                    tagged += 1
+                survivor.rule_key = rule_key
+                survivor.read_by_patient = any(rec.read_by_patient for rec in recs)
+                keep.append(survivor)
+                drop.extend(rec.pk for rec in duplicates)
+
+            with transaction.atomic():
+                Recommendation.objects.filter(pk__in=drop).delete()
+                Recommendation.objects.bulk_update(keep, ['rule_key', 'read_by_patient'], batch_size=chunk_size)
+            merged += len(drop)
+            self.stdout.write(f'{min(start + chunk_size, len(record_ids))}/{len(record_ids)} records processed')
+
+        if merged or tagged:
+            mark_dashboard_stale()
+        self.stdout.write(self.style.SUCCESS(f'Removed {merged} duplicate recommendations; tagged {tagged} with a rule key'))
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from HealthBridge.utils.keys import fill_key_pool, key_pool_size
+
+
+class Command(BaseCommand):
+    help = 'Pre-generate RSA key pairs so new hospitals can be created without waiting on key generation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=None,
+                            help='Number of keys the pool should hold (default: KEY_POOL_TARGET)')
+
+    def handle(self, *args, **kwargs):
+        target = kwargs['size'] if kwargs['size'] is not None else settings.KEY_POOL_TARGET
+        added = fill_key_pool(target)
+        self.stdout.write(self.style.SUCCESS(f'Added {added} keys; {key_pool_size()} keys available in pool'))
@@ -0,0 +1,46 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from HealthBridge.models import Profile
+from HealthBridge.utils.qr import qr_content_path, qr_payload
+
+
+def _walk(storage, path):
+    dirs, files = storage.listdir(path)
+    for name in files:
+        yield f"{path}/{name}"
+    for name in dirs:
+        yield from _walk(storage, f"{path}/{name}")
+
+
+class Command(BaseCommand):
+    help = 'Delete QR files under media/qr_codes/ that no profile references or can be served from'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='List orphaned files without deleting them')
+
+    def handle(self, *args, **kwargs):
+        live = set()
+        profiles = Profile.objects.only("awaz_id", "migrant_id", "qr_code_uuid", "qr_code_image")
+        for profile in profiles.iterator():
+            if profile.qr_code_image:
+                live.add(profile.qr_code_image.name)
+            payload = qr_payload(profile)
+            live.add(qr_content_path(payload, "png"))
+            live.add(qr_content_path(payload, "svg"))
+
+        if not default_storage.exists("qr_codes"):
+            self.stdout.write("No QR files found")
+            return
+
+        removed = 0
+        for path in _walk(default_storage, "qr_codes"):
+            if path in live:
+                continue
+            removed += 1
+            if kwargs["dry_run"]:
+                self.stdout.write(path)
+            else:
+                default_storage.delete(path)
+
+        verb = "Would delete" if kwargs["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f'{verb} {removed} orphaned QR files'))
@@ -1,27 +1,65 @@
-from django.core.management.base import BaseCommand
-from HealthBridge.models import Profile, MedicalRecord
-import random
-from faker import Faker
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from HealthBridge.utils.synthetic import SyntheticDataset
 
-fake = Faker()
 
 class Command(BaseCommand):
-    help = 'Generate test data'
+    help = (
+        'Generate a reproducible synthetic dataset: hospitals, doctors, schemes and N patients with '
+        'users, profiles, medical records, vitals, recommendations and consents. Rows are inserted in '
+        'chunks without signals; pass --derived for the indexes and rollups, run render_qr_codes for QR images.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Same seed and chunk size give the same data')
+        parser.add_argument('--prefix', default='syn',
+                            help='Prefix for usernames, hospital and migrant ids; must be new to this database')
+        parser.add_argument('--hospitals', type=int, default=None,
+                            help='Default: one per 500 patients (2-200)')
+        parser.add_argument('--records-per-patient', type=int, default=2)
+        parser.add_argument('--vitals-per-patient', type=int, default=3)
+        parser.add_argument('--consent-rate', type=float, default=0.2)
+        parser.add_argument('--password', default=None,
+                            help='Login password for every generated user (default: unusable)')
+        parser.add_argument('--chunk-size', type=int, default=10000)
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Processes writing chunks in parallel (SQLite serializes the writes)')
+        parser.add_argument('--derived', action='store_true',
+                            help='Build the RecordTerm index, outbreak rollup and vital rollups afterwards')
 
     def handle(self, *args, **kwargs):
-        for _ in range(10):
-            profile = Profile.objects.create(
-                name=fake.name(),
-                age=random.randint(18, 70),
-                gender=random.choice(['Male', 'Female']),
-                location=fake.city(),
-                language=random.choice(['Hindi', 'Malayalam']),
-                blood_group=random.choice(['A+', 'B+', 'O-', 'AB+']),
-                migrant_id=f"AWZ{random.randint(100000,999999)}"
-            )
-            MedicalRecord.objects.create(
-                title="Test Treatment",
-                description="Simulated fever and fatigue",
-                patient=profile
-            )
-        self.stdout.write(self.style.SUCCESS('Test data created successfully'))
\ No newline at end of file
+        if kwargs['patients'] <= 0 or kwargs['chunk_size'] <= 0:
+            raise CommandError('--patients and --chunk-size must be positive')
+
+        dataset = SyntheticDataset(
+            kwargs['patients'],
+            seed=kwargs['seed'],
+            prefix=kwargs['prefix'],
+            records_per_patient=kwargs['records_per_patient'],
+            vitals_per_patient=kwargs['vitals_per_patient'],
+            consent_rate=kwargs['consent_rate'],
+            hospitals=kwargs['hospitals'],
+            password=kwargs['password'],
+        )
+        started = time.perf_counter()
+        dataset.prepare()
+
+        def progress(done):
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'{done}/{kwargs["patients"]} patients ({elapsed:.1f}s)')
+
+        dataset.run(chunk_size=kwargs['chunk_size'], workers=kwargs['workers'], progress=progress)
+        elapsed = time.perf_counter() - started
+        rows = dataset.rows
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {rows} rows for {kwargs["patients"]} patients in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s)'
+        ))
+
+        if kwargs['derived']:
+            call_command('backfill_record_terms', stdout=self.stdout)
+            call_command('rebuild_outbreak_rollup', stdout=self.stdout)
+            call_command('rebuild_vital_rollups', stdout=self.stdout)
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from HealthBridge.utils.outbreak import rebuild_outbreak_rollup
+
+
+class Command(BaseCommand):
+    help = 'Recompute the region x disease x day outbreak rollup from the RecordTerm index and its archive'
+
+    def handle(self, *args, **kwargs):
+        buckets = rebuild_outbreak_rollup()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt outbreak rollup: {buckets} buckets'))
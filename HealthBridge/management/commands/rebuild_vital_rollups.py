@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from HealthBridge.utils.vital_rollups import rebuild_vital_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the hourly and daily vital rollups (min/max/avg per patient) from the Vital table and its archive'
+
+    def handle(self, *args, **kwargs):
+        hours, days = rebuild_vital_rollups()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt vital rollups: {hours} hour and {days} day buckets'))
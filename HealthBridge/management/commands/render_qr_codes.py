@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from HealthBridge.models import Profile
+from HealthBridge.utils.qr import needs_qr_render, qr_payload, render_profile_qr
+
+
+class Command(BaseCommand):
+    help = 'Render QR images for profiles whose image is missing or encodes an outdated payload'
+
+    def handle(self, *args, **kwargs):
+        rendered = 0
+        profiles = Profile.objects.only("id", "awaz_id", "migrant_id", "qr_code_uuid", "qr_code_image", "qr_code_payload")
+        for profile in profiles.iterator():
+            if needs_qr_render(profile) and render_profile_qr(profile.pk, qr_payload(profile)):
+                rendered += 1
+        self.stdout.write(self.style.SUCCESS(f'Rendered {rendered} QR codes'))
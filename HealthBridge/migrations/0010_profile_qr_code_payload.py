@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HealthBridge', '0009_profile_emergency_contact_name_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='qr_code_payload',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
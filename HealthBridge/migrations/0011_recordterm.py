@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HealthBridge', '0010_profile_qr_code_payload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('disease', 'Disease'), ('symptom', 'Symptom')], max_length=10)),
+                ('term', models.CharField(max_length=100)),
+                ('record', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='HealthBridge.medicalrecord')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'term'], name='HealthBridg_kind_f1a5be_idx')],
+                'constraints': [models.UniqueConstraint(fields=('record', 'kind', 'term'), name='unique_record_term')],
+            },
+        ),
+    ]
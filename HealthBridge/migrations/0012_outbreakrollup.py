@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HealthBridge', '0011_recordterm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recordterm',
+            name='day',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='recordterm',
+            name='region',
+            field=models.CharField(blank=True, default='', max_length=120),
+        ),
+        migrations.CreateModel(
+            name='OutbreakRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(blank=True, default='', max_length=120)),
+                ('disease', models.CharField(max_length=100)),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='HealthBridg_day_25a6e4_idx'), models.Index(fields=['disease', 'day'], name='HealthBridg_disease_701b11_idx')],
+                'constraints': [models.UniqueConstraint(fields=('region', 'disease', 'day'), name='unique_outbreak_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HealthBridge', '0012_outbreakrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutbreakAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(blank=True, default='', max_length=120)),
+                ('disease', models.CharField(max_length=100)),
+                ('day', models.DateField()),
+                ('method', models.CharField(choices=[('zscore', 'Rolling z-score'), ('ewma', 'EWMA'), ('seasonal', 'Weekly seasonal residual')], max_length=10)),
+                ('observed', models.PositiveIntegerField()),
+                ('expected', models.FloatField()),
+                ('score', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='HealthBridg_day_1df48e_idx')],
+                'constraints': [models.UniqueConstraint(fields=('region', 'disease', 'day', 'method'), name='unique_outbreak_alert')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HealthBridge', '0013_outbreakalert'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recommendation',
+            name='rule_key',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='recommendation',
+            constraint=models.UniqueConstraint(fields=('medical_record', 'rule_key'), name='unique_record_rule'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HealthBridge', '0014_recommendation_rule_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SymptomRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.SlugField(unique=True)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('priority', models.IntegerField(default=100)),
+                ('urgency', models.CharField(choices=[('routine', 'Routine'), ('soon', 'See a doctor soon'), ('urgent', 'Urgent')], default='routine', max_length=10)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SymptomKeyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language', models.CharField(default='English', max_length=50)),
+                ('keyword', models.CharField(max_length=100)),
+                ('rule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='keywords', to='HealthBridge.symptomrule')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('rule', 'language', 'keyword'), name='unique_symptom_keyword')],
+            },
+        ),
+    ]
@@ -0,0 +1,124 @@
+from django.db import migrations
+
+# The rules previously hard-coded in ai_symptom_recommendations, with
+# Malayalam and Hindi synonyms (native script and common transliterations).
+RULES = [
+    {
+        "key": "chest-pain",
+        "title": "Chest Pain - URGENT",
+        "description": "Chest pain can be serious. Please visit a doctor or emergency room immediately.",
+        "priority": 1000,
+        "urgency": "urgent",
+        "keywords": {
+            "English": ["chest"],
+            "Malayalam": ["നെഞ്ചുവേദന", "നെഞ്ച്", "nenju vedana", "nenjuvedana"],
+            "Hindi": ["सीने में दर्द", "छाती", "seene mein dard", "chhati"],
+        },
+    },
+    {
+        "key": "fever",
+        "title": "Fever Alert",
+        "description": "Take rest, drink plenty of fluids, and consult a doctor if temperature exceeds 103°F or persists beyond 3 days.",
+        "priority": 200,
+        "urgency": "soon",
+        "keywords": {
+            "English": ["fever"],
+            "Malayalam": ["പനി", "pani"],
+            "Hindi": ["बुखार", "bukhar", "bukhaar"],
+        },
+    },
+    {
+        "key": "respiratory",
+        "title": "Respiratory Care",
+        "description": "Persistent cough may indicate respiratory issues. Steam inhalation helps. See a doctor if coughing blood.",
+        "priority": 150,
+        "urgency": "routine",
+        "keywords": {
+            "English": ["cough"],
+            "Malayalam": ["ചുമ", "chuma"],
+            "Hindi": ["खांसी", "खाँसी", "khansi", "khaansi"],
+        },
+    },
+    {
+        "key": "cold",
+        "title": "Cold Relief",
+        "description": "Rest, stay warm, drink warm fluids. Vitamin C helps. Usually resolves in 7-10 days.",
+        "priority": 100,
+        "urgency": "routine",
+        "keywords": {
+            "English": ["cold"],
+            "Malayalam": ["ജലദോഷം", "jaladosham"],
+            "Hindi": ["जुकाम", "zukam", "jukam"],
+        },
+    },
+    {
+        "key": "fatigue",
+        "title": "Energy & Nutrition",
+        "description": "Fatigue can be linked to poor nutrition or stress. Eat iron-rich foods and get 8 hours of sleep.",
+        "priority": 100,
+        "urgency": "routine",
+        "keywords": {
+            "English": ["fatigue", "tired"],
+            "Malayalam": ["ക്ഷീണം", "ksheenam"],
+            "Hindi": ["थकान", "thakan", "thakaan"],
+        },
+    },
+    {
+        "key": "headache",
+        "title": "Headache Care",
+        "description": "Stay hydrated, rest in a dark room. If severe or sudden, seek immediate medical attention.",
+        "priority": 100,
+        "urgency": "routine",
+        "keywords": {
+            "English": ["headache"],
+            "Malayalam": ["തലവേദന", "thalavedana", "thala vedana"],
+            "Hindi": ["सिरदर्द", "सिर दर्द", "sirdard", "sir dard"],
+        },
+    },
+    {
+        "key": "digestive",
+        "title": "Digestive Care",
+        "description": "Stick to light foods, stay hydrated with ORS if vomiting. See doctor if pain is severe.",
+        "priority": 120,
+        "urgency": "routine",
+        "keywords": {
+            "English": ["stomach", "vomit", "nausea"],
+            "Malayalam": ["വയറുവേദന", "ഛർദ്ദി", "vayaru vedana", "chardi"],
+            "Hindi": ["पेट दर्द", "उल्टी", "pet dard", "ulti"],
+        },
+    },
+]
+
+
+def seed_rules(apps, schema_editor):
+    SymptomRule = apps.get_model("HealthBridge", "SymptomRule")
+    SymptomKeyword = apps.get_model("HealthBridge", "SymptomKeyword")
+    for data in RULES:
+        rule, _ = SymptomRule.objects.get_or_create(
+            key=data["key"],
+            defaults={
+                "title": data["title"],
+                "description": data["description"],
+                "priority": data["priority"],
+                "urgency": data["urgency"],
+            },
+        )
+        for language, keywords in data["keywords"].items():
+            for keyword in keywords:
+                SymptomKeyword.objects.get_or_create(rule=rule, language=language, keyword=keyword)
+
+
+def unseed_rules(apps, schema_editor):
+    SymptomRule = apps.get_model("HealthBridge", "SymptomRule")
+    SymptomRule.objects.filter(key__in=[data["key"] for data in RULES]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HealthBridge', '0015_symptomrule'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_rules, unseed_rules),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:50
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HealthBridge', '0016_seed_symptom_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CohortRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rule_key', models.CharField(max_length=50)),
+                ('message', models.CharField(max_length=255)),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cohort_recommendations', to='HealthBridge.profile')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('patient', 'rule_key'), name='unique_cohort_recommendation')],
+            },
+        ),
+    ]
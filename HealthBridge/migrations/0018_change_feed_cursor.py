@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HealthBridge', '0017_cohortrecommendation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='recommendation',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='vital',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='medicalrecord',
+            index=models.Index(fields=['updated_at', 'id'], name='HealthBridg_updated_d6bbc9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['updated_at', 'id'], name='HealthBridg_updated_d2aacc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recommendation',
+            index=models.Index(fields=['updated_at', 'id'], name='HealthBridg_updated_22a209_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vital',
+            index=models.Index(fields=['updated_at', 'id'], name='HealthBridg_updated_ef03d4_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:41
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HealthBridge', '0018_change_feed_cursor'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='vital',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='vital',
+            index=models.Index(fields=['patient', 'timestamp'], name='HealthBridg_patient_1347a9_idx'),
+        ),
+    ]
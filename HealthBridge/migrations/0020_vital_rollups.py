@@ -0,0 +1,79 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:52
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Same rule as HealthBridge.utils.vital_rollups.parse_blood_pressure
+BLOOD_PRESSURE_RE = re.compile(r"(\d{2,3})\s*/\s*(\d{2,3})")
+
+
+def parse_blood_pressure(text):
+    match = BLOOD_PRESSURE_RE.search(text or "")
+    if match is None or not int(match.group(1)) > int(match.group(2)) > 0:
+        return None, None
+    return int(match.group(1)), int(match.group(2))
+
+
+def parse_existing_blood_pressure(apps, schema_editor):
+    Vital = apps.get_model("HealthBridge", "Vital")
+    batch = []
+    for vital in Vital.objects.exclude(blood_pressure=None).only("id", "blood_pressure").iterator(chunk_size=2000):
+        vital.systolic, vital.diastolic = parse_blood_pressure(vital.blood_pressure)
+        if vital.systolic is not None:
+            batch.append(vital)
+        if len(batch) >= 2000:
+            Vital.objects.bulk_update(batch, ["systolic", "diastolic"])
+            batch = []
+    Vital.objects.bulk_update(batch, ["systolic", "diastolic"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HealthBridge', '0019_vital_reading_timestamp'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vital',
+            name='diastolic',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='vital',
+            name='systolic',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='VitalRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('temperature_count', models.PositiveIntegerField(default=0)),
+                ('temperature_min', models.FloatField(null=True)),
+                ('temperature_max', models.FloatField(null=True)),
+                ('temperature_sum', models.FloatField(default=0)),
+                ('heart_rate_count', models.PositiveIntegerField(default=0)),
+                ('heart_rate_min', models.FloatField(null=True)),
+                ('heart_rate_max', models.FloatField(null=True)),
+                ('heart_rate_sum', models.FloatField(default=0)),
+                ('systolic_count', models.PositiveIntegerField(default=0)),
+                ('systolic_min', models.FloatField(null=True)),
+                ('systolic_max', models.FloatField(null=True)),
+                ('systolic_sum', models.FloatField(default=0)),
+                ('diastolic_count', models.PositiveIntegerField(default=0)),
+                ('diastolic_min', models.FloatField(null=True)),
+                ('diastolic_max', models.FloatField(null=True)),
+                ('diastolic_sum', models.FloatField(default=0)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vital_rollups', to='HealthBridge.profile')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('patient', 'resolution', 'bucket'), name='unique_vital_rollup')],
+            },
+        ),
+        migrations.RunPython(parse_existing_blood_pressure, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HealthBridge', '0020_vital_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPartition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=20)),
+                ('hospital', models.CharField(max_length=20)),
+                ('month', models.CharField(max_length=7)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_partitions', to='HealthBridge.profile')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('table', 'patient', 'hospital', 'month'), name='unique_archived_partition')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HealthBridge', '0023_token_sessions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('delete', 'Row deleted'), ('revoke', 'Consent revoked'), ('grant', 'Consent granted')], max_length=10)),
+                ('patient_id', models.IntegerField()),
+                ('from_hospital_id', models.IntegerField(blank=True, null=True)),
+                ('feed', models.CharField(blank=True, max_length=30)),
+                ('object_id', models.IntegerField(blank=True, null=True)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('hospital', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_events', to='HealthBridge.hospital')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hospital', 'updated_at', 'id'], name='HealthBridg_hospita_78771d_idx')],
+            },
+        ),
+    ]
@@ -1,10 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
-from django.core.files.base import ContentFile
-from io import BytesIO
 import uuid
-import qrcode
 
 # -------------------------------
 # Hospital (tenant) model
@@ -30,9 +27,6 @@ class Hospital(models.Model):
 # Profile model
 # -------------------------------
 import uuid
-import qrcode
-from io import BytesIO
-from django.core.files.base import ContentFile
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -89,35 +83,23 @@ class Profile(models.Model):
     qr_code_uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     qr_code_image = models.ImageField(upload_to='qr_codes/', blank=True, null=True)
 
+    # Payload currently encoded in qr_code_image; the renderer skips work when unchanged
+    qr_code_payload = models.CharField(max_length=64, blank=True, default="")
+
+    # Change-feed position for federated sync (see utils/change_feed.py)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["updated_at", "id"]),
+        ]
+
     def save(self, *args, **kwargs):
-        # Ensure a UUID exists
+        # Ensure a UUID exists. The QR image itself is rendered in the background
+        # (see HealthBridge/utils/qr.py) once the save has committed.
         if not self.qr_code_uuid:
             self.qr_code_uuid = uuid.uuid4()
 
-        # Decide what data goes into QR
-        if self.awaz_id:
-            qr_data = self.awaz_id
-        elif self.migrant_id:
-            qr_data = self.migrant_id
-        else:
-            qr_data = str(self.qr_code_uuid)
-
-        # Regenerate QR if missing or if awaz_id/migrant_id changed
-        regenerate_qr = False
-        if not self.qr_code_image:
-            regenerate_qr = True
-        else:
-            # Simple heuristic: always regenerate if awaz_id or migrant_id is set
-            if self.awaz_id or self.migrant_id:
-                regenerate_qr = True
-
-        if regenerate_qr:
-            img = qrcode.make(qr_data)
-            buffer = BytesIO()
-            img.save(buffer, format='PNG')
-            filename = f"{self.user.username}_qr.png"
-            self.qr_code_image.save(filename, ContentFile(buffer.getvalue()), save=False)
-
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -238,29 +220,115 @@ class MedicalRecord(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["updated_at", "id"]),
+        ]
+
     def __str__(self):
         return f"MedicalRecord of {self.patient.user.username} ({self.qr_code_uuid})"
 
     def assign_schemes(self):
-        age = self.patient.age
-        diseases = [d.strip().lower() for d in (self.recurring_diseases or "").split(",") if d.strip()]
+        from .utils.schemes import get_scheme_index
+        from .utils.terms import split_terms
 
-        # If schemes can be hospital-specific, filter by record's hospital
-        eligible = Scheme.objects.filter(min_age__lte=age, max_age__gte=age).filter(
-            models.Q(hospital__isnull=True) | models.Q(hospital=self.hospital)
+        # Compiled in-memory index: no Scheme queries per call
+        scheme_ids = get_scheme_index().eligible(
+            self.patient.age, split_terms(self.recurring_diseases), self.hospital_id
         )
 
-        final_schemes = []
-        for scheme in eligible:
-            if scheme.applicable_diseases:
-                scheme_diseases = [d.strip().lower() for d in scheme.applicable_diseases.split(",") if d.strip()]
-                if any(d in diseases for d in scheme_diseases):
-                    final_schemes.append(scheme)
-            else:
-                final_schemes.append(scheme)
+        self.eligible_schemes.set(scheme_ids)
+
+# -------------------------------
+# Normalized diagnosis / symptom index
+# -------------------------------
+class RecordTerm(models.Model):
+    """
+    One row per distinct disease or symptom on a MedicalRecord, normalized by
+    HealthBridge.utils.terms.split_terms and kept in sync from signals.
+    Lets disease-level counting and filtering run as indexed SQL instead of
+    re-parsing the comma-separated text fields.
+    """
+    DISEASE = "disease"
+    SYMPTOM = "symptom"
+    KIND_CHOICES = [
+        (DISEASE, "Disease"),
+        (SYMPTOM, "Symptom"),
+    ]
+
+    record = models.ForeignKey(MedicalRecord, on_delete=models.CASCADE, related_name="terms")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    term = models.CharField(max_length=100)
+
+    # Where/when the record counted towards OutbreakRollup, so edits and
+    # deletes can be reversed exactly
+    region = models.CharField(max_length=120, blank=True, default="")
+    day = models.DateField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["record", "kind", "term"], name="unique_record_term"),
+        ]
+        indexes = [
+            models.Index(fields=["kind", "term"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}: {self.term} (record {self.record_id})"
+
+
+class OutbreakRollup(models.Model):
+    """
+    Number of medical records per region, disease and day (treated_at date).
+    Maintained incrementally from RecordTerm changes; rebuild with
+    `manage.py rebuild_outbreak_rollup`.
+    """
+    region = models.CharField(max_length=120, blank=True, default="")
+    disease = models.CharField(max_length=100)
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["region", "disease", "day"], name="unique_outbreak_rollup"),
+        ]
+        indexes = [
+            models.Index(fields=["day"]),
+            models.Index(fields=["disease", "day"]),
+        ]
+
+    def __str__(self):
+        return f"{self.disease} in {self.region or 'unknown region'} on {self.day}: {self.count}"
+
+
+class OutbreakAlert(models.Model):
+    """An anomalous day for one region/disease series, written by HealthBridge.utils.anomaly."""
+    METHOD_CHOICES = [
+        ("zscore", "Rolling z-score"),
+        ("ewma", "EWMA"),
+        ("seasonal", "Weekly seasonal residual"),
+    ]
+
+    region = models.CharField(max_length=120, blank=True, default="")
+    disease = models.CharField(max_length=100)
+    day = models.DateField()
+    method = models.CharField(max_length=10, choices=METHOD_CHOICES)
+    observed = models.PositiveIntegerField()
+    expected = models.FloatField()
+    score = models.FloatField()
+    created_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["region", "disease", "day", "method"], name="unique_outbreak_alert"),
+        ]
+        indexes = [
+            models.Index(fields=["day"]),
+        ]
+
+    def __str__(self):
+        return f"{self.disease} in {self.region or 'unknown region'} on {self.day} ({self.method} {self.score:.1f})"
 
-        self.eligible_schemes.set(final_schemes)
-        self.save()
 
 # -------------------------------
 # Recommendation model
@@ -279,62 +347,156 @@ class Recommendation(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     read_by_patient = models.BooleanField(default=False)
 
+    # Stable id of the rule that produced this recommendation (null for manual ones)
+    rule_key = models.CharField(max_length=50, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["medical_record", "rule_key"], name="unique_record_rule"),
+        ]
+        indexes = [
+            models.Index(fields=["updated_at", "id"]),
+        ]
+
+    # (rule_key, title, description, applies(diseases, symptoms, age))
+    RECORD_RULES = [
+        ("diabetes", "Diabetes Management",
+         "Maintain blood sugar levels, follow diet plan, and get regular checkups.",
+         lambda diseases, symptoms, age: "diabetes" in diseases),
+        ("hypertension", "Hypertension Care",
+         "Monitor blood pressure daily and reduce salt intake.",
+         lambda diseases, symptoms, age: "hypertension" in diseases),
+        ("fever", "Fever Alert",
+         "Take rest, drink fluids, and consult a doctor if persistent.",
+         lambda diseases, symptoms, age: "fever" in symptoms),
+        ("cough", "Respiratory Care",
+         "Persistent cough may indicate respiratory issues. Consider a checkup.",
+         lambda diseases, symptoms, age: "cough" in symptoms),
+        ("fatigue", "Energy & Nutrition",
+         "Fatigue can be linked to poor nutrition or stress. Explore wellness programs.",
+         lambda diseases, symptoms, age: "fatigue" in symptoms),
+        ("senior_checkup", "Senior Health Checkup",
+         "Annual full body checkup recommended for people above 50.",
+         lambda diseases, symptoms, age: age >= 50),
+    ]
+
     def __str__(self):
         return f"Recommendation for {self.patient.user.username}: {self.title}"
 
     @classmethod
     def generate_ai_recommendations(cls, medical_record):
-        recommendations = []
-        diseases = [d.strip().lower() for d in (medical_record.recurring_diseases or "").split(",") if d.strip()]
-        symptoms = [s.strip().lower() for s in (medical_record.current_symptoms or "").split(",") if s.strip()]
-
-        if "diabetes" in diseases:
-            recommendations.append({
-                "title": "Diabetes Management",
-                "description": "Maintain blood sugar levels, follow diet plan, and get regular checkups."
-            })
-
-        if "hypertension" in diseases:
-            recommendations.append({
-                "title": "Hypertension Care",
-                "description": "Monitor blood pressure daily and reduce salt intake."
-            })
-
-        if "fever" in symptoms:
-            recommendations.append({
-                "title": "Fever Alert",
-                "description": "Take rest, drink fluids, and consult a doctor if persistent."
-            })
-
-        if "cough" in symptoms:
-            recommendations.append({
-                "title": "Respiratory Care",
-                "description": "Persistent cough may indicate respiratory issues. Consider a checkup."
-            })
-
-        if "fatigue" in symptoms:
-            recommendations.append({
-                "title": "Energy & Nutrition",
-                "description": "Fatigue can be linked to poor nutrition or stress. Explore wellness programs."
-            })
-
-        if medical_record.patient.age >= 50:
-            recommendations.append({
-                "title": "Senior Health Checkup",
-                "description": "Annual full body checkup recommended for people above 50."
-            })
-
-        rec_objects = []
-        for rec in recommendations:
-            rec_obj = cls.objects.create(
-                patient=medical_record.patient,
+        """
+        Bring a record's rule-based recommendations up to date.
+        Rules that still apply and are unchanged cause no writes; new or
+        reworded rules go out in one bulk upsert keyed by (medical_record,
+        rule_key); rules that no longer apply are removed.
+        """
+        from .utils.dashboard import mark_dashboard_stale
+        from .utils.terms import split_terms
+
+        diseases = set(split_terms(medical_record.recurring_diseases))
+        symptoms = set(split_terms(medical_record.current_symptoms))
+        age = medical_record.patient.age
+
+        desired = {
+            key: (title, description)
+            for key, title, description, applies in cls.RECORD_RULES
+            if applies(diseases, symptoms, age)
+        }
+        existing = {
+            rec.rule_key: rec
+            for rec in cls.objects.filter(medical_record=medical_record, rule_key__isnull=False)
+        }
+
+        upserts = [
+            cls(
+                patient_id=medical_record.patient_id,
                 medical_record=medical_record,
-                title=rec["title"],
-                description=rec["description"]
+                rule_key=key,
+                title=title,
+                description=description,
             )
-            rec_objects.append(rec_obj)
+            for key, (title, description) in desired.items()
+            if key not in existing or (existing[key].title, existing[key].description) != (title, description)
+        ]
+        stale = [rec.pk for key, rec in existing.items() if key not in desired]
+
+        if upserts or stale:
+            with transaction.atomic():
+                if stale:
+                    cls.objects.filter(pk__in=stale).delete()
+                if upserts:
+                    cls.objects.bulk_create(
+                        upserts,
+                        update_conflicts=True,
+                        unique_fields=["medical_record", "rule_key"],
+                        update_fields=["title", "description", "updated_at"],
+                    )
+            mark_dashboard_stale()
+            return list(cls.objects.filter(medical_record=medical_record, rule_key__in=desired.keys()))
+
+        return [existing[key] for key in desired]
+
+
+class CohortRecommendation(models.Model):
+    """
+    Profile-level advice precomputed in bulk by
+    HealthBridge.utils.recommendation_engine.CohortRecommendationEngine
+    and read by the patient dashboard.
+    """
+    patient = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="cohort_recommendations")
+    rule_key = models.CharField(max_length=50)
+    message = models.CharField(max_length=255)
+    computed_at = models.DateTimeField(default=timezone.now)
 
-        return rec_objects
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["patient", "rule_key"], name="unique_cohort_recommendation"),
+        ]
+
+    def __str__(self):
+        return f"{self.rule_key} for profile {self.patient_id}"
+
+
+# -------------------------------
+# Symptom rules (AI symptom recommendations)
+# -------------------------------
+class SymptomRule(models.Model):
+    """
+    Advice returned by the symptom checker when any of its keywords appears in
+    the patient's text. Compiled into one matcher by HealthBridge.utils.symptom_matcher.
+    """
+    URGENCY_CHOICES = [
+        ("routine", "Routine"),
+        ("soon", "See a doctor soon"),
+        ("urgent", "Urgent"),
+    ]
+
+    key = models.SlugField(max_length=50, unique=True)
+    title = models.CharField(max_length=200)
+    description = models.TextField()
+    priority = models.IntegerField(default=100)   # higher is listed first
+    urgency = models.CharField(max_length=10, choices=URGENCY_CHOICES, default="routine")
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return self.title
+
+
+class SymptomKeyword(models.Model):
+    """A keyword or synonym for a SymptomRule, in one language (matching Profile.language values)."""
+    rule = models.ForeignKey(SymptomRule, on_delete=models.CASCADE, related_name="keywords")
+    language = models.CharField(max_length=50, default="English")
+    keyword = models.CharField(max_length=100)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["rule", "language", "keyword"], name="unique_symptom_keyword"),
+        ]
+
+    def __str__(self):
+        return f"{self.keyword} ({self.language})"
 
 
 # -------------------------------
@@ -345,15 +507,122 @@ class Vital(models.Model):
     # Hospital where the vital was recorded (provenance)
     hospital = models.ForeignKey(Hospital, on_delete=models.PROTECT, related_name="vitals", null=True, blank=True)
 
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # When the reading was taken; devices send their own, batched uploads arrive late
+    timestamp = models.DateTimeField(default=timezone.now)
     temperature = models.FloatField(null=True, blank=True)
     blood_pressure = models.CharField(max_length=20, null=True, blank=True)
     heart_rate = models.IntegerField(null=True, blank=True)
+    # Parsed from blood_pressure on save so it can be aggregated (see utils/vital_rollups.py)
+    systolic = models.PositiveSmallIntegerField(null=True, blank=True)
+    diastolic = models.PositiveSmallIntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["updated_at", "id"]),
+            models.Index(fields=["patient", "timestamp"]),
+        ]
 
     def __str__(self):
         return f"Vital for {self.patient.user.username} at {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
 
 
+class VitalRollup(models.Model):
+    """
+    Count/min/max/sum of each vital per patient and UTC hour or day.
+    Maintained as vitals are written; rebuild with `manage.py rebuild_vital_rollups`.
+    """
+    HOUR = "hour"
+    DAY = "day"
+    RESOLUTION_CHOICES = [(HOUR, "Hour"), (DAY, "Day")]
+
+    patient = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="vital_rollups")
+    resolution = models.CharField(max_length=4, choices=RESOLUTION_CHOICES)
+    bucket = models.DateTimeField()  # start of the hour or day
+    count = models.PositiveIntegerField(default=0)
+
+    # Per metric: readings that had a value, and their min/max/sum
+    temperature_count = models.PositiveIntegerField(default=0)
+    temperature_min = models.FloatField(null=True)
+    temperature_max = models.FloatField(null=True)
+    temperature_sum = models.FloatField(default=0)
+    heart_rate_count = models.PositiveIntegerField(default=0)
+    heart_rate_min = models.FloatField(null=True)
+    heart_rate_max = models.FloatField(null=True)
+    heart_rate_sum = models.FloatField(default=0)
+    systolic_count = models.PositiveIntegerField(default=0)
+    systolic_min = models.FloatField(null=True)
+    systolic_max = models.FloatField(null=True)
+    systolic_sum = models.FloatField(default=0)
+    diastolic_count = models.PositiveIntegerField(default=0)
+    diastolic_min = models.FloatField(null=True)
+    diastolic_max = models.FloatField(null=True)
+    diastolic_sum = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["patient", "resolution", "bucket"], name="unique_vital_rollup"),
+        ]
+
+    def __str__(self):
+        return f"{self.resolution} rollup for patient {self.patient_id} at {self.bucket:%Y-%m-%d %H:%M}: {self.count}"
+
+
+class ArchivedPartition(models.Model):
+    """
+    Which hospital/month Parquet partitions of an archived table hold a
+    patient's rows (see HealthBridge/utils/archive.py), so history reads open
+    only those files. Written in the transaction that deletes the moved rows.
+    """
+    table = models.CharField(max_length=20)
+    patient = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="archived_partitions")
+    hospital = models.CharField(max_length=20)  # partition value: hospital pk or "none"
+    month = models.CharField(max_length=7)      # YYYY-MM
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["table", "patient", "hospital", "month"], name="unique_archived_partition"),
+        ]
+
+    def __str__(self):
+        return f"{self.table} of patient {self.patient_id} in hospital={self.hospital}/month={self.month}"
+
+
+class TokenSession(models.Model):
+    """
+    Per-user counter folded into the session version of refresh tokens
+    (HealthBridge/utils/tokens.py). Logout bumps it, which revokes every
+    refresh token issued before.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="token_session")
+    epoch = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Token session {self.epoch} of user {self.user_id}"
+
+
+class UsedRefreshToken(models.Model):
+    """A refresh token already exchanged; presenting it again revokes the user's sessions."""
+    jti = models.CharField(max_length=32, primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.jti
+
+
+class CacheInvalidation(models.Model):
+    """
+    One row per eviction of an in-process cache entry (compiled indexes,
+    cached tokens), read by every worker to evict its own copy. See
+    HealthBridge/utils/invalidation.py.
+    """
+    tag = models.CharField(max_length=120)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.tag} at {self.created_at:%Y-%m-%d %H:%M:%S}"
+
+
 # -------------------------------
 # Consent model (optional but recommended for federation)
 # -------------------------------
@@ -387,4 +656,39 @@ class Consent(models.Model):
         )
 
     def __str__(self):
-        return f"Consent[{self.purpose}] {self.patient.name}: {self.from_hospital.name} -> {self.to_hospital.name}"
\ No newline at end of file
+        return f"Consent[{self.purpose}] {self.patient.name}: {self.from_hospital.name} -> {self.to_hospital.name}"
+
+
+class FeedEvent(models.Model):
+    """
+    A change a peer hospital must follow that leaves no row for the change
+    feed to send: a deleted row, a revoked consent, or a granted one whose
+    older rows already lie behind the peer's cursors. Served as the "events"
+    feed (see HealthBridge/utils/change_feed.py).
+    """
+    DELETE = "delete"
+    REVOKE = "revoke"
+    GRANT = "grant"
+    KIND_CHOICES = [
+        (DELETE, "Row deleted"),
+        (REVOKE, "Consent revoked"),
+        (GRANT, "Consent granted"),
+    ]
+
+    hospital = models.ForeignKey(Hospital, on_delete=models.CASCADE, related_name="feed_events")  # recipient
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # Plain ids: the patient or hospital may be gone by the time the peer reads this
+    patient_id = models.IntegerField()
+    from_hospital_id = models.IntegerField(null=True, blank=True)  # revoke/grant; null revokes every row
+    feed = models.CharField(max_length=30, blank=True)             # delete: feed and id of the row
+    object_id = models.IntegerField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)       # grant: when the consent lapses
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["hospital", "updated_at", "id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} of patient {self.patient_id} for hospital {self.hospital_id}"
\ No newline at end of file
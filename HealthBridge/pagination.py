@@ -0,0 +1,16 @@
+# HealthBridge/pagination.py
+
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination over the primary key, newest first. Each page
+    is `WHERE id < <cursor> ORDER BY id DESC LIMIT n` on the pk index, so it
+    costs the same at row 10 as at row 10M (no OFFSET, no COUNT).
+    """
+    ordering = "-id"
+    page_size = getattr(settings, "API_PAGE_SIZE", 50)
+    page_size_query_param = "page_size"
+    max_page_size = getattr(settings, "API_MAX_PAGE_SIZE", 500)
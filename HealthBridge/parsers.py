@@ -0,0 +1,33 @@
+# HealthBridge/parsers.py
+import json
+
+from rest_framework.parsers import BaseParser
+
+# -------------------------------
+# Newline-delimited JSON
+# -------------------------------
+# Returns a lazy iterator instead of a parsed document, so the view consumes
+# the body line by line while it is still being read and memory stays bounded
+# by the batch size, not the upload. A line that is not valid JSON is yielded
+# as its ValueError for the consumer to report against that row.
+
+
+class NDJSONParser(BaseParser):
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", "utf-8")
+        return _iter_lines(stream, encoding)
+
+
+def _iter_lines(stream, encoding):
+    if stream is None:
+        return
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line.decode(encoding) if isinstance(line, bytes) else line)
+        except ValueError as exc:  # JSONDecodeError, UnicodeDecodeError
+            yield exc
@@ -1,37 +1,43 @@
 # HealthBridge/permissions.py
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
+from .utils.principal import get_principal
+
 # -------------------------------
 # Role-based permissions
 # -------------------------------
+# Roles and hospital come from the cached Principal (utils/principal.py),
+# so stacking several of these classes costs no extra queries.
 
 class IsDoctor(BasePermission):
     def has_permission(self, request, view):
-        u = getattr(request, "user", None)
-        if not u or not u.is_authenticated:
-            return False
-        return u.groups.filter(name="Doctor").exists() or (
-            hasattr(u, "profile") and u.profile.role == "doctor"
-        )
+        principal = get_principal(request)
+        return bool(principal and principal.in_role("Doctor", "doctor"))
 
 class IsAuthority(BasePermission):
     def has_permission(self, request, view):
-        u = getattr(request, "user", None)
-        if not u or not u.is_authenticated:
-            return False
-        return u.groups.filter(name="Authority").exists() or (
-            hasattr(u, "profile") and u.profile.role == "authority"
-        )
+        principal = get_principal(request)
+        return bool(principal and principal.in_role("Authority", "authority"))
 
 class IsMigrant(BasePermission):
     def has_permission(self, request, view):
-        u = getattr(request, "user", None)
-        if not u or not u.is_authenticated:
-            return False
-        return u.groups.filter(name="Patient").exists() or (
-            hasattr(u, "profile") and u.profile.role in ["migrant", "patient"]
+        principal = get_principal(request)
+        return bool(principal and principal.in_role("Patient", "migrant", "patient"))
+
+class IsHospitalStaff(BasePermission):
+    """Doctor, hospital admin or authority attached to a hospital (e.g. bedside devices uploading vitals)."""
+    def has_permission(self, request, view):
+        principal = get_principal(request)
+        return bool(
+            principal
+            and principal.hospital_id
+            and (principal.groups & {"Doctor", "HospitalAdmin", "Authority"}
+                 or principal.profile_role in ("doctor", "authority"))
         )
 
+class IsFederationPeer(IsHospitalStaff):
+    """Staff of a hospital node pulling the change feed."""
+
 # -------------------------------
 # Hospital scoping permissions
 # -------------------------------
@@ -43,23 +49,20 @@ class SameHospital(BasePermission):
     Migrants can only access their own records.
     """
     def has_object_permission(self, request, view, obj):
-        u = getattr(request, "user", None)
-        if not u or not u.is_authenticated or not hasattr(u, "profile"):
+        principal = get_principal(request)
+        if principal is None or principal.profile_id is None:
             return False
 
-        role = u.profile.role
+        role = principal.profile_role
 
         # Migrant: can only access own object
         if role == "migrant":
-            return hasattr(obj, "patient") and obj.patient == u.profile
+            return hasattr(obj, "patient_id") and obj.patient_id == principal.profile_id
 
         # Doctor or authority: hospital must match
         if role in ["doctor", "authority"]:
-            user_hospital = getattr(getattr(u, "doctorprofile", None), "hospital", None) \
-                            or getattr(getattr(u, "authorityprofile", None), "hospital", None) \
-                            or getattr(u.profile, "home_hospital", None)
-            obj_hospital = getattr(obj, "hospital", None) or getattr(obj, "home_hospital", None)
-            return bool(user_hospital and obj_hospital and user_hospital.id == obj_hospital.id)
+            obj_hospital_id = getattr(obj, "hospital_id", None) or getattr(obj, "home_hospital_id", None)
+            return bool(principal.hospital_id and obj_hospital_id and principal.hospital_id == obj_hospital_id)
 
         return False
 
@@ -71,4 +74,4 @@ class SameHospital(BasePermission):
 class ReadOnly(BasePermission):
     """Allow safe methods (GET, HEAD, OPTIONS) for everyone authenticated."""
     def has_permission(self, request, view):
-        return request.method in SAFE_METHODS and request.user.is_authenticated
\ No newline at end of file
+        return request.method in SAFE_METHODS and request.user.is_authenticated
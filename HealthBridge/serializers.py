@@ -7,13 +7,57 @@ from .models import (
     Scheme,
     Recommendation,
     Vital,
+    OutbreakAlert,
+    FeedEvent,
 )
+from .utils.fieldsets import requested_fields
+
+
+# ---------------------------
+# Declared query plans
+# ---------------------------
+class EagerLoadingMixin:
+    """
+    Serializers list the relations their fields traverse; views pass their
+    querysets through setup_eager_loading() so a page of N rows costs a fixed
+    number of queries instead of one per row and relation.
+    """
+    select_related = ()
+    prefetch_related = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related:
+            queryset = queryset.select_related(*cls.select_related)
+        if cls.prefetch_related:
+            queryset = queryset.prefetch_related(*cls.prefetch_related)
+        return queryset
+
+
+# ---------------------------
+# Sparse fieldsets
+# ---------------------------
+class SparseFieldsetMixin:
+    """Keep only the fields named in ?fields= (read requests only)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = requested_fields(self.context.get("request"))
+        if requested is None:
+            return
+        unknown = requested - set(self.fields)
+        if unknown:
+            raise serializers.ValidationError({"fields": f"Unknown field(s): {', '.join(sorted(unknown))}"})
+        for name in set(self.fields) - requested:
+            self.fields.pop(name)
 
 
 # ---------------------------
 # Patient-facing serializer (safe, concise details for lookups/scans)
 # ---------------------------
-class PatientProfileSerializer(serializers.ModelSerializer):
+class PatientProfileSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related = ("user", "home_hospital")
+
     home_hospital_name = serializers.CharField(source="home_hospital.name", read_only=True)
     home_hospital_id = serializers.CharField(source="home_hospital.hospital_id", read_only=True)
     username = serializers.CharField(source="user.username", read_only=True)
@@ -41,7 +85,9 @@ class PatientProfileSerializer(serializers.ModelSerializer):
 # ---------------------------
 # Full profile serializer (admin/API CRUD)
 # ---------------------------
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(EagerLoadingMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    select_related = ("user", "home_hospital")
+
     username = serializers.CharField(source="user.username", read_only=True)
     home_hospital_name = serializers.CharField(source="home_hospital.name", read_only=True)
 
@@ -57,7 +103,10 @@ class ProfileSerializer(serializers.ModelSerializer):
 # ---------------------------
 # Medical record serializer
 # ---------------------------
-class MedicalRecordSerializer(serializers.ModelSerializer):
+class MedicalRecordSerializer(EagerLoadingMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    select_related = ("patient__user", "doctor__user", "hospital")
+    prefetch_related = ("eligible_schemes",)
+
     patient_username = serializers.CharField(source="patient.user.username", read_only=True)
     doctor_username = serializers.CharField(source="doctor.user.username", read_only=True)
     hospital_name = serializers.CharField(source="hospital.name", read_only=True)
@@ -70,7 +119,7 @@ class MedicalRecordSerializer(serializers.ModelSerializer):
 # ---------------------------
 # Scheme serializer
 # ---------------------------
-class SchemeSerializer(serializers.ModelSerializer):
+class SchemeSerializer(EagerLoadingMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Scheme
         fields = "__all__"
@@ -79,7 +128,7 @@ class SchemeSerializer(serializers.ModelSerializer):
 # ---------------------------
 # Recommendation serializer
 # ---------------------------
-class RecommendationSerializer(serializers.ModelSerializer):
+class RecommendationSerializer(EagerLoadingMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Recommendation
         fields = "__all__"
@@ -88,7 +137,25 @@ class RecommendationSerializer(serializers.ModelSerializer):
 # ---------------------------
 # Vital serializer
 # ---------------------------
-class VitalSerializer(serializers.ModelSerializer):
+class VitalSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     class Meta:
         model = Vital
-        fields = "__all__"
\ No newline at end of file
+        fields = "__all__"
+
+
+# ---------------------------
+# Outbreak alert serializer
+# ---------------------------
+class OutbreakAlertSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    class Meta:
+        model = OutbreakAlert
+        fields = "__all__"
+
+
+# ---------------------------
+# Change feed event serializer
+# ---------------------------
+class FeedEventSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    class Meta:
+        model = FeedEvent
+        exclude = ["hospital"]
@@ -1,62 +1,49 @@
 # HealthBridge/signals.py
 
-import os
-from django.db.models.signals import post_save, post_migrate
+from django.db.models.signals import pre_save, post_save, post_delete, pre_delete, post_migrate, m2m_changed
 from django.dispatch import receiver
-from cryptography.hazmat.primitives.asymmetric import rsa
-from cryptography.hazmat.primitives import serialization
-from django.contrib.auth.models import Group, Permission
-from .models import Hospital, DoctorProfile, Profile, HospitalAdminProfile, AuthorityProfile
+from django.contrib.auth.models import Group, Permission, User
+from .models import Hospital, DoctorProfile, Profile, HospitalAdminProfile, AuthorityProfile, MedicalRecord, Recommendation, Scheme, SymptomRule, SymptomKeyword, Vital, Consent
 
-import qrcode
-from io import BytesIO
-from django.core.files import File
+from django.db import transaction
+from django.db.models import QuerySet
+from .utils.qr import needs_qr_render, qr_payload, qr_renderer
+from .utils.lookup import invalidate_cards
+from .utils.keys import forget_hospital_keys, provision_hospital_key
+from .utils.change_feed import consent_scope, record_consent_change, record_deletion
+from .utils.terms import replace_record_terms, sync_record_terms, unindex_record
+from .utils.vital_rollups import parse_blood_pressure, refresh_vital_rollups
+from .utils.dashboard import mark_dashboard_stale
+from .utils.schemes import invalidate_scheme_index
+from .utils.symptom_matcher import invalidate_symptom_matcher
+from .utils.principal import invalidate_principal
+from .authentication import revoke_cached_token, revoke_cached_user
+from rest_framework.authtoken.models import Token
 
 @receiver(post_save, sender=Profile)
 def generate_patient_qr(sender, instance, created, **kwargs):
-    if not instance.qr_code_image or created:
-        qr_data = instance.migrant_id or str(instance.qr_code_uuid)
-        
-        qr = qrcode.make(qr_data)
-        buffer = BytesIO()
-        qr.save(buffer, format='PNG')
-        buffer.seek(0)
-        
-        filename = f"{instance.user.username}_qr.png"
-        instance.qr_code_image.save(filename, File(buffer), save=False)
-        Profile.objects.filter(pk=instance.pk).update(qr_code_image=instance.qr_code_image.name)
+    """
+    Queue a QR render once the transaction commits, but only when the image is
+    missing or the encoded payload (awaz_id / migrant_id / UUID) has changed.
+    """
+    if not needs_qr_render(instance):
+        return
+    profile_id, payload = instance.pk, qr_payload(instance)
+    transaction.on_commit(lambda: qr_renderer.submit(profile_id, payload))
+
+
 @receiver(post_save, sender=Hospital)
 def generate_hospital_key(sender, instance, created, **kwargs):
     """
-    Automatically generate an RSA key pair when a new Hospital is created.
+    Automatically assign an RSA key pair when a new Hospital is created.
+    - Keys are drawn from the pre-generated pool in keys/pool/ (see utils/keys.py).
     - Public key PEM is stored in the Hospital model (for verification/federation).
     - Private key PEM is written to local 'keys/' directory (for testing only).
     """
     if created and not instance.public_key_pem:
-        private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=2048
-        )
-
-        public_pem = private_key.public_key().public_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo
-        ).decode()
-
-        instance.public_key_pem = public_pem
+        instance.public_key_pem = provision_hospital_key(instance.hospital_id)
         instance.save(update_fields=["public_key_pem"])
 
-        private_pem = private_key.private_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.PKCS8,
-            encryption_algorithm=serialization.NoEncryption()
-        ).decode()
-
-        os.makedirs("keys", exist_ok=True)
-        private_key_path = os.path.join("keys", f"{instance.hospital_id}_private.pem")
-        with open(private_key_path, "w", encoding="utf-8") as f:
-            f.write(private_pem)
-
 
 @receiver(post_migrate)
 def create_default_groups(sender, **kwargs):
@@ -142,4 +129,275 @@ def assign_authority_group(sender, instance, created, **kwargs):
         user = instance.user
         if authority_group not in user.groups.all():
             user.groups.add(authority_group)
-            user.save()
\ No newline at end of file
+            user.save()
+
+
+# -------------------------------
+# QR lookup cache invalidation
+# -------------------------------
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_profile_card(sender, instance, **kwargs):
+    """Drop cached patient cards for a profile whenever it is saved or deleted."""
+    invalidate_cards(f"profile:{instance.pk}")
+
+
+@receiver(post_save, sender=Hospital)
+@receiver(post_delete, sender=Hospital)
+def invalidate_hospital_cards(sender, instance, **kwargs):
+    """Cards embed the home hospital name/id, so drop every card for its residents."""
+    invalidate_cards(f"hospital:{instance.pk}")
+
+
+@receiver(post_save, sender=Hospital)
+@receiver(post_delete, sender=Hospital)
+def forget_parsed_hospital_keys(sender, instance, **kwargs):
+    """A rotated or removed key must stop verifying signed tokens immediately."""
+    forget_hospital_keys(instance.hospital_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_cards(sender, instance, update_fields=None, **kwargs):
+    """Cards embed the username."""
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    invalidate_cards(f"user:{instance.pk}")
+
+
+# -------------------------------
+# Diagnosis / symptom index
+# -------------------------------
+@receiver(post_save, sender=MedicalRecord)
+def index_record_terms(sender, instance, **kwargs):
+    """Keep RecordTerm (and through it OutbreakRollup) in sync on every write."""
+    sync_record_terms(instance)
+
+
+@receiver(pre_delete, sender=MedicalRecord)
+def unindex_deleted_record(sender, instance, **kwargs):
+    """Take a deleted record out of OutbreakRollup while its RecordTerm rows still exist."""
+    unindex_record(instance)
+
+
+@receiver(post_save, sender=Hospital)
+def replace_hospital_terms(sender, instance, created, update_fields=None, **kwargs):
+    """Terms are filed under the hospital's region; follow it when it is edited."""
+    if created or (update_fields is not None and "region" not in update_fields):
+        return
+    replace_record_terms(MedicalRecord.objects.filter(hospital=instance))
+
+
+@receiver(pre_save, sender=Profile)
+def remember_patient_location(sender, instance, update_fields=None, **kwargs):
+    instance._previous_location = None
+    if instance.pk is not None and (update_fields is None or "location" in update_fields):
+        instance._previous_location = Profile.objects.filter(pk=instance.pk).values_list("location", flat=True).first()
+
+
+@receiver(post_save, sender=Profile)
+def replace_patient_terms(sender, instance, created, **kwargs):
+    """Records from hospitals without a region are filed under the patient's location; follow it when it changes."""
+    previous = getattr(instance, "_previous_location", None)
+    if created or previous is None or previous == instance.location:
+        return
+    replace_record_terms(MedicalRecord.objects.filter(patient=instance))
+
+
+# -------------------------------
+# Vital rollups
+# -------------------------------
+@receiver(pre_save, sender=Vital)
+def prepare_vital(sender, instance, **kwargs):
+    """Parse blood pressure, and remember the bucket an edited vital is leaving."""
+    instance.systolic, instance.diastolic = parse_blood_pressure(instance.blood_pressure)
+    instance._previous_bucket = None
+    if instance.pk is not None:
+        instance._previous_bucket = Vital.objects.filter(pk=instance.pk).values_list("patient_id", "timestamp").first()
+
+
+@receiver(post_save, sender=Vital)
+@receiver(post_delete, sender=Vital)
+def refresh_vital_buckets(sender, instance, **kwargs):
+    if isinstance(kwargs.get("origin"), Profile):
+        return  # the patient's rollups are cascade-deleted with it
+    points = [(instance.patient_id, instance.timestamp)]
+    if getattr(instance, "_previous_bucket", None):
+        points.append(instance._previous_bucket)
+    refresh_vital_rollups(points)
+
+
+# -------------------------------
+# Archived history
+# -------------------------------
+@receiver(pre_delete, sender=Profile)
+def purge_archived_history(sender, instance, **kwargs):
+    """
+    Parquet rows outlive the cascade: note the patient's partitions before
+    ArchivedPartition is deleted, and purge them once the delete commits.
+    """
+    partitions = list(instance.archived_partitions.values_list("table", "hospital", "month"))
+    if not partitions:
+        return
+    patient_id = instance.pk
+
+    def purge():
+        from .utils.archive import purge_patient_archive  # pyarrow loads only when there is something to purge
+        purge_patient_archive(patient_id, partitions)
+
+    transaction.on_commit(purge)
+
+
+# -------------------------------
+# Authority dashboard snapshot
+# -------------------------------
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+@receiver(post_save, sender=MedicalRecord)
+@receiver(post_delete, sender=MedicalRecord)
+@receiver(post_save, sender=Recommendation)
+@receiver(post_delete, sender=Recommendation)
+@receiver(m2m_changed, sender=MedicalRecord.eligible_schemes.through)
+def invalidate_dashboard_snapshot(sender, **kwargs):
+    """Any write to the counted tables marks the authority dashboard snapshot stale."""
+    mark_dashboard_stale()
+
+
+# -------------------------------
+# Scheme eligibility index
+# -------------------------------
+@receiver(post_save, sender=Scheme)
+@receiver(post_delete, sender=Scheme)
+def rebuild_scheme_index(sender, **kwargs):
+    """Any Scheme change invalidates the compiled eligibility index in every worker."""
+    invalidate_scheme_index()
+
+
+# -------------------------------
+# Symptom rule matcher
+# -------------------------------
+@receiver(post_save, sender=SymptomRule)
+@receiver(post_delete, sender=SymptomRule)
+@receiver(post_save, sender=SymptomKeyword)
+@receiver(post_delete, sender=SymptomKeyword)
+def reload_symptom_matcher(sender, **kwargs):
+    """Admin edits to rules or keywords hot-reload the compiled matcher."""
+    invalidate_symptom_matcher()
+
+
+# -------------------------------
+# Cached principal (permission classes)
+# -------------------------------
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+@receiver(post_save, sender=DoctorProfile)
+@receiver(post_delete, sender=DoctorProfile)
+@receiver(post_save, sender=HospitalAdminProfile)
+@receiver(post_delete, sender=HospitalAdminProfile)
+@receiver(post_save, sender=AuthorityProfile)
+@receiver(post_delete, sender=AuthorityProfile)
+def invalidate_profile_principal(sender, instance, **kwargs):
+    """Role or hospital may have changed for the profile's user."""
+    invalidate_principal(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_principal(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    invalidate_principal(instance.pk)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_group_principals(sender, instance, action, reverse, pk_set, **kwargs):
+    """Group membership changed, from either side (user.groups or group.user_set)."""
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        invalidate_principal(instance.pk)
+    elif pk_set:
+        for user_id in pk_set:
+            invalidate_principal(user_id)
+    else:
+        # group.user_set.clear(): pk_set is None, so drop every cached principal
+        invalidate_principal()
+
+
+# -------------------------------
+# Token authentication cache
+# -------------------------------
+@receiver(post_delete, sender=Token)
+def revoke_deleted_token(sender, instance, **kwargs):
+    """Logout (token deletion) takes effect on the next request."""
+    revoke_cached_token(instance.key)
+
+
+@receiver(pre_save, sender=User)
+def detect_password_change(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+    stored = User.objects.filter(pk=instance.pk).values_list("password", flat=True).first()
+    instance._password_changed = stored is not None and stored != instance.password
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def revoke_user_tokens(sender, instance, update_fields=None, **kwargs):
+    """
+    Deactivation and deletion evict every cached token of the user; a
+    password change also deletes the tokens themselves, forcing a new login.
+    A login only stamps last_login, which nothing reads from the cache.
+    """
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    revoke_cached_user(instance.pk)
+    if getattr(instance, "_password_changed", False):
+        instance._password_changed = False
+        Token.objects.filter(user_id=instance.pk).delete()
+
+
+# -------------------------------
+# Federation change feed events
+# -------------------------------
+FEED_NAMES = {MedicalRecord: "medical_records", Vital: "vitals", Recommendation: "recommendations"}
+
+
+def _deleting_patient(origin):
+    """True when a delete cascades from a patient's profile or user (one event covers all their rows)."""
+    if isinstance(origin, QuerySet):
+        return origin.model in (Profile, User)
+    return isinstance(origin, (Profile, User))
+
+
+@receiver(pre_delete, sender=Profile)
+def send_profile_deletion(sender, instance, **kwargs):
+    """Sent before the cascade takes the patient's consents with it."""
+    record_deletion("profiles", instance)
+
+
+@receiver(post_delete, sender=MedicalRecord)
+@receiver(post_delete, sender=Vital)
+@receiver(post_delete, sender=Recommendation)
+def send_row_deletion(sender, instance, origin=None, **kwargs):
+    if _deleting_patient(origin):
+        return
+    record_deletion(FEED_NAMES[sender], instance)
+
+
+@receiver(pre_save, sender=Consent)
+def remember_consent_scope(sender, instance, **kwargs):
+    previous = Consent.objects.filter(pk=instance.pk).first() if instance.pk is not None else None
+    instance._previous_scope = consent_scope(previous)
+
+
+@receiver(post_save, sender=Consent)
+def send_consent_change(sender, instance, **kwargs):
+    """Grants and revocations reach the receiving hospital through the events feed."""
+    record_consent_change(getattr(instance, "_previous_scope", None), consent_scope(instance))
+
+
+@receiver(post_delete, sender=Consent)
+def send_consent_deletion(sender, instance, origin=None, **kwargs):
+    if _deleting_patient(origin):
+        return
+    record_consent_change(consent_scope(instance), None)
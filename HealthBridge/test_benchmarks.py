@@ -0,0 +1,307 @@
+"""
+Endpoint performance regression suite.
+
+Seeds a synthetic dataset, drives every route in HealthBridge/urls.py through
+the test client and records, per endpoint, the SQL query count, p50/p99
+latency and tracemalloc peak. Results are compared with the committed
+baselines in benchmark_baselines.json:
+
+  - more queries than the baseline fails (N+1s and extra lookups),
+  - peak memory above baseline x tolerance (and above an absolute floor, to
+    ignore noise on tiny numbers) fails,
+  - with BENCH_LATENCY=1, so does p50/p99 above baseline x tolerance. Timings
+    depend on the machine and its load, so they are only compared on request
+    (on the hardware the baselines were recorded on); otherwise they are
+    recorded but not checked.
+
+Environment:
+  BENCH_SCALE            1k (default), 100k or 1m patients
+  BENCH_ITERATIONS       measured requests per endpoint (default 20)
+  BENCH_UPDATE_BASELINES 1 to rewrite the baselines for BENCH_SCALE instead of comparing
+  BENCH_RESULTS          path to write this run's results as JSON
+  BENCH_LATENCY          1 to also fail on p50/p99 regressions
+  BENCH_LATENCY_TOLERANCE / BENCH_LATENCY_FLOOR_MS   p50 limits (default 2x, +5 ms)
+  BENCH_P99_TOLERANCE / BENCH_P99_FLOOR_MS           p99 limits (default 3x, +15 ms)
+  BENCH_MEMORY_TOLERANCE / BENCH_MEMORY_FLOOR_KB     peak memory limits (default 1.5x, +256 KiB)
+
+No 1m baseline is committed: seeding grows linearly with the patient count
+and the 1k tier already spends most of its ~30 s seeding, so a million
+patients takes hours. At that scale the comparison is skipped; record a
+baseline on the target hardware with BENCH_UPDATE_BASELINES=1 first.
+
+The project's test runner (HealthBridge.testing.TestRunner) leaves this suite
+out; run it with `manage.py test --tag benchmark`.
+"""
+
+import gc
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.contrib.auth.models import Group, User
+from django.db import connection
+from django.test import TestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from . import urls as app_urls
+from .authentication import token_cache
+from .models import DoctorProfile, MedicalRecord, Profile, Recommendation, Scheme
+from .utils.invalidation import poll_invalidations
+from .utils.keys import provision_hospital_key
+from .utils.lookup import patient_card_cache
+from .utils.principal import principal_cache
+from .utils.signed_qr import sign_profile_qr
+from .utils.synthetic import seed_dataset
+from .utils.terms import backfill_record_terms
+from .utils.tokens import issue_token_pair
+from .utils.vital_rollups import rebuild_vital_rollups
+
+BASELINES_PATH = Path(__file__).with_name("benchmark_baselines.json")
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+PASSWORD = "bench-pass-1"
+
+
+def _env_float(name, default):
+    return float(os.environ.get(name, default))
+
+
+# (route key, method, path(ctx), role, request data(ctx) or None)
+# Route key is the URL name, or the pattern for unnamed routes. Mutating
+# endpoints come last so they cannot disturb the read-only measurements.
+ENDPOINTS = [
+    # HealChain/urls.py mounts its own router at "/" first, so this measures that API root
+    ("home", "get", lambda c: "/", "doctor", None),
+    ("api-root", "get", lambda c: "/api/", "doctor", None),
+    ("profile-list", "get", lambda c: "/api/profiles/", "doctor", None),
+    ("profile-detail", "get", lambda c: f"/api/profiles/{c['profile'].pk}/", "doctor", None),
+    ("medicalrecord-list", "get", lambda c: "/api/medical-records/", "doctor", None),
+    ("medicalrecord-detail", "get", lambda c: f"/api/medical-records/{c['record'].pk}/", "doctor", None),
+    ("scheme-list", "get", lambda c: "/api/schemes/", "doctor", None),
+    ("scheme-detail", "get", lambda c: f"/api/schemes/{c['scheme'].pk}/", "doctor", None),
+    ("recommendation-list", "get", lambda c: "/api/recommendations/", "doctor", None),
+    ("recommendation-detail", "get", lambda c: f"/api/recommendations/{c['recommendation'].pk}/", "doctor", None),
+    ("api/hospital/<str:hospital_name>/", "get", lambda c: f"/api/hospital/{c['hospital'].name}/", "authority", None),
+    ("api/qr/<uuid:qr_uuid>/", "get", lambda c: f"/api/qr/{c['record'].qr_code_uuid}/", "doctor", None),
+    ("api/outbreak-summary/", "get", lambda c: "/api/outbreak-summary/", "authority", None),
+    ("outbreak-alerts", "get", lambda c: "/api/outbreak-alerts/", "authority", None),
+    ("change-feed", "get", lambda c: "/api/sync/medical_records/", "doctor", None),
+    ("api/dashboard/<int:user_id>/", "get", lambda c: f"/api/dashboard/{c['profile'].pk}/", "patient", None),
+    ("auth-cache-stats", "get", lambda c: "/api/auth/cache-stats/", "admin", None),
+    ("api/patient-full-info/<uuid:qr_uuid>/", "get",
+     lambda c: f"/api/patient-full-info/{c['profile'].qr_code_uuid}/", "doctor", None),
+    ("api/migrant/dashboard/", "get", lambda c: "/api/migrant/dashboard/", "patient", None),
+    ("api/doctor/dashboard/", "get", lambda c: "/api/doctor/dashboard/", "doctor", None),
+    ("api/authority/dashboard/", "get", lambda c: "/api/authority/dashboard/", "authority", None),
+    ("get_patient_vitals/<uuid:uuid>/", "get",
+     lambda c: f"/get_patient_vitals/{c['profile'].qr_code_uuid}/", "doctor", None),
+    ("authority_dashboard_metrics/", "get", lambda c: "/authority_dashboard_metrics/", "authority", None),
+    ("qr-lookup-cache-stats", "get", lambda c: "/api/qr-lookup/cache-stats/", "authority", None),
+    ("my-profile", "get", lambda c: "/api/my-profile/", "patient", None),
+    ("key-pool", "get", lambda c: "/api/key-pool/", "admin", None),
+    ("patient-qr", "get", lambda c: f"/api/qr-code/{c['profile'].qr_code_uuid}.png", "doctor", None),
+    ("qr-lookup", "post", lambda c: "/api/qr-lookup/", "doctor", lambda c: {"value": c["profile"].migrant_id}),
+    ("qr-verify", "post", lambda c: "/api/qr-verify/", "doctor", lambda c: {"codes": c["signed_codes"]}),
+    ("ai-recommendations", "post", lambda c: "/api/ai-recommendations/", "patient",
+     lambda c: {"symptoms": "fever and cough since two days, headache at night"}),
+    ("api/recommend/<int:user_id>/", "post", lambda c: f"/api/recommend/{c['profile'].pk}/", "doctor", None),
+    ("vitals-ingest", "post", lambda c: "/api/vitals/ingest/", "doctor", lambda c: c["vital_readings"]),
+    ("custom_login", "post", lambda c: "/api/login/", None,
+     lambda c: {"username": c["users"]["login"].username, "password": PASSWORD}),
+    ("token-refresh", "post", lambda c: "/api/token/refresh/", None, lambda c: {"refresh": c["refresh"]}),
+    ("logout", "post", lambda c: "/api/logout/", "login", None),
+]
+
+# Routes that cannot be driven in this tree, with the reason
+SKIPPED = {
+    "qr-scan": "templates/qr_scan.html is not part of the repository",
+    "api/schemes/<int:user_id>/": "shadowed by the router's scheme-detail route (api/schemes/<pk>/)",
+}
+
+
+def route_keys(patterns=None, prefix=""):
+    """Every route in HealthBridge/urls.py (format-suffix variants excluded)."""
+    keys = []
+    for pattern in app_urls.urlpatterns if patterns is None else patterns:
+        if isinstance(pattern, URLResolver):
+            keys += route_keys(pattern.url_patterns, prefix + str(pattern.pattern))
+        elif "format" not in pattern.pattern.regex.groupindex:
+            keys.append(pattern.name or prefix + str(pattern.pattern))
+    return keys
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+@tag("benchmark")
+class EndpointBenchmarkTests(TestCase):
+    scale = os.environ.get("BENCH_SCALE", "1k")
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.mkdtemp(prefix="healchain-bench-")
+        cls._settings = override_settings(
+            MEDIA_ROOT=os.path.join(cls._tmp, "media"),
+            HOSPITAL_KEYS_DIR=os.path.join(cls._tmp, "keys"),
+            ARCHIVE_ROOT=os.path.join(cls._tmp, "archive"),
+            KEY_POOL_AUTOFILL=False,
+            QR_RENDER_ASYNC=False,
+            # Measure the endpoints, not PBKDF2
+            PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+        )
+        cls._settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._settings.disable()
+        shutil.rmtree(cls._tmp, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        dataset = seed_dataset(SCALES[cls.scale], seed=42, prefix="bench", chunk_size=10_000)
+        backfill_record_terms(chunk_size=10_000)
+        rebuild_vital_rollups()
+
+        hospital = dataset["hospitals"][0]
+        hospital.public_key_pem = provision_hospital_key(hospital.hospital_id)
+        hospital.save(update_fields=["public_key_pem"])
+
+        doctor = dataset["doctors"][0]
+        # SameHospital needs the doctor to have a profile of role "doctor"
+        Profile.objects.create(user=doctor.user, role="doctor", migrant_id="BENCH-DOCTOR", age=40,
+                               gender="F", location="bench", home_hospital=hospital)
+        patient = Profile.objects.filter(home_hospital=hospital, role="migrant").order_by("id").first()
+        admin = User.objects.create_user("bench-admin", is_staff=True)
+        login = User.objects.create_user("bench-login", password=PASSWORD)
+        login.groups.add(Group.objects.get(name="Doctor"))
+        DoctorProfile.objects.create(user=login, hospital=hospital, department="General",
+                                     designation="MO", contact_number="1")
+
+        record = MedicalRecord.objects.filter(hospital=hospital).order_by("id").first()
+        cls.ctx = {
+            "hospital": hospital,
+            "profile": patient,
+            "record": record,
+            "scheme": Scheme.objects.order_by("id").first(),
+            "recommendation": Recommendation.objects.order_by("id").first(),
+            "users": {"doctor": doctor.user, "authority": dataset["authority"], "patient": patient.user,
+                      "admin": admin, "login": login},
+            "signed_codes": [sign_profile_qr(p) for p in
+                             Profile.objects.select_related("home_hospital").filter(home_hospital=hospital)[:50]],
+            "refresh": issue_token_pair(login)["refresh"],
+            "vital_readings": [
+                {"patient": patient.pk, "heart_rate": 60 + i % 40, "blood_pressure": "120/80", "temperature": 37.0}
+                for i in range(200)
+            ],
+        }
+
+    def setUp(self):
+        principal_cache.clear()
+        token_cache.clear()
+        patient_card_cache.clear()
+
+    def request(self, key, method, path, role, data):
+        client = APIClient()
+        if role is not None:
+            client.force_authenticate(self.ctx["users"][role])
+        if role == "login":
+            Token.objects.get_or_create(user=self.ctx["users"]["login"])
+        payload = data(self.ctx) if data else None
+        response = getattr(client, method)(path(self.ctx), payload, format="json")
+        self.assertLess(response.status_code, 400, f"{key}: {response.status_code} {getattr(response, 'data', '')}")
+        if key == "token-refresh":
+            # Refresh tokens are single-use: carry the rotated one into the next request
+            self.ctx["refresh"] = response.data["refresh"]
+        return response
+
+    def measure(self, spec, iterations):
+        key = spec[0]
+        for _ in range(2):  # warm caches, render QR files, etc.
+            self.request(*spec)
+
+        timings, queries = [], 0
+        # Collector pauses land on random requests and swamp p99 on small samples
+        gc.collect()
+        gc.disable()
+        try:
+            for _ in range(iterations):
+                # Keep the throttled invalidation poll out of the per-request query count
+                poll_invalidations(force=True)
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    self.request(*spec)
+                    timings.append((time.perf_counter() - started) * 1000)
+                queries = max(queries, len(captured.captured_queries))
+        finally:
+            gc.enable()
+
+        tracemalloc.start()
+        try:
+            self.request(*spec)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return key, {
+            "queries": queries,
+            "p50_ms": round(percentile(timings, 0.50), 2),
+            "p99_ms": round(percentile(timings, 0.99), 2),
+            "peak_kb": round(peak / 1024, 1),
+        }
+
+    def regressions(self, results, baseline):
+        # p99 of a few dozen samples is close to the max, so it gets more slack than p50
+        latency_limits = {} if os.environ.get("BENCH_LATENCY") != "1" else {
+            "p50_ms": (_env_float("BENCH_LATENCY_TOLERANCE", 2.0), _env_float("BENCH_LATENCY_FLOOR_MS", 5)),
+            "p99_ms": (_env_float("BENCH_P99_TOLERANCE", 3.0), _env_float("BENCH_P99_FLOOR_MS", 15)),
+        }
+        memory_tolerance = _env_float("BENCH_MEMORY_TOLERANCE", 1.5)
+        memory_floor = _env_float("BENCH_MEMORY_FLOOR_KB", 256)
+
+        problems = []
+        for key, result in results.items():
+            expected = baseline.get(key)
+            if expected is None:
+                problems.append(f"{key}: no baseline (run with BENCH_UPDATE_BASELINES=1)")
+                continue
+            if result["queries"] > expected["queries"]:
+                problems.append(f"{key}: {result['queries']} queries, baseline {expected['queries']}")
+            for metric, (tolerance, floor) in latency_limits.items():
+                if result[metric] > max(expected[metric] * tolerance, expected[metric] + floor):
+                    problems.append(f"{key}: {metric} {result[metric]}, baseline {expected[metric]}")
+            if result["peak_kb"] > max(expected["peak_kb"] * memory_tolerance, expected["peak_kb"] + memory_floor):
+                problems.append(f"{key}: peak {result['peak_kb']} KiB, baseline {expected['peak_kb']} KiB")
+        return problems
+
+    def test_every_route_has_a_benchmark(self):
+        covered = {spec[0] for spec in ENDPOINTS} | set(SKIPPED)
+        missing = [key for key in route_keys() if key not in covered]
+        self.assertEqual(missing, [], "Add these routes to ENDPOINTS in test_benchmarks.py")
+
+    def test_endpoints_against_baselines(self):
+        iterations = int(os.environ.get("BENCH_ITERATIONS", 20))
+        results = dict(self.measure(spec, iterations) for spec in ENDPOINTS)
+
+        if os.environ.get("BENCH_RESULTS"):
+            Path(os.environ["BENCH_RESULTS"]).write_text(json.dumps({self.scale: results}, indent=2) + "\n")
+
+        baselines = json.loads(BASELINES_PATH.read_text()) if BASELINES_PATH.exists() else {}
+        if os.environ.get("BENCH_UPDATE_BASELINES") == "1":
+            baselines[self.scale] = results
+            BASELINES_PATH.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+            return
+        if self.scale not in baselines:
+            self.skipTest(f"No committed baselines for scale {self.scale}")
+
+        problems = self.regressions(results, baselines[self.scale])
+        self.assertEqual(problems, [], "Performance regressions against benchmark_baselines.json")
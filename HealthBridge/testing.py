@@ -0,0 +1,58 @@
+# HealthBridge/testing.py
+
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext
+
+from .authentication import token_cache
+from .utils.invalidation import poll_invalidations
+from .utils.lookup import patient_card_cache
+from .utils.principal import principal_cache
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin for asserting how many SQL queries a block may run.
+
+        with self.assertQueryBudget(4):
+            self.client.get("/api/medical-records/")
+
+    On failure the message lists every captured statement, so an N+1 shows
+    up as the same SELECT repeated once per row.
+    """
+
+    def setUp(self):
+        super().setUp()
+        # Cached principals/tokens/cards would hide queries and can outlive
+        # the rows of a previous test (ids are reused after rollback).
+        principal_cache.clear()
+        token_cache.clear()
+        patient_card_cache.clear()
+
+    @contextmanager
+    def assertQueryBudget(self, budget, using=connection):
+        # The middleware's invalidation poll is throttled; run it now so it never lands in the block
+        poll_invalidations(force=True)
+        with CaptureQueriesContext(using) as captured:
+            yield captured
+        executed = len(captured.captured_queries)
+        if executed > budget:
+            statements = "\n".join(
+                f"{i}. {query['sql']}" for i, query in enumerate(captured.captured_queries, start=1)
+            )
+            self.fail(f"{executed} queries executed, budget is {budget}:\n{statements}")
+
+
+class TestRunner(DiscoverRunner):
+    """
+    The default runner, minus the tests tagged "benchmark" (HealthBridge/test_benchmarks.py):
+    they seed a synthetic dataset and time every endpoint, so they only run
+    when asked for with `manage.py test --tag benchmark`.
+    """
+
+    def __init__(self, *args, tags=None, exclude_tags=None, **kwargs):
+        if "benchmark" not in (tags or []):
+            exclude_tags = [*(exclude_tags or []), "benchmark"]
+        super().__init__(*args, tags=tags, exclude_tags=exclude_tags, **kwargs)
@@ -1,3 +1,1190 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+
+import jwt
+import numpy as np
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.storage import default_storage
+from django.db import DatabaseError
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .models import (
+    ArchivedPartition, AuthorityProfile, CacheInvalidation, CohortRecommendation, Consent, DoctorProfile, FeedEvent,
+    Hospital, HospitalAdminProfile, MedicalRecord, OutbreakAlert, OutbreakRollup, Profile, RecordTerm, Recommendation,
+    Scheme, SymptomKeyword, SymptomRule, Vital, VitalRollup,
+)
+from .testing import QueryBudgetMixin
+from .utils import archive, dashboard
+from .utils.anomaly import detect_anomalies, rolling_zscore
+from .utils.archive import archive_medical_records, archive_vitals, hot_cutoff
+from .utils.cache import LRUCache
+from .utils.dashboard import LOCK_KEY, get_dashboard_snapshot
+from .utils.invalidation import poll_invalidations
+from .utils.keys import (
+    fill_key_pool, forget_hospital_keys, generate_private_pem, get_private_key, key_pool_filler, key_pool_size,
+    private_key_path, public_key_cache, public_keys_dir, public_pem_from_private,
+)
+from .utils.lookup import lookup_patient_card, patient_card_cache
+from .utils.outbreak import rebuild_outbreak_rollup
+from .utils.principal import resolve_principal
+from .utils.qr import QRRenderer, qr_content_path, qr_digest
+from .utils.recommendation_engine import CohortRecommendationEngine
+from .utils.schemes import get_scheme_index, reassign_schemes
+from .utils.signed_qr import SignedQRError, sign_profile_qr, verify_signed_qr
+from .utils.symptom_matcher import get_symptom_matcher
+from .utils.synthetic import SyntheticDataset
+from .utils.tokens import TokenError, issue_token_pair, refresh_token_pair, user_from_claims, verify_token
+from .utils.vital_rollups import rebuild_vital_rollups
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """List and detail endpoints must cost a fixed number of queries, however many rows they return."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # bulk_create skips the post_save key provisioning for hospitals
+        cls.hospital, = Hospital.objects.bulk_create([Hospital(hospital_id="H-QB", name="Budget Hospital")])
+        cls.doctor_user = User.objects.create_user("qb-doctor")
+        cls.doctor_user.groups.add(Group.objects.get_or_create(name="Doctor")[0])
+        cls.doctor = DoctorProfile.objects.create(
+            user=cls.doctor_user, hospital=cls.hospital,
+            department="General", designation="MO", contact_number="100",
+        )
+        cls.authority_user = User.objects.create_user("qb-authority")
+        cls.authority_user.groups.add(Group.objects.get_or_create(name="Authority")[0])
+        cls.schemes = [Scheme.objects.create(name=f"Scheme {i}", description="", min_age=0, max_age=120) for i in range(3)]
+
+    def add_patients(self, count):
+        start = Profile.objects.count()
+        users = User.objects.bulk_create([User(username=f"qb-patient-{start + i}") for i in range(count)])
+        profiles = Profile.objects.bulk_create([
+            Profile(user=user, migrant_id=f"QB-{user.username}", age=40, gender="F",
+                    location="Kochi", home_hospital=self.hospital)
+            for user in users
+        ])
+        records = MedicalRecord.objects.bulk_create([
+            MedicalRecord(patient=profile, hospital=self.hospital, doctor=self.doctor,
+                          recurring_diseases="diabetes", current_symptoms="fever")
+            for profile in profiles
+        ])
+        for record in records:
+            record.eligible_schemes.set(self.schemes)
+        Recommendation.objects.bulk_create([
+            Recommendation(patient=profile, title="Check-up", description="Annual check-up")
+            for profile in profiles
+        ])
+        return profiles
+
+    def get(self, user, url, budget, **params):
+        client = APIClient()
+        client.force_authenticate(user)
+        with self.assertQueryBudget(budget):
+            response = client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response
+
+    def test_medical_record_list(self):
+        for count in (5, 40):
+            self.add_patients(count)
+            # principal (2) + page + eligible_schemes prefetch
+            self.get(self.doctor_user, "/api/medical-records/", 4)
+
+    def test_profile_list(self):
+        for count in (5, 40):
+            self.add_patients(count)
+            self.get(self.doctor_user, "/api/profiles/", 1)
+
+    def test_sparse_fieldset_list(self):
+        self.add_patients(40)
+        response = self.get(self.doctor_user, "/api/medical-records/", 3,
+                            fields="id,patient_username,hospital_name")
+        self.assertEqual(set(response.data["results"][0]), {"id", "patient_username", "hospital_name"})
+
+    def test_full_patient_info_by_qr(self):
+        profile = self.add_patients(1)[0]
+        for _ in range(10):
+            MedicalRecord.objects.bulk_create([MedicalRecord(patient=profile, hospital=self.hospital, doctor=self.doctor)])
+        # principal (2) + profile + records + eligible_schemes prefetch + recommendations
+        self.get(self.doctor_user, f"/api/patient-full-info/{profile.qr_code_uuid}/", 6)
+
+    def test_hospital_dashboard(self):
+        for count in (5, 40):
+            self.add_patients(count)
+            # principal (2) + records + eligible_schemes prefetch
+            self.get(self.authority_user, f"/api/hospital/{self.hospital.name}/", 4)
+
+
+class VitalIngestTests(QueryBudgetMixin, TestCase):
+    """Device uploads: bad rows are reported by position, good rows are stored in batches."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hospital, = Hospital.objects.bulk_create([Hospital(hospital_id="H-VI", name="Ingest Hospital")])
+        cls.device = User.objects.create_user("vi-device")
+        cls.device.groups.add(Group.objects.get_or_create(name="Doctor")[0])
+        DoctorProfile.objects.create(user=cls.device, hospital=cls.hospital,
+                                     department="ICU", designation="Monitor", contact_number="200")
+        users = User.objects.bulk_create([User(username=f"vi-patient-{i}") for i in range(2)])
+        cls.patients = Profile.objects.bulk_create([
+            Profile(user=user, migrant_id=f"VI-{i}", age=30, gender="M", location="Kochi", home_hospital=cls.hospital)
+            for i, user in enumerate(users)
+        ])
+
+    def post(self, body, content_type):
+        client = APIClient()
+        client.force_authenticate(self.device)
+        return client.generic("POST", "/api/vitals/ingest/", body, content_type=content_type)
+
+    def test_json_array_with_rejects(self):
+        readings = [
+            {"patient": self.patients[0].pk, "timestamp": "2026-01-05T08:30:00Z", "heart_rate": 72},
+            {"patient_uuid": str(self.patients[1].qr_code_uuid), "blood_pressure": "128/84", "temperature": 37.2},
+            {"patient": 10 ** 9, "heart_rate": 60},
+            {"patient": self.patients[0].pk, "blood_pressure": "80/120"},
+            {"patient": self.patients[0].pk},
+        ]
+        with self.settings(VITALS_INGEST_BATCH_SIZE=2):
+            response = self.post(json.dumps(readings), "application/json")
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual((response.data["accepted"], response.data["rejected"]), (2, 3))
+        self.assertEqual([error["index"] for error in response.data["errors"]], [2, 3, 4])
+
+        vital = Vital.objects.get(patient=self.patients[0])
+        self.assertEqual((vital.hospital_id, vital.heart_rate), (self.hospital.pk, 72))
+        self.assertEqual(vital.timestamp.isoformat(), "2026-01-05T08:30:00+00:00")
+
+    def test_ndjson_stream(self):
+        lines = [json.dumps({"patient": self.patients[i % 2].pk, "heart_rate": 60 + i}) for i in range(50)]
+        with self.settings(VITALS_INGEST_BATCH_SIZE=20), self.assertQueryBudget(2 + 3 * 6):
+            # principal (2) + per batch of 20: patient lookup, savepoint, insert, hour and day upserts, release
+            response = self.post("\n".join(lines + ["{oops"]), "application/x-ndjson")
+        self.assertEqual(response.status_code, 207, response.data)
+        self.assertEqual(response.data["accepted"], 50)
+        self.assertEqual(response.data["errors"][0]["index"], 50)
+        self.assertEqual(Vital.objects.count(), 50)
+
+    def test_only_patients_the_hospital_may_treat(self):
+        other, = Hospital.objects.bulk_create([Hospital(hospital_id="H-VI-2", name="Other Hospital")])
+        users = User.objects.bulk_create([User(username=f"vi-other-{i}") for i in range(3)])
+        visitor, consented, staff = Profile.objects.bulk_create([
+            Profile(user=users[0], migrant_id="VI-OTHER-0", age=30, gender="F", location="Kochi", home_hospital=other),
+            Profile(user=users[1], migrant_id="VI-OTHER-1", age=30, gender="F", location="Kochi", home_hospital=other),
+            Profile(user=users[2], migrant_id="VI-OTHER-2", age=40, gender="F", location="Kochi", role="doctor",
+                    home_hospital=self.hospital),
+        ])
+        Consent.objects.create(patient=consented, from_hospital=other, to_hospital=self.hospital,
+                               purpose="treatment", expires_at=timezone.now() + timedelta(days=1),
+                               approved_by_patient=True, approved_by_to_hospital=True)
+        Consent.objects.create(patient=visitor, from_hospital=other, to_hospital=self.hospital,
+                               purpose="treatment", expires_at=timezone.now() - timedelta(days=1),
+                               approved_by_patient=True, approved_by_to_hospital=True)
+        readings = [
+            {"patient": self.patients[0].pk, "heart_rate": 70},
+            {"patient": visitor.pk, "heart_rate": 71},
+            {"patient_uuid": str(visitor.qr_code_uuid), "heart_rate": 72},
+            {"patient_uuid": str(consented.qr_code_uuid), "heart_rate": 73},
+            {"patient": staff.pk, "heart_rate": 74},
+        ]
+        response = self.post(json.dumps(readings), "application/json")
+        self.assertEqual(response.status_code, 207, response.data)
+        self.assertEqual([(error["index"], error["errors"]) for error in response.data["errors"]], [
+            (1, {"patient": ["Patient is not registered at or consented to this hospital"]}),
+            (2, {"patient": ["Patient is not registered at or consented to this hospital"]}),
+            (4, {"patient": ["Unknown patient"]}),
+        ])
+        self.assertEqual(set(Vital.objects.values_list("patient_id", flat=True)), {self.patients[0].pk, consented.pk})
+
+    def test_rollups_follow_ingest_and_edits(self):
+        patient = self.patients[0]
+        readings = [
+            {"patient": patient.pk, "timestamp": "2026-01-05T08:10:00Z", "heart_rate": 70, "blood_pressure": "120/80"},
+            {"patient": patient.pk, "timestamp": "2026-01-05T08:50:00Z", "heart_rate": 90, "temperature": 37.0},
+            {"patient": patient.pk, "timestamp": "2026-01-05T11:00:00Z", "blood_pressure": "140/90"},
+        ]
+        self.post(json.dumps(readings), "application/json")
+        vital = Vital.objects.get(patient=patient, heart_rate=90)
+        vital.blood_pressure = "BP 130 / 85"
+        vital.save()
+
+        client = APIClient()
+        client.force_authenticate(self.device)
+        hours = client.get(f"/get_patient_vitals/{patient.qr_code_uuid}/?resolution=hour").json()
+        self.assertEqual([point["count"] for point in hours], [2, 1])
+        self.assertEqual(hours[0]["heart_rate"], {"min": 70, "max": 90, "avg": 80})
+        self.assertEqual(hours[0]["systolic"], {"min": 120, "max": 130, "avg": 125})
+        days = client.get(f"/get_patient_vitals/{patient.qr_code_uuid}/?resolution=day&from=2026-01-05").json()
+        self.assertEqual((len(days), days[0]["count"], days[0]["systolic"]["max"]), (1, 3, 140))
+
+        stored = sorted(VitalRollup.objects.values_list("resolution", "bucket", "count", "systolic_sum"))
+        rebuild_vital_rollups()
+        self.assertEqual(sorted(VitalRollup.objects.values_list("resolution", "bucket", "count", "systolic_sum")), stored)
+
+
+class SyntheticDataTests(TestCase):
+    """The generator writes the rows it reports, and a seed always yields the same dataset."""
+
+    def generate(self, prefix, seed=7):
+        dataset = SyntheticDataset(30, seed=seed, prefix=prefix)
+        dataset.prepare()
+        dataset.run(chunk_size=8)
+        return dataset, Profile.objects.filter(migrant_id__startswith=f"{prefix.upper()}-").order_by("migrant_id")
+
+    def content(self, patients):
+        hospitals = {pk: i for i, pk in enumerate(sorted({patient.home_hospital_id for patient in patients}))}
+        return (
+            [(p.age, p.gender, p.location, p.blood_group, hospitals[p.home_hospital_id]) for p in patients],
+            list(MedicalRecord.objects.filter(patient__in=patients).order_by("id")
+                 .values_list("recurring_diseases", "current_symptoms")),
+            list(Vital.objects.filter(patient__in=patients).order_by("id")
+                 .values_list("heart_rate", "blood_pressure", "temperature")),
+            Consent.objects.filter(patient__in=patients).count(),
+        )
+
+    def test_row_counts(self):
+        dataset, patients = self.generate("sd")
+        self.assertEqual(patients.count(), 30)
+        counts = [model.objects.filter(patient__in=patients).count() for model in (MedicalRecord, Vital, Recommendation)]
+        self.assertEqual(counts, [60, 90, 30])
+        consents = Consent.objects.filter(patient__in=patients).count()
+        # user, Patient group membership and profile per patient
+        self.assertEqual(dataset.rows, 3 * 30 + sum(counts) + consents)
+        self.assertEqual(User.objects.filter(username__startswith="sd-patient-", groups__name="Patient").count(), 30)
+
+    def test_same_seed_same_dataset(self):
+        first = self.content(self.generate("sa")[1])
+        self.assertEqual(self.content(self.generate("sb")[1]), first)
+        self.assertNotEqual(self.content(self.generate("sc", seed=8)[1]), first)
+
+
+class ArchiveTests(TestCase):
+    """Archived vitals and records still come back from the read endpoints, and rollups keep their counts."""
+
+    def setUp(self):
+        self.archive = tempfile.mkdtemp(prefix="healchain-archive-")
+        self.addCleanup(shutil.rmtree, self.archive, ignore_errors=True)
+        settings = self.settings(ARCHIVE_ROOT=self.archive)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        hospital, = Hospital.objects.bulk_create([Hospital(hospital_id="H-AR", name="Archive Hospital")])
+        self.doctor_user = User.objects.create_user("ar-doctor")
+        self.doctor_user.groups.add(Group.objects.get_or_create(name="Doctor")[0])
+        doctor = DoctorProfile.objects.create(user=self.doctor_user, hospital=hospital,
+                                              department="General", designation="MO", contact_number="300")
+        self.patient = Profile.objects.create(user=User.objects.create_user("ar-patient"), migrant_id="AR-1",
+                                              age=50, gender="F", location="Kochi")
+        scheme = Scheme.objects.create(name="Archive Scheme", description="", min_age=0, max_age=120)
+        now = timezone.now()
+        for days in (400, 200, 100, 5):
+            record = MedicalRecord.objects.create(patient=self.patient, hospital=hospital, doctor=doctor,
+                                                  current_symptoms=f"visit {days}")
+            MedicalRecord.objects.filter(pk=record.pk).update(treated_at=now - timedelta(days=days))
+            record.eligible_schemes.set([scheme])
+        for days in (120, 60, 40, 1):
+            Vital.objects.create(patient=self.patient, hospital=hospital, heart_rate=60 + days,
+                                 timestamp=now - timedelta(days=days))
+
+    def test_read_through(self):
+        client = APIClient()
+        client.force_authenticate(self.doctor_user)
+        vitals_url = f"/get_patient_vitals/{self.patient.qr_code_uuid}/"
+        info_url = f"/api/patient-full-info/{self.patient.qr_code_uuid}/"
+        vitals, info = client.get(vitals_url).json(), client.get(info_url).json()
+        rollups = sorted(VitalRollup.objects.values_list("resolution", "bucket", "count", "heart_rate_sum"))
+
+        self.assertEqual(archive_vitals(hot_cutoff(30)), 3)
+        # The newest record stays hot whatever its age
+        self.assertEqual(archive_medical_records(hot_cutoff(150)), 2)
+        self.assertEqual((Vital.objects.count(), MedicalRecord.objects.count()), (1, 2))
+
+        self.assertEqual(client.get(vitals_url).json(), vitals)
+        self.assertEqual(client.get(info_url).json(), info)
+        self.assertEqual(sorted(VitalRollup.objects.values_list("resolution", "bucket", "count", "heart_rate_sum")), rollups)
+        rebuild_vital_rollups()
+        self.assertEqual(sorted(VitalRollup.objects.values_list("resolution", "bucket", "count", "heart_rate_sum")), rollups)
+
+        since = (timezone.now() - timedelta(days=250)).date().isoformat()
+        recent = client.get(info_url, {"from": since}).json()["medical_records"]
+        self.assertEqual([record["current_symptoms"] for record in recent],
+                         [record["current_symptoms"] for record in info["medical_records"]][1:])
+
+    def test_late_vital_in_an_archived_bucket(self):
+        archived = Vital.objects.get(heart_rate=120)
+        self.assertEqual(archive_vitals(hot_cutoff(30)), 3)
+        hour = VitalRollup.objects.get(resolution=VitalRollup.HOUR, heart_rate_sum=120).bucket
+        late = Vital.objects.create(patient=self.patient, hospital=archived.hospital, heart_rate=90,
+                                    timestamp=hour + timedelta(minutes=59))
+        late.heart_rate = 100
+        late.save()
+
+        def bucket(resolution):
+            return VitalRollup.objects.filter(patient=self.patient, resolution=resolution, bucket__lte=hour) \
+                .values_list("count", "heart_rate_count", "heart_rate_min", "heart_rate_max", "heart_rate_sum") \
+                .order_by("-bucket").first()
+
+        self.assertEqual(bucket(VitalRollup.HOUR), (2, 2, 100, 120, 220))
+        self.assertEqual(bucket(VitalRollup.DAY), (2, 2, 100, 120, 220))
+        rebuilt = (bucket(VitalRollup.HOUR), bucket(VitalRollup.DAY))
+        rebuild_vital_rollups()
+        self.assertEqual((bucket(VitalRollup.HOUR), bucket(VitalRollup.DAY)), rebuilt)
+
+
+    def test_deleting_a_patient_purges_their_archive(self):
+        hospital, doctor = Hospital.objects.get(hospital_id="H-AR"), DoctorProfile.objects.get(user=self.doctor_user)
+        other = Profile.objects.create(user=User.objects.create_user("ar-other"), migrant_id="AR-2",
+                                       age=40, gender="M", location="Kochi")
+        old = timezone.now() - timedelta(days=300)
+        for patient in (self.patient, other):
+            for _ in range(2):  # the second one stays hot as the latest
+                record = MedicalRecord.objects.create(patient=patient, hospital=hospital, doctor=doctor,
+                                                      recurring_diseases="malaria")
+            MedicalRecord.objects.filter(pk=record.pk).update(treated_at=old)
+            Vital.objects.create(patient=patient, hospital=hospital, heart_rate=70, timestamp=old)
+        archive_vitals(hot_cutoff(30))
+        archive_medical_records(hot_cutoff(150))
+        malaria = lambda: sum(OutbreakRollup.objects.filter(disease="malaria").values_list("count", flat=True))
+        self.assertEqual(malaria(), 4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.patient.user.delete()
+        archived = {
+            name: ds.dataset(f"{self.archive}/{name}", format="parquet", partitioning="hive").to_table()
+            for name in ("vitals", "medical_records", "record_terms")
+        }
+        self.assertEqual(set(archived["vitals"]["patient_id"].to_pylist()), {other.pk})
+        self.assertEqual(set(archived["medical_records"]["patient_id"].to_pylist()), {other.pk})
+        self.assertEqual(set(archived["record_terms"]["record_id"].to_pylist()),
+                         set(archived["medical_records"]["id"].to_pylist()))
+        self.assertEqual(malaria(), 2)
+        rebuild_outbreak_rollup()
+        self.assertEqual(malaria(), 2)
+
+    def test_patient_deleted_while_their_vitals_move(self):
+        other = Profile.objects.create(user=User.objects.create_user("ar-other"), migrant_id="AR-2",
+                                       age=40, gender="M", location="Kochi")
+        Vital.objects.create(patient=other, hospital=Hospital.objects.get(hospital_id="H-AR"), heart_rate=70,
+                             timestamp=timezone.now() - timedelta(days=60))
+        write_parts = archive._write_parts
+
+        def write_then_delete(*args, **kwargs):
+            groups = write_parts(*args, **kwargs)
+            if self.patient.user.pk is not None:  # after the first month: nothing indexed yet, the rest still hot
+                self.patient.user.delete()
+            return groups
+
+        with mock.patch.object(archive, "_write_parts", write_then_delete):
+            archive_vitals(hot_cutoff(30))
+        archived = ds.dataset(f"{self.archive}/vitals", format="parquet", partitioning="hive").to_table()
+        self.assertEqual(set(archived["patient_id"].to_pylist()), {other.pk})
+        self.assertEqual(list(ArchivedPartition.objects.values_list("patient_id", flat=True)), [other.pk])
+
+    def test_purge_waits_for_the_partition_lock(self):
+        archive_vitals(hot_cutoff(30))
+        hospital, month = ArchivedPartition.objects.values_list("hospital", "month").first()
+        purge = threading.Thread(target=archive._rewrite_partition, args=(
+            "vitals", hospital, month, lambda table: pc.equal(table["patient_id"], self.patient.pk)))
+        with archive._partition_lock("vitals", hospital, month):
+            purge.start()
+            purge.join(0.2)
+            self.assertTrue(purge.is_alive())
+        purge.join(5)
+        self.assertFalse(purge.is_alive())
+        self.assertEqual(list(archive._partition_dir("vitals", hospital, month).glob("part-*.parquet")), [])
+
+
+class QRCodeTests(TestCase):
+    """Patient QR images are rendered off the request path, once per payload."""
+
+    def setUp(self):
+        media = tempfile.mkdtemp(prefix="healchain-media-")
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings = self.settings(MEDIA_ROOT=media, QR_RENDER_ASYNC=False)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_renderer_keeps_only_the_latest_payload(self):
+        rendering, release, rendered = threading.Event(), threading.Event(), []
+
+        def render(profile_id, payload):
+            rendered.append((profile_id, payload))
+            rendering.set()
+            release.wait(5)
+
+        renderer = QRRenderer()
+        with self.settings(QR_RENDER_ASYNC=True), mock.patch("HealthBridge.utils.qr.render_profile_qr", render):
+            renderer.submit(1, "first")
+            self.assertTrue(rendering.wait(5))
+            for payload in ("second", "third"):  # queued while "first" renders
+                renderer.submit(1, payload)
+            renderer.submit(2, "other")
+            release.set()
+            renderer.wait()
+        self.assertEqual(rendered, [(1, "first"), (1, "third"), (2, "other")])
+
+    def test_profile_saves_render_only_new_payloads(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            profile = Profile.objects.create(user=User.objects.create_user("qr-patient"), migrant_id="QR-1",
+                                             age=30, gender="F", location="Kochi")
+        profile.refresh_from_db()
+        self.assertEqual((profile.qr_code_image.name, profile.qr_code_payload), (qr_content_path("QR-1"), "QR-1"))
+
+        with mock.patch("HealthBridge.utils.qr.render_profile_qr") as render:
+            with self.captureOnCommitCallbacks(execute=True):
+                profile.age = 31
+                profile.save()
+            render.assert_not_called()
+            with self.captureOnCommitCallbacks(execute=True):
+                profile.awaz_id = "AWAZ-1"
+                profile.save()
+            render.assert_called_once_with(profile.pk, "AWAZ-1")
+
+    def test_image_endpoint_revalidates_by_payload_hash(self):
+        doctor = User.objects.create_user("qr-doctor")
+        doctor.groups.add(Group.objects.get_or_create(name="Doctor")[0])
+        profile = Profile.objects.create(user=User.objects.create_user("qr-patient"), migrant_id="QR-2",
+                                         age=30, gender="F", location="Kochi")
+        client = APIClient()
+        client.force_authenticate(doctor)
+        url, digest = f"/api/qr-code/{profile.qr_code_uuid}.svg", qr_digest("QR-2")
+
+        response = client.get(url)
+        self.assertEqual((response.status_code, response["Content-Type"]), (200, "image/svg+xml"))
+        self.assertEqual((response["ETag"], response["Cache-Control"]), (f'"{digest}.svg"', "private, no-cache"))
+        self.assertTrue(default_storage.exists(qr_content_path("QR-2", "svg")))
+
+        with mock.patch("HealthBridge.views.read_qr") as read:
+            response = client.get(url, {"v": digest[:16]}, HTTP_IF_NONE_MATCH=response["ETag"])
+            read.assert_not_called()
+        self.assertEqual((response.status_code, response["Cache-Control"]), (304, "private, max-age=31536000, immutable"))
+
+
+class KeyPoolTests(TestCase):
+    """New hospitals take a pre-generated key from the pool, and the pool refills behind them."""
+
+    def setUp(self):
+        keys = tempfile.mkdtemp(prefix="healchain-keys-")
+        self.addCleanup(shutil.rmtree, keys, ignore_errors=True)
+        settings = self.settings(HOSPITAL_KEYS_DIR=keys, KEY_POOL_AUTOFILL=False, KEY_POOL_TARGET=1, KEY_POOL_LOW_WATER=1)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def public_pem_on_disk(self, hospital_id):
+        with open(private_key_path(hospital_id)) as f:
+            return public_pem_from_private(f.read())
+
+    def test_claim_then_inline_then_refill(self):
+        self.assertEqual(fill_key_pool(), 1)
+        pooled = Hospital.objects.create(hospital_id="H-KP-1", name="Pooled Hospital")
+        self.assertEqual(key_pool_size(), 0)
+        self.assertEqual(pooled.public_key_pem, self.public_pem_on_disk("H-KP-1"))
+
+        with self.settings(KEY_POOL_AUTOFILL=True):
+            inline = Hospital.objects.create(hospital_id="H-KP-2", name="Inline Hospital")
+            key_pool_filler.wait()
+        self.assertEqual(inline.public_key_pem, self.public_pem_on_disk("H-KP-2"))
+        self.assertNotEqual(inline.public_key_pem, pooled.public_key_pem)
+        self.assertEqual(key_pool_size(), 1)
+
+    def test_only_generated_keys_skip_validation(self):
+        numbers = rsa.generate_private_key(public_exponent=65537, key_size=2048).private_numbers()
+        broken = rsa.RSAPrivateNumbers(  # CRT exponent no longer matches p
+            numbers.p, numbers.q, numbers.d, numbers.dmp1 + 2, numbers.dmq1, numbers.iqmp, numbers.public_numbers,
+        ).private_key(unsafe_skip_rsa_key_validation=True).private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+        ).decode()
+        with self.assertRaises(ValueError):
+            public_pem_from_private(broken)
+        self.assertTrue(public_pem_from_private(broken, generated=True).startswith("-----BEGIN PUBLIC KEY-----"))
+
+
+class SignedQRTests(TestCase):
+    """Signed codes verify offline, and nothing else signed by a hospital key passes as one."""
+
+    def setUp(self):
+        keys = tempfile.mkdtemp(prefix="healchain-keys-")
+        self.addCleanup(shutil.rmtree, keys, ignore_errors=True)
+        settings = self.settings(HOSPITAL_KEYS_DIR=keys, KEY_POOL_AUTOFILL=False)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        hospital = Hospital.objects.create(hospital_id="H-SQ", name="Signing Hospital")
+        self.doctor_user = User.objects.create_user("sq-doctor")
+        self.doctor_user.groups.add(Group.objects.get_or_create(name="Doctor")[0])
+        DoctorProfile.objects.create(user=self.doctor_user, hospital=hospital,
+                                     department="General", designation="MO", contact_number="400")
+        self.patient = Profile.objects.create(user=User.objects.create_user("sq-patient"), migrant_id="SQ-1",
+                                              age=30, gender="M", location="Kochi", home_hospital=hospital,
+                                              blood_group="O+")
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor_user)
+
+    def test_sign_and_verify(self):
+        code = sign_profile_qr(self.patient)
+        claims = verify_signed_qr(code)
+        self.assertEqual((claims["iss"], claims["typ"], claims["bg"]), ("H-SQ", "qr", "O+"))
+        response = self.client.post("/api/qr-lookup/", {"value": code}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["signed"]["pid"], claims["pid"])
+
+        with self.assertRaises(TokenError):
+            verify_token(code[len("HC1:"):])
+
+    def test_lookup_while_the_database_is_down(self):
+        code = sign_profile_qr(self.patient)
+        public_key_cache.clear()
+        down = mock.patch("django.db.models.query.QuerySet.__iter__", side_effect=DatabaseError("down"))
+        with down, self.settings(INVALIDATION_POLL_INTERVAL=0):
+            response = self.client.post("/api/qr-lookup/", {"value": code}, format="json")
+        self.assertEqual((response.status_code, response.data["offline"]), (200, True))
+
+        # A peer's code verifies against its preloaded public key
+        private_path = private_key_path("H-SQ")
+        os.makedirs(public_keys_dir())
+        with open(private_path) as f:
+            public_pem = public_pem_from_private(f.read())
+        with open(os.path.join(public_keys_dir(), "H-SQ.pem"), "w") as f:
+            f.write(public_pem)
+        os.remove(private_path)
+        forget_hospital_keys("H-SQ")
+        with down:
+            self.assertEqual(verify_signed_qr(code)["pid"], self.patient.migrant_id)
+            with self.assertRaisesMessage(SignedQRError, "Unknown issuer"):
+                verify_signed_qr("HC1:" + jwt.encode({"pid": "x"}, "k" * 32, headers={"kid": "../H-SQ"}))
+
+    def test_tampered_code(self):
+        header, payload, signature = sign_profile_qr(self.patient).split(".")
+        forged = ".".join([header, payload[:-2] + ("AA" if payload[-2:] != "AA" else "BB"), signature])
+        with self.assertRaises(SignedQRError):
+            verify_signed_qr(forged)
+        response = self.client.post("/api/qr-verify/", {"code": forged}, format="json")
+        self.assertEqual((response.status_code, response.data["valid"]), (400, False))
+
+    def test_access_token_is_not_a_qr_code(self):
+        # A patient's access token carries an integer pid and is signed by the same key
+        code = "HC1:" + issue_token_pair(self.patient.user)["access"]
+        response = self.client.post("/api/qr-verify/", {"code": code}, format="json")
+        self.assertEqual((response.status_code, response.data["valid"]), (400, False))
+        response = self.client.post("/api/qr-lookup/", {"value": code}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+class SchemeAssignmentTests(TestCase):
+    """reassign_schemes writes only the eligibility that changed, chunk by chunk, and can resume."""
+
+    def test_reassign_in_chunks(self):
+        home, other = Hospital.objects.bulk_create([Hospital(hospital_id="H-SA-1", name="Home Hospital"),
+                                                    Hospital(hospital_id="H-SA-2", name="Other Hospital")])
+        everyone = Scheme.objects.create(name="Everyone", description="", min_age=0, max_age=120)
+        diabetic = Scheme.objects.create(name="Diabetic", description="", min_age=40, max_age=60,
+                                         applicable_diseases="Diabetes, hypertension")
+        local = Scheme.objects.create(name="Local", description="", min_age=0, max_age=120, hospital=other)
+        older, younger = [
+            Profile.objects.create(user=User.objects.create_user(f"sa-{age}"), migrant_id=f"SA-{age}",
+                                   age=age, gender="F", location="Kochi")
+            for age in (50, 20)
+        ]
+        records = MedicalRecord.objects.bulk_create([
+            MedicalRecord(patient=older, hospital=home, recurring_diseases=" DIABETES"),
+            MedicalRecord(patient=younger, hospital=home, recurring_diseases="diabetes"),
+            MedicalRecord(patient=older, hospital=other, recurring_diseases=""),
+        ])
+        records[1].eligible_schemes.set([diabetic])  # out of its age range
+        progress = []
+
+        self.assertEqual(reassign_schemes(chunk_size=2, progress=lambda *args: progress.append(args)), (3, 5, 1))
+        self.assertEqual([(done, total, last_id) for done, total, last_id, _, _ in progress],
+                         [(2, 3, records[1].pk), (3, 3, records[2].pk)])
+        self.assertEqual([set(record.eligible_schemes.all()) for record in records],
+                         [{everyone, diabetic}, {everyone}, {everyone, local}])
+
+        self.assertEqual(reassign_schemes(chunk_size=2), (3, 0, 0))
+        MedicalRecord.eligible_schemes.through.objects.filter(medicalrecord=records[0]).delete()
+        self.assertEqual(reassign_schemes(start_after=records[0].pk), (2, 0, 0))
+        self.assertEqual(reassign_schemes(MedicalRecord.objects.filter(hospital=home)), (2, 2, 0))
+
+
+class RecommendationRuleTests(TestCase):
+    """Rule-based recommendations are keyed by rule, so regenerating them never duplicates a row."""
+
+    def setUp(self):
+        patient = Profile.objects.create(user=User.objects.create_user("rr-patient"), migrant_id="RR-1",
+                                         age=55, gender="M", location="Kochi")
+        self.record = MedicalRecord.objects.create(patient=patient, recurring_diseases="Diabetes",
+                                                   current_symptoms="fever, cough")
+
+    def rules(self):
+        return dict(Recommendation.objects.filter(medical_record=self.record).values_list("rule_key", "id"))
+
+    def test_regenerating_writes_only_changes(self):
+        Recommendation.generate_ai_recommendations(self.record)
+        first = self.rules()
+        self.assertEqual(set(first), {"diabetes", "fever", "cough", "senior_checkup"})
+        with self.assertNumQueries(1):
+            Recommendation.generate_ai_recommendations(self.record)
+
+        Recommendation.objects.filter(pk=first["diabetes"]).update(read_by_patient=True)
+        self.record.current_symptoms = "cough, fatigue"
+        self.record.save()
+        Recommendation.generate_ai_recommendations(self.record)
+        second = self.rules()
+        self.assertEqual(set(second), {"diabetes", "cough", "fatigue", "senior_checkup"})
+        self.assertEqual((second["diabetes"], second["cough"]), (first["diabetes"], first["cough"]))
+        self.assertTrue(Recommendation.objects.get(pk=first["diabetes"]).read_by_patient)
+
+    def test_dedupe_command_merges_legacy_rows(self):
+        legacy = [Recommendation(patient=self.record.patient, medical_record=self.record, title="Fever Alert",
+                                 description="old wording", read_by_patient=read) for read in (False, True, False)]
+        Recommendation.objects.bulk_create(legacy)
+        call_command("dedupe_recommendations", stdout=StringIO())
+
+        survivor, = Recommendation.objects.filter(medical_record=self.record)
+        self.assertEqual((survivor.pk, survivor.rule_key, survivor.read_by_patient), (legacy[0].pk, "fever", True))
+        Recommendation.generate_ai_recommendations(self.record)
+        self.assertEqual(self.rules()["fever"], survivor.pk)
+
+
+class CohortRecommendationTests(TestCase):
+    """Cohort rules run over chunks of profiles and store only the recommendations that changed."""
+
+    def test_rules_follow_latest_vitals_and_terms(self):
+        now = timezone.now()
+        senior, young = [
+            Profile.objects.create(user=User.objects.create_user(f"cr-{i}"), migrant_id=f"CR-{i}",
+                                   age=age, gender=gender, location="Kochi")
+            for i, (age, gender) in enumerate([(65, "F"), (30, "M")])
+        ]
+        MedicalRecord.objects.create(patient=senior, recurring_diseases="Diabetes, hypertension", current_symptoms="Fever")
+        Vital.objects.create(patient=senior, temperature=37.0, timestamp=now - timedelta(days=1))
+        Vital.objects.create(patient=senior, temperature=101.2, blood_pressure="150/85", timestamp=now)  # Fahrenheit
+        Vital.objects.create(patient=young, temperature=37.0, heart_rate=110, timestamp=now)
+
+        def stored():
+            rules = {senior.pk: set(), young.pk: set()}
+            for patient_id, rule_key in CohortRecommendation.objects.values_list("patient_id", "rule_key"):
+                rules[patient_id].add(rule_key)
+            return rules
+
+        engine = CohortRecommendationEngine(chunk_size=1)
+        self.assertEqual(engine.run(), (2, 7, 0))
+        self.assertEqual(stored(), {
+            senior.pk: {"senior_schemes", "recurring_fever", "womens_wellness", "high_temperature",
+                        "high_blood_pressure", "cardiometabolic_screening"},
+            young.pk: {"high_heart_rate"},
+        })
+        self.assertEqual(engine.run(), (2, 0, 0))
+
+        Vital.objects.create(patient=young, heart_rate=72, timestamp=now + timedelta(minutes=5))
+        self.assertEqual(engine.run(Profile.objects.filter(pk=young.pk)), (1, 0, 1))
+        self.assertEqual(stored()[young.pk], set())
+
+
+class RecordTermTests(TestCase):
+    """Diseases and symptoms are indexed normalized, and edits only touch the terms that changed."""
+
+    def test_index_follows_edits_and_filters(self):
+        hospital, = Hospital.objects.bulk_create([Hospital(hospital_id="H-RT", name="Terms Hospital")])
+        doctor_user = User.objects.create_user("rt-doctor")
+        doctor_user.groups.add(Group.objects.get_or_create(name="Doctor")[0])
+        doctor = DoctorProfile.objects.create(user=doctor_user, hospital=hospital,
+                                              department="General", designation="MO", contact_number="500")
+        patient = Profile.objects.create(user=User.objects.create_user("rt-patient"), migrant_id="RT-1",
+                                         age=30, gender="F", location="Kochi")
+        record = MedicalRecord.objects.create(patient=patient, hospital=hospital, doctor=doctor,
+                                              recurring_diseases="Diabetes,  Asthma ,diabetes", current_symptoms="Cough")
+        MedicalRecord.objects.create(patient=patient, hospital=hospital, doctor=doctor, recurring_diseases="asthma")
+
+        def terms():
+            return dict(RecordTerm.objects.filter(record=record).values_list("term", "id"))
+
+        before = terms()
+        self.assertEqual(sorted(before), ["asthma", "cough", "diabetes"])
+        record.recurring_diseases = "asthma, Hypertension"
+        record.save()
+        after = terms()
+        self.assertEqual(sorted(after), ["asthma", "cough", "hypertension"])
+        self.assertEqual((after["asthma"], after["cough"]), (before["asthma"], before["cough"]))
+
+        client = APIClient()
+        client.force_authenticate(doctor_user)
+        for params, expected in (({"disease": " ASTHMA"}, 2), ({"disease": "hypertension", "symptom": "cough"}, 1),
+                                 ({"disease": "diabetes"}, 0)):
+            response = client.get("/api/medical-records/", params)
+            self.assertEqual(len(response.data["results"]), expected, params)
+
+
+class OutbreakRollupTests(TestCase):
+    """Counts are filed by hospital region (or patient location) and follow edits to either."""
+
+    def setUp(self):
+        self.hospital, = Hospital.objects.bulk_create([Hospital(hospital_id="H-OB", name="Outbreak Hospital", region="North")])
+        self.patient = Profile.objects.create(user=User.objects.create_user("ob-patient"), migrant_id="OB-1",
+                                              age=30, gender="F", location="Kochi")
+        MedicalRecord.objects.create(patient=self.patient, hospital=self.hospital, recurring_diseases="Dengue")
+        MedicalRecord.objects.create(patient=self.patient, recurring_diseases="dengue, malaria")
+
+    def counts(self):
+        return sorted(OutbreakRollup.objects.values_list("region", "disease", "count"))
+
+    def test_region_edits_move_counts(self):
+        self.assertEqual(self.counts(), [("Kochi", "dengue", 1), ("Kochi", "malaria", 1), ("North", "dengue", 1)])
+        self.hospital.region = "South"
+        self.hospital.save()
+        self.patient.location = "Kollam"
+        self.patient.save()
+        expected = [("Kollam", "dengue", 1), ("Kollam", "malaria", 1), ("South", "dengue", 1)]
+        self.assertEqual(self.counts(), expected)
+
+        # Changes that bypass signals are repaired by the rebuild
+        Hospital.objects.filter(pk=self.hospital.pk).update(region="")
+        rebuild_outbreak_rollup()
+        self.assertEqual(self.counts(), [("Kollam", "dengue", 2), ("Kollam", "malaria", 1)])
+
+    def test_profile_saves_without_a_move_skip_the_terms(self):
+        with mock.patch("HealthBridge.signals.replace_record_terms") as replace:
+            self.patient.age = 31
+            self.patient.save()
+            self.patient.save(update_fields=["age"])
+            replace.assert_not_called()
+            self.patient.location = "Kollam"
+            self.patient.save()
+            replace.assert_called_once()
+
+
+class DashboardSnapshotTests(TestCase):
+    """The authority dashboard recomputes once per TTL or data change, and never concurrently."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def add_patient(self, name):
+        Profile.objects.create(user=User.objects.create_user(name), migrant_id=name, age=30, gender="F", location="Kochi")
+
+    def test_writes_refresh_after_the_minimum_interval(self):
+        self.add_patient("ds-1")
+        with mock.patch("HealthBridge.utils.dashboard.compute_dashboard_metrics",
+                        wraps=dashboard.compute_dashboard_metrics) as compute:
+            with self.settings(AUTHORITY_DASHBOARD_TTL=60, AUTHORITY_DASHBOARD_MIN_REFRESH=60):
+                first = get_dashboard_snapshot()
+                self.assertEqual(get_dashboard_snapshot(), first)
+                self.add_patient("ds-2")  # stale, but refreshed too recently
+                self.assertEqual(get_dashboard_snapshot(), first)
+            self.assertEqual(compute.call_count, 1)
+
+            with self.settings(AUTHORITY_DASHBOARD_TTL=60, AUTHORITY_DASHBOARD_MIN_REFRESH=0):
+                cache.add(LOCK_KEY, 1)  # another worker is recomputing: serve the old snapshot
+                self.assertEqual(get_dashboard_snapshot(), first)
+                cache.delete(LOCK_KEY)
+                second = get_dashboard_snapshot()
+            self.assertEqual(compute.call_count, 2)
+        self.assertEqual((first["payload"]["total_migrants"], second["payload"]["total_migrants"]), (1, 2))
+        self.assertGreater(second["version"], first["version"])
+
+
+class OutbreakAlertTests(TestCase):
+    """Scores against a trailing baseline; re-runs keep only the alerts that still fire."""
+
+    def test_rolling_zscore(self):
+        counts = np.array([[2, 4, 2, 4, 9]], dtype=float)
+        expected, scores = rolling_zscore(counts, window=4, min_std=0.5)
+        self.assertTrue(np.isnan(scores[0, :4]).all())
+        # Baseline mean 3, std 1
+        self.assertEqual((expected[0, 4], scores[0, 4]), (3.0, 6.0))
+        _, flat = rolling_zscore(np.array([[2, 2, 2, 2, 5]], dtype=float), window=4, min_std=0.5)
+        self.assertEqual(flat[0, 4], 6.0)
+
+    def test_rerun_drops_alerts_that_no_longer_fire(self):
+        end = date(2026, 3, 31)
+        OutbreakRollup.objects.bulk_create([
+            OutbreakRollup(region="North", disease="dengue", day=end - timedelta(days=offset), count=2)
+            for offset in range(1, 40)
+        ] + [OutbreakRollup(region="North", disease="dengue", day=end, count=12)])
+        OutbreakAlert.objects.create(region="North", disease="dengue", day=end, method="ewma",
+                                     observed=1, expected=0, score=9)
+
+        detect_anomalies(days=40, methods=["zscore"], end=end)
+        alert = OutbreakAlert.objects.get(method="zscore")
+        self.assertEqual((alert.day, alert.observed, alert.score), (end, 12, 10.0))
+
+        # Backfilled records spread the spike out, so the re-run clears it; other methods are untouched
+        OutbreakRollup.objects.filter(day=end).update(count=2)
+        detect_anomalies(days=40, methods=["zscore"], end=end)
+        self.assertEqual(list(OutbreakAlert.objects.values_list("method", flat=True)), ["ewma"])
+
+
+class ChangeFeedTests(TestCase):
+    """Peers learn of deletes and revocations, and can backfill a patient once consent is granted."""
+
+    def setUp(self):
+        settings = self.settings(CHANGE_FEED_SETTLE_SECONDS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.source, self.peer = Hospital.objects.bulk_create([
+            Hospital(hospital_id="H-CF-A", name="Source Hospital"), Hospital(hospital_id="H-CF-B", name="Peer Hospital"),
+        ])
+        self.peer_user = User.objects.create_user("cf-peer")
+        self.peer_user.groups.add(Group.objects.get_or_create(name="Doctor")[0])
+        DoctorProfile.objects.create(user=self.peer_user, hospital=self.peer,
+                                     department="General", designation="MO", contact_number="600")
+        self.patients = [
+            Profile.objects.create(user=User.objects.create_user(f"cf-patient-{i}"), migrant_id=f"CF-{i}",
+                                   age=30, gender="F", location="Kochi", home_hospital=self.source)
+            for i in range(2)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.peer_user)
+
+    def consent(self, patient):
+        return Consent.objects.create(patient=patient, from_hospital=self.source, to_hospital=self.peer,
+                                      purpose="treatment", expires_at=timezone.now() + timedelta(days=30),
+                                      approved_by_patient=True, approved_by_to_hospital=True)
+
+    def record(self, patient):
+        return MedicalRecord.objects.create(patient=patient, hospital=self.source, current_symptoms="cough")
+
+    def feed(self, feed, **params):
+        response = self.client.get(f"/api/sync/{feed}/", params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def events(self):
+        return [(event["kind"], event["patient_id"], event["from_hospital_id"], event["feed"], event["object_id"])
+                for event in self.feed("events")["results"]]
+
+    def test_grant_backfills_rows_behind_the_cursor(self):
+        late, early = self.patients
+        self.consent(early)
+        behind = self.record(late)
+        self.record(early)
+        page = self.feed("medical_records")
+        self.assertEqual(len(page["results"]), 1)
+
+        self.consent(late)
+        self.assertIn(("grant", late.pk, self.source.pk, "", None), self.events())
+        self.assertEqual(self.feed("medical_records", cursor=page["next_cursor"])["results"], [])
+        backfill = self.feed("medical_records", patient=late.pk)["results"]
+        self.assertEqual([record["id"] for record in backfill], [behind.pk])
+
+    def test_deletes_and_revocations_reach_the_peer(self):
+        patient, other = self.patients
+        consent = self.consent(patient)
+        self.consent(other)
+        record = self.record(patient)
+        Vital.objects.create(patient=other, hospital=self.source, heart_rate=70)
+        FeedEvent.objects.all().delete()
+
+        record_id = record.pk
+        record.delete()
+        consent.approved_by_patient = False
+        consent.save()
+        other.user.delete()  # one event for the profile, none for its cascaded rows
+        self.assertEqual(self.events(), [
+            ("delete", patient.pk, None, "medical_records", record_id),
+            ("revoke", patient.pk, None, "", None),
+            ("delete", other.pk, None, "profiles", other.pk),
+        ])
+
+
+class InvalidationTests(TestCase):
+    """Edits made in one worker reach the in-process caches of the others through CacheInvalidation."""
+
+    def test_scheme_index_follows_other_workers(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Scheme.objects.create(name="Local", description="", min_age=0, max_age=120)
+        self.assertEqual(list(CacheInvalidation.objects.values_list("tag", flat=True)), ["scheme_index:"])
+        index = get_scheme_index()
+        self.assertEqual(poll_invalidations(force=True), 1)  # our own row: one rebuild, then nothing
+        self.assertIsNot(get_scheme_index(), index)
+        index = get_scheme_index()
+        self.assertEqual(poll_invalidations(force=True), 0)
+        self.assertIs(get_scheme_index(), index)
+
+        # Another worker saved a Scheme: only its log row reaches this process
+        Scheme.objects.bulk_create([Scheme(name="Remote", description="", min_age=0, max_age=120)])
+        CacheInvalidation.objects.create(tag="scheme_index:")
+        self.assertIs(get_scheme_index(), index)
+        poll_invalidations(force=True)
+        self.assertEqual(sorted(scheme["name"] for scheme in get_scheme_index().data.values()), ["Local", "Remote"])
+
+    def test_symptom_matcher_follows_other_workers(self):
+        rule = SymptomRule.objects.create(key="test-rash", title="Rash", description="Keep the skin dry")
+        matches = lambda: [match["key"] for match in get_symptom_matcher().match("itchy blotches on the arm")]
+        self.assertEqual(matches(), [])
+
+        # Another worker added a keyword: bulk_create skips this process's receivers
+        SymptomKeyword.objects.bulk_create([SymptomKeyword(rule=rule, keyword="blotches")])
+        CacheInvalidation.objects.create(tag="symptom_matcher:")
+        self.assertEqual(matches(), [])
+        poll_invalidations(force=True)
+        self.assertEqual(matches(), ["test-rash"])
+
+
+class TokenCacheTests(QueryBudgetMixin, TestCase):
+    """Cached token authentication still honours logout, password changes and other workers' revocations."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("tc-doctor", password="old-pass-1")
+        self.user.groups.add(Group.objects.get_or_create(name="Doctor")[0])
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def status(self):
+        return self.client.get("/api/profiles/").status_code
+
+    def test_second_request_skips_token_lookup(self):
+        self.assertEqual(self.status(), 200)
+        with self.assertQueryBudget(1):  # principal is cached too: only the page query
+            self.assertEqual(self.status(), 200)
+
+    def test_logout_and_password_change(self):
+        self.assertEqual(self.status(), 200)
+        self.assertEqual(self.client.post("/api/logout/").status_code, 204)
+        self.assertEqual(self.status(), 401)
+
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.assertEqual(self.status(), 200)
+        self.user.set_password("new-pass-2")
+        self.user.save()
+        self.assertEqual(self.status(), 401)
+
+    def test_revocation_from_another_worker(self):
+        self.assertEqual(self.status(), 200)
+        # Another worker deleted the token: this process only learns of it through the log
+        Token.objects.filter(pk=self.token.pk)._raw_delete("default")
+        CacheInvalidation.objects.create(tag=f"token:{self.token.key}")
+        poll_invalidations(force=True)
+        self.assertEqual(self.status(), 401)
+
+
+class SignedTokenTests(TestCase):
+    """Access/refresh pairs: issue, refresh once, expire, and end with logout or a password change."""
+
+    def setUp(self):
+        keys = tempfile.mkdtemp(prefix="healchain-keys-")
+        self.addCleanup(shutil.rmtree, keys, ignore_errors=True)
+        settings = self.settings(HOSPITAL_KEYS_DIR=keys, KEY_POOL_AUTOFILL=False)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        hospital = Hospital.objects.create(hospital_id="H-ST", name="Token Hospital")
+        self.user = User.objects.create_user("st-doctor", password="old-pass-1")
+        self.user.groups.add(Group.objects.get_or_create(name="Doctor")[0])
+        DoctorProfile.objects.create(user=self.user, hospital=hospital,
+                                     department="General", designation="MO", contact_number="500")
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post("/api/login/", {"username": "st-doctor", "password": "old-pass-1",
+                                                    "token_type": "jwt"}, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def refresh(self, token):
+        return self.client.post("/api/token/refresh/", {"refresh": token}, format="json")
+
+    def test_issue_and_refresh(self):
+        pair = self.login()
+        claims = verify_token(pair["access"])
+        self.assertEqual((claims["iss"], claims["sub"], claims["roles"]), ("H-ST", str(self.user.pk), ["Doctor"]))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {pair['access']}")
+        self.assertEqual(self.client.get("/api/profiles/").status_code, 200)
+
+        rotated = self.refresh(pair["refresh"])
+        self.assertEqual(rotated.status_code, 200)
+        # Reusing a spent refresh token looks like theft: every session of the user ends
+        self.assertEqual(self.refresh(pair["refresh"]).status_code, 401)
+        self.assertEqual(self.refresh(rotated.data["refresh"]).status_code, 401)
+
+    def test_expiry(self):
+        with self.settings(JWT_ACCESS_TTL=-60, JWT_REFRESH_TTL=-60, JWT_LEEWAY=0):
+            pair = issue_token_pair(self.user)
+        for token, expected_type in ((pair["access"], "access"), (pair["refresh"], "refresh")):
+            with self.assertRaisesMessage(TokenError, "Token expired"):
+                verify_token(token, expected_type)
+        with self.assertRaises(TokenError):
+            refresh_token_pair(pair["access"])
+
+    def test_logout_revokes_refresh_tokens(self):
+        pair = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {pair['access']}")
+        self.assertEqual(self.client.post("/api/logout/").status_code, 204)
+        self.client.credentials()
+        self.assertEqual(self.refresh(pair["refresh"]).status_code, 401)
+        self.assertEqual(self.refresh(self.login()["refresh"]).status_code, 200)
+
+    def test_password_change_revokes_refresh_tokens(self):
+        pair = self.login()
+        self.user.set_password("new-pass-2")
+        self.user.save()
+        self.assertEqual(self.refresh(pair["refresh"]).status_code, 401)
+
+
+    def test_hospital_key_only_vouches_for_its_own_staff(self):
+        other, = Hospital.objects.bulk_create([Hospital(hospital_id="H-ST-2", name="Other Hospital")])
+        claims = verify_token(self.login()["access"])
+        forged = lambda **changes: jwt.encode({**claims, **changes}, get_private_key("H-ST"), algorithm="RS256",
+                                              headers={"kid": "H-ST"})
+        with self.assertRaisesMessage(TokenError, "Token hospital does not match its signing key"):
+            verify_token(forged(hid=other.pk))
+        with self.assertRaisesMessage(TokenError, "Staff tokens must be signed by the default issuer"):
+            verify_token(forged(staff=True))
+
+        # The default issuer may sign for any hospital, and only its staff claim is honoured
+        self.user.is_staff = True
+        self.user.save()
+        with self.settings(JWT_DEFAULT_ISSUER="H-ST"):
+            claims = verify_token(issue_token_pair(self.user)["access"])
+            self.assertTrue(user_from_claims(claims).is_staff)
+            verify_token(forged(hid=other.pk))
+
+    def test_key_rotation_from_another_worker(self):
+        access = self.login()["access"]
+        verify_token(access)  # parses and caches the public key
+        # Another worker rotated the key: this process only learns of it through the log
+        Hospital.objects.filter(hospital_id="H-ST").update(public_key_pem=public_pem_from_private(generate_private_pem()))
+        verify_token(access)
+        CacheInvalidation.objects.create(tag="hospital_key:H-ST")
+        poll_invalidations(force=True)
+        with self.assertRaisesMessage(TokenError, "Invalid token"):
+            verify_token(access)
+
+class PatientCardCacheTests(TestCase):
+    """QR lookups resolve in one query, then come from the card cache until the patient changes."""
+
+    def setUp(self):
+        patient_card_cache.clear()
+        self.patient = Profile.objects.create(user=User.objects.create_user("pc-patient"), migrant_id="PC-1",
+                                              age=30, gender="M", location="Kochi")
+
+    def test_hit_after_miss(self):
+        hits = patient_card_cache.stats()["hits"]
+        for value in ("PC-1", str(self.patient.qr_code_uuid)):
+            with self.assertNumQueries(1):
+                card = lookup_patient_card(value)
+            with self.assertNumQueries(0):
+                self.assertEqual(lookup_patient_card(value), card)
+        self.assertEqual(patient_card_cache.stats()["hits"] - hits, 2)
+        self.assertIsNone(lookup_patient_card("PC-unknown"))
+
+    def test_profile_save_invalidates(self):
+        self.assertEqual(lookup_patient_card("PC-1")["location"], "Kochi")
+        self.patient.location = "Kollam"
+        self.patient.save()
+        self.assertEqual(lookup_patient_card("PC-1")["location"], "Kollam")
+
+    def test_other_workers_drop_cards(self):
+        self.assertEqual(lookup_patient_card("PC-1")["location"], "Kochi")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.patient.save()
+        self.assertIn(f"card:profile:{self.patient.pk}", CacheInvalidation.objects.values_list("tag", flat=True))
+
+        # Another worker edited the patient: only its log row reaches this process
+        lookup_patient_card("PC-1")
+        Profile.objects.filter(pk=self.patient.pk).update(location="Kollam")
+        CacheInvalidation.objects.create(tag=f"card:profile:{self.patient.pk}")
+        self.assertEqual(lookup_patient_card("PC-1")["location"], "Kochi")
+        poll_invalidations(force=True)
+        self.assertEqual(lookup_patient_card("PC-1")["location"], "Kollam")
+
+    def test_ttl_expiry(self):
+        cache = LRUCache(maxsize=2, ttl=60)
+        with mock.patch("HealthBridge.utils.cache.time.monotonic", return_value=1000.0):
+            cache.set("card", {"id": 1}, tags=["profile:1"])
+        with mock.patch("HealthBridge.utils.cache.time.monotonic", return_value=1059.0):
+            self.assertEqual(cache.get("card"), {"id": 1})
+        with mock.patch("HealthBridge.utils.cache.time.monotonic", return_value=1061.0):
+            self.assertIsNone(cache.get("card"))
+        self.assertEqual((cache.hits, cache.misses, len(cache._tags)), (1, 1, 0))
+
+
+class PermissionTests(QueryBudgetMixin, TestCase):
+    """Role and hospital scoping through the cached principal."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.home, cls.other = Hospital.objects.bulk_create([
+            Hospital(hospital_id="H-PA", name="Home Hospital"), Hospital(hospital_id="H-PB", name="Other Hospital"),
+        ])
+        cls.users = {}
+        for role, group in (("doctor", "Doctor"), ("authority", "Authority"), ("migrant", "Patient")):
+            cls.users[role] = User.objects.create_user(f"pm-{role}")
+            cls.users[role].groups.add(Group.objects.get_or_create(name=group)[0])
+        # SameHospital needs a doctor profile; creating any Profile also joins the Patient group
+        for role in ("doctor", "migrant"):
+            Profile.objects.create(user=cls.users[role], role=role, migrant_id=f"PM-{role}", age=35, gender="F",
+                                   location="Kochi", home_hospital=cls.home)
+        cls.users["doctor"].groups.remove(Group.objects.get(name="Patient"))
+        DoctorProfile.objects.create(user=cls.users["doctor"], hospital=cls.home,
+                                     department="General", designation="MO", contact_number="600")
+        patient = cls.users["migrant"].profile
+        cls.home_record, cls.other_record = MedicalRecord.objects.bulk_create([
+            MedicalRecord(patient=patient, hospital=cls.home), MedicalRecord(patient=patient, hospital=cls.other),
+        ])
+
+    def status(self, role, url):
+        client = APIClient()
+        client.force_authenticate(self.users[role])
+        return client.get(url).status_code
+
+    def test_role_endpoints(self):
+        expected = {
+            "/api/doctor/dashboard/": {"doctor": 200, "authority": 403, "migrant": 403},
+            "/api/authority/dashboard/": {"doctor": 403, "authority": 200, "migrant": 403},
+            "/api/migrant/dashboard/": {"doctor": 403, "authority": 403, "migrant": 200},
+        }
+        for url, statuses in expected.items():
+            self.assertEqual({role: self.status(role, url) for role in statuses}, statuses, url)
+
+    def test_same_hospital(self):
+        self.assertEqual(self.status("doctor", f"/api/medical-records/{self.home_record.pk}/"), 200)
+        self.assertEqual(self.status("doctor", f"/api/medical-records/{self.other_record.pk}/"), 403)
+        # Not a doctor at all, even for a record of the patient's own hospital
+        self.assertEqual(self.status("migrant", f"/api/medical-records/{self.home_record.pk}/"), 403)
+
+    def test_hospital_precedence(self):
+        def hospital_of(name, *profiles):
+            user = User.objects.create_user(name)
+            Profile.objects.create(user=user, migrant_id=name, age=35, gender="F", location="Kochi",
+                                   home_hospital=self.home)
+            for model, fields in profiles:
+                model.objects.create(user=user, **fields)
+            return resolve_principal(user).hospital_id
+
+        doctor = (DoctorProfile, {"hospital": self.other, "department": "ER", "designation": "MO", "contact_number": "1"})
+        self.assertEqual(hospital_of("pm-both", doctor, (HospitalAdminProfile, {"hospital": self.home})), self.other.pk)
+        self.assertEqual(hospital_of("pm-admin", (HospitalAdminProfile, {"hospital": self.other})), self.other.pk)
+        self.assertEqual(hospital_of("pm-official", (AuthorityProfile, {"department": "Health"})), self.home.pk)
+
+    def test_role_changes_reach_the_cached_principal(self):
+        doctor = self.users["doctor"]
+        self.assertEqual(self.status("doctor", "/api/doctor/dashboard/"), 200)
+        DoctorProfile.objects.filter(user=doctor).update(hospital=self.other)
+        Profile.objects.filter(user=doctor).update(role="migrant")
+        doctor.groups.clear()
+        self.assertEqual(self.status("doctor", "/api/doctor/dashboard/"), 403)
 
-# Create your tests here.
+        # Another worker moved the doctor back: only the log tells this process
+        Profile.objects.filter(user=doctor).update(role="doctor")
+        self.assertEqual(self.status("doctor", f"/api/medical-records/{self.other_record.pk}/"), 403)
+        CacheInvalidation.objects.create(tag=f"principal:{doctor.pk}")
+        poll_invalidations(force=True)
+        self.assertEqual(self.status("doctor", f"/api/medical-records/{self.other_record.pk}/"), 200)
@@ -1,5 +1,5 @@
 # HealthBridge/urls.py - CLEAN VERSION
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
 from HealthBridge.views import ai_symptom_recommendations
 from HealthBridge.views import my_profile
@@ -25,6 +25,16 @@ from .views import (
     authority_dashboard_metrics,
     get_patient_vitals,
     qr_scan_page,
+    qr_lookup_cache_stats,
+    patient_qr_image,
+    key_pool_status,
+    outbreak_alerts,
+    LogoutView,
+    TokenRefreshView,
+    verify_qr_codes,
+    change_feed,
+    auth_cache_stats,
+    vitals_ingest,
 )
 
 router = DefaultRouter()
@@ -41,17 +51,27 @@ urlpatterns = [
     path('api/recommend/<int:user_id>/', generate_recommendations),
     path('api/qr/<uuid:qr_uuid>/', get_patient_by_qr),
     path('api/outbreak-summary/', outbreak_summary),
+    path('api/outbreak-alerts/', outbreak_alerts, name='outbreak-alerts'),
+    path('api/sync/<str:feed>/', change_feed, name='change-feed'),
     path('api/dashboard/<int:user_id>/', user_dashboard),
     path('api/login/', CustomLoginView.as_view(), name='custom_login'),
+    path('api/logout/', LogoutView.as_view(), name='logout'),
+    path('api/qr-verify/', verify_qr_codes, name='qr-verify'),
+    path('api/token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
+    path('api/auth/cache-stats/', auth_cache_stats, name='auth-cache-stats'),
     path('api/patient-full-info/<uuid:qr_uuid>/', get_full_patient_info_by_qr),
     path('api/migrant/dashboard/', migrant_dashboard_data),
     path('api/doctor/dashboard/', doctor_dashboard_data),
     path('api/authority/dashboard/', authority_dashboard_data),
     path('get_patient_vitals/<uuid:uuid>/', get_patient_vitals),
+    path('api/vitals/ingest/', vitals_ingest, name='vitals-ingest'),
     path('authority_dashboard_metrics/', authority_dashboard_metrics),
     path('scan/', qr_scan_page, name='qr-scan'),
     path('api/qr-lookup/', QRLookupView.as_view(), name='qr-lookup'),
+    path('api/qr-lookup/cache-stats/', qr_lookup_cache_stats, name='qr-lookup-cache-stats'),
     path('api/ai-recommendations/', ai_symptom_recommendations, name='ai-recommendations'),
     path('api/my-profile/', my_profile, name='my-profile'),
+    path('api/key-pool/', key_pool_status, name='key-pool'),
+    re_path(r'^api/qr-code/(?P<qr_uuid>[0-9a-f-]{36})\.(?P<fmt>png|svg)$', patient_qr_image, name='patient-qr'),
 ]
 
@@ -0,0 +1,152 @@
+# HealthBridge/utils/anomaly.py
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+
+from HealthBridge.models import OutbreakAlert, OutbreakRollup
+
+
+def load_series(days=90, end=None):
+    """
+    Load daily counts for every region/disease pair seen in the last `days`
+    days as a dense matrix. Returns (keys, dates, counts) where `keys` is a
+    list of (region, disease), `dates` a DatetimeIndex and `counts` a float
+    array of shape (len(keys), len(dates)), zero-filled on days without records.
+    """
+    end = end or timezone.now().date()
+    start = end - timedelta(days=days - 1)
+    rows = OutbreakRollup.objects.filter(day__gte=start, day__lte=end).values_list("region", "disease", "day", "count")
+    frame = pd.DataFrame.from_records(list(rows), columns=["region", "disease", "day", "count"])
+    dates = pd.date_range(start, end, freq="D")
+    if frame.empty:
+        return [], dates, np.zeros((0, len(dates)))
+
+    frame["day"] = pd.to_datetime(frame["day"])
+    matrix = (
+        frame.pivot_table(index=["region", "disease"], columns="day", values="count", aggfunc="sum", fill_value=0)
+        .reindex(columns=dates, fill_value=0)
+    )
+    return list(matrix.index), dates, matrix.to_numpy(dtype=float)
+
+
+def _zscores(observed, mean, std, min_std):
+    return (observed - mean) / np.maximum(std, min_std)
+
+
+def rolling_zscore(counts, window=28, min_std=1.0):
+    """
+    Score every day against the mean/std of the preceding `window` days.
+    Window sums come from cumulative sums, so the cost is O(series x days)
+    regardless of the window length. Days without a full window score NaN.
+    """
+    n_series, n_days = counts.shape
+    expected = np.full(counts.shape, np.nan)
+    scores = np.full(counts.shape, np.nan)
+    if n_days <= window:
+        return expected, scores
+
+    zeros = np.zeros((n_series, 1))
+    csum = np.concatenate([zeros, np.cumsum(counts, axis=1)], axis=1)
+    csq = np.concatenate([zeros, np.cumsum(counts ** 2, axis=1)], axis=1)
+    # Baseline for day t covers days [t - window, t)
+    window_sum = csum[:, window:n_days] - csum[:, :n_days - window]
+    window_sq = csq[:, window:n_days] - csq[:, :n_days - window]
+    mean = window_sum / window
+    std = np.sqrt(np.maximum(window_sq / window - mean ** 2, 0.0))
+
+    expected[:, window:] = mean
+    scores[:, window:] = _zscores(counts[:, window:], mean, std, min_std)
+    return expected, scores
+
+
+def ewma_score(counts, alpha=0.3, min_std=1.0):
+    """
+    Score every day against the exponentially weighted mean/std of the days
+    before it. pandas evaluates all series (columns) in one pass.
+    """
+    frame = pd.DataFrame(counts.T)
+    mean = frame.ewm(alpha=alpha, adjust=False).mean().shift(1).to_numpy().T
+    std = frame.ewm(alpha=alpha, adjust=False).std().shift(1).to_numpy().T
+    std = np.nan_to_num(std, nan=0.0)
+    return mean, _zscores(counts, mean, std, min_std)
+
+
+def seasonal_residual(counts, weeks=4, min_std=1.0):
+    """
+    Score every day against the same weekday in the previous `weeks` weeks,
+    which removes the weekly clinic-attendance cycle from the baseline.
+    """
+    n_series, n_days = counts.shape
+    expected = np.full(counts.shape, np.nan)
+    scores = np.full(counts.shape, np.nan)
+    lag = 7 * weeks
+    if n_days <= lag:
+        return expected, scores
+
+    same_weekday = np.stack([counts[:, lag - 7 * k:n_days - 7 * k] for k in range(1, weeks + 1)])
+    mean = same_weekday.mean(axis=0)
+    std = same_weekday.std(axis=0)
+
+    expected[:, lag:] = mean
+    scores[:, lag:] = _zscores(counts[:, lag:], mean, std, min_std)
+    return expected, scores
+
+
+METHODS = {
+    "zscore": rolling_zscore,
+    "ewma": ewma_score,
+    "seasonal": seasonal_residual,
+}
+
+
+def detect_anomalies(days=90, horizon=1, threshold=3.0, min_count=3, methods=None, end=None):
+    """
+    Run the selected methods over every series and persist alerts for the
+    last `horizon` days whose score is at least `threshold` and whose observed
+    count is at least `min_count`. Re-running replaces the alerts of those
+    days and methods: hits are updated in place, alerts that no longer fire
+    are removed. Returns the list of OutbreakAlert objects written.
+    """
+    methods = list(methods or METHODS)
+    keys, dates, counts = load_series(days=days, end=end)
+    first_day = max(len(dates) - horizon, 0)
+    observed = counts[:, first_day:]
+    alerts = []
+    for method in methods if keys else []:
+        expected, scores = METHODS[method](counts)
+        expected, scores = expected[:, first_day:], scores[:, first_day:]
+        hits = np.argwhere((scores >= threshold) & (observed >= min_count))
+        for series_idx, day_idx in hits:
+            region, disease = keys[series_idx]
+            alerts.append(OutbreakAlert(
+                region=region,
+                disease=disease,
+                day=dates[first_day + day_idx].date(),
+                method=method,
+                observed=int(observed[series_idx, day_idx]),
+                expected=float(expected[series_idx, day_idx]),
+                score=float(scores[series_idx, day_idx]),
+            ))
+
+    fired = {(alert.region, alert.disease, alert.day, alert.method) for alert in alerts}
+    rescored = OutbreakAlert.objects.filter(
+        day__gte=dates[first_day].date(), day__lte=dates[-1].date(), method__in=methods
+    )
+    with transaction.atomic():
+        stale = [
+            pk for pk, *key in rescored.values_list("id", "region", "disease", "day", "method")
+            if tuple(key) not in fired
+        ]
+        OutbreakAlert.objects.filter(id__in=stale).delete()
+        OutbreakAlert.objects.bulk_create(
+            alerts,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["region", "disease", "day", "method"],
+            update_fields=["observed", "expected", "score", "created_at"],
+        )
+    return alerts
@@ -0,0 +1,536 @@
+# HealthBridge/utils/archive.py
+
+import json
+import os
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from django.db import transaction
+from django.db.models import Exists, Min, OuterRef, Subquery
+from django.utils import timezone
+from pyarrow import fs
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from HealthBridge.models import (
+    ArchivedPartition, DoctorProfile, Hospital, MedicalRecord, Profile, Recommendation, RecordTerm, Scheme, Vital,
+)
+from HealthBridge.utils.archive_state import RECORDS, TERMS, VITALS, archive_cutoff, table_root
+from HealthBridge.utils.bulk import delete_rows, insert_rows
+from HealthBridge.utils.outbreak import apply_rollup_deltas
+
+# -------------------------------
+# Parquet cold storage
+# -------------------------------
+# `manage.py archive_cold_data` moves vitals and medical records older than the
+# hot window out of the database into Parquet files under ARCHIVE_ROOT:
+#
+#   <table>/hospital=<id|none>/month=<YYYY-MM>/part-<run>.parquet
+#
+# Each run compacts the partitions it touched to one file sorted by patient.
+# ArchivedPartition lists the partitions holding each patient's rows, so a
+# history read opens only those files, memory-mapped, and the patient/time
+# filter is pushed down to skip row groups on their min/max statistics.
+# _state.json keeps the newest cutoff: ranges after it never touch the archive.
+#
+# A move writes the files first, then indexes them and deletes the rows with
+# raw DELETEs in one transaction. No signals fire, so VitalRollup and
+# OutbreakRollup keep counting archived rows (their rebuilds read the archive
+# too). Cutoffs are whole UTC days, so an hour or day rollup bucket is never
+# split between the database and the archive. If a run dies between the two
+# steps the rows exist in both places; readers keep one copy per id.
+#
+# Deleting a Profile cascades its database rows and ArchivedPartition entries;
+# once the delete commits, purge_patient_archive rewrites the partitions they
+# listed without the patient's vitals, records and record terms.
+#
+# Compaction and a purge's rewrite both list a partition's files and replace
+# them, so each holds the partition's lock file meanwhile: an archive run and
+# a purge in another process never rewrite the same files from different
+# listings. New files only ever appear beside the listed ones. A patient
+# deleted while their rows were being moved is purged by the archive run.
+
+ROW_GROUP_SIZE = 16384
+PARTITIONING = ds.partitioning(pa.schema([("hospital", pa.string()), ("month", pa.string())]), flavor="hive")
+ARROW_TYPES = {
+    "AutoField": pa.int64(),
+    "BigAutoField": pa.int64(),
+    "IntegerField": pa.int64(),
+    "PositiveIntegerField": pa.int64(),
+    "PositiveSmallIntegerField": pa.int64(),
+    "FloatField": pa.float64(),
+    "CharField": pa.string(),
+    "TextField": pa.string(),
+    "UUIDField": pa.string(),
+    "DateTimeField": pa.timestamp("us", tz="UTC"),
+    "DateField": pa.date32(),
+}
+
+# Memory-mapped reads: pages come from the OS cache instead of read() copies
+MMAP = fs.LocalFileSystem(use_mmap=True)
+
+
+def _arrow_schema(model, *extra):
+    columns = []
+    for field in model._meta.concrete_fields:
+        kind = field.target_field.get_internal_type() if field.is_relation else field.get_internal_type()
+        columns.append(pa.field(field.attname, ARROW_TYPES[kind]))
+    return pa.schema(columns + list(extra))
+
+
+VITAL_SCHEMA = _arrow_schema(Vital)
+RECORD_SCHEMA = _arrow_schema(MedicalRecord, pa.field("eligible_schemes", pa.list_(pa.int64())))
+TERM_SCHEMA = _arrow_schema(RecordTerm)
+
+
+def hot_cutoff(days, now=None):
+    """Start of the UTC day `days` days ago: rows older than this are archived."""
+    today = (now or timezone.now()).astimezone(dt_timezone.utc).date()
+    return datetime.combine(today - timedelta(days=days), time.min, tzinfo=dt_timezone.utc)
+
+
+def _month(moment):
+    return moment.astimezone(dt_timezone.utc).strftime("%Y-%m")
+
+
+# -------------------------------
+# Writing
+# -------------------------------
+def _write_parts(name, schema, rows, partition, sort_keys):
+    """
+    Write `rows` as one new file per (hospital, month) from partition(row).
+    Returns {(hospital, month): rows}.
+    """
+    groups = defaultdict(list)
+    for row in rows:
+        hospital, moment = partition(row)
+        groups[(str(hospital or "none"), _month(moment))].append(row)
+    run = uuid.uuid4().hex
+    for (hospital, month), group in groups.items():
+        table = pa.Table.from_pylist(group, schema=schema).sort_by([(key, "ascending") for key in sort_keys])
+        _write_file(_partition_dir(name, hospital, month), table, f"part-{run}.parquet")
+    return groups
+
+
+def _partition_dir(name, hospital, month):
+    return table_root(name) / f"hospital={hospital}" / f"month={month}"
+
+
+@contextmanager
+def _partition_lock(name, hospital, month):
+    """Hold an exclusive, cross-process lock on one partition."""
+    directory = _partition_dir(name, hospital, month)
+    directory.mkdir(parents=True, exist_ok=True)
+    # Readers skip dot-prefixed files; the OS drops the lock if the process dies
+    with open(directory / ".lock", "a+b") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            yield
+            return
+        handle.seek(0)
+        while True:
+            try:
+                msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                break
+            except OSError:  # gave up after ~10 s; keep waiting
+                continue
+        try:
+            yield
+        finally:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _write_file(directory, table, filename):
+    directory.mkdir(parents=True, exist_ok=True)
+    # Dot-prefixed files are ignored by readers until renamed
+    pq.write_table(table, directory / f".{filename}", row_group_size=ROW_GROUP_SIZE)
+    os.replace(directory / f".{filename}", directory / filename)
+
+
+def _index(name, groups):
+    """Record which partitions now hold each patient's rows."""
+    entries = {(row["patient_id"], hospital, month) for (hospital, month), rows in groups.items() for row in rows}
+    # A patient deleted since the rows were read has nothing left to index (see _drop_deleted)
+    existing = set(Profile.objects.filter(id__in={entry[0] for entry in entries}).values_list("id", flat=True))
+    entries = {entry for entry in entries if entry[0] in existing}
+    insert_rows(
+        ArchivedPartition,
+        [{"table": name, "patient_id": patient_id, "hospital": hospital, "month": month}
+         for patient_id, hospital, month in entries],
+        ignore_conflicts=True,
+    )
+
+
+def _compact(name, partitions, sort_keys):
+    """Merge each partition's files into one, so a read opens one file per partition."""
+    for hospital, month in partitions:
+        with _partition_lock(name, hospital, month):
+            files = sorted(_partition_dir(name, hospital, month).glob("part-*.parquet"))
+            if len(files) < 2:
+                continue
+            table = _unique_ids(ds.dataset([str(path) for path in files], format="parquet").to_table())
+            table = table.sort_by([(key, "ascending") for key in sort_keys])
+            _write_file(files[0].parent, table, f"part-{uuid.uuid4().hex}.parquet")
+            for path in files:
+                path.unlink()
+
+
+def _save_cutoff(name, cutoff):
+    previous = archive_cutoff(name)
+    root = table_root(name)
+    root.mkdir(parents=True, exist_ok=True)
+    (root / "._state.json").write_text(json.dumps({"cutoff": max(cutoff, previous or cutoff).isoformat()}))
+    os.replace(root / "._state.json", root / "_state.json")
+
+
+def _month_ranges(queryset, column, before):
+    """[start, end) UTC month ranges from the oldest `column` in queryset up to `before`."""
+    oldest = queryset.aggregate(oldest=Min(column))["oldest"]
+    if oldest is None:
+        return
+    start = datetime.combine(oldest.astimezone(dt_timezone.utc).date().replace(day=1), time.min, tzinfo=dt_timezone.utc)
+    while start < before:
+        end = (start + timedelta(days=32)).replace(day=1)
+        yield start, min(end, before)
+        start = end
+
+
+def _chunks(queryset, column, before, columns, chunk_size):
+    """
+    Rows of `queryset` with `column` before `before`, a month at a time in
+    primary-key chunks, so a chunk writes one file per hospital partition.
+    """
+    for start, end in _month_ranges(queryset.filter(**{f"{column}__lt": before}), column, before):
+        month = queryset.filter(**{f"{column}__gte": start, f"{column}__lt": end}).order_by("id")
+        last_id = 0
+        while True:
+            rows = list(month.filter(id__gt=last_id).values(*columns)[:chunk_size])
+            if not rows:
+                break
+            yield rows
+            last_id = rows[-1]["id"]
+
+
+def archive_vitals(before, chunk_size=50000, stdout=None):
+    """Move vitals timestamped before `before` to the archive. Returns the number moved."""
+    sort_keys = ["patient_id", "timestamp"]
+    touched = set()
+    moved = 0
+    for rows in _chunks(Vital.objects.all(), "timestamp", before, VITAL_SCHEMA.names, chunk_size):
+        groups = _write_parts(VITALS, VITAL_SCHEMA, rows, lambda row: (row["hospital_id"], row["timestamp"]), sort_keys)
+        _save_cutoff(VITALS, before)
+        with transaction.atomic():
+            _index(VITALS, groups)
+            delete_rows(Vital, [row["id"] for row in rows])
+        _drop_deleted(VITALS, groups)
+        touched.update(groups)
+        moved += len(rows)
+        if stdout is not None:
+            stdout.write(f"Archived {moved} vitals (through {rows[-1]['timestamp']:%Y-%m})")
+    _compact(VITALS, touched, sort_keys)
+    return moved
+
+
+def archivable_records(before):
+    """
+    Records treated before `before`, except each patient's latest record
+    (dashboards and scheme eligibility read it) and records a Recommendation
+    still points at.
+    """
+    latest = MedicalRecord.objects.filter(patient=OuterRef("patient")).order_by("-treated_at", "-id").values("id")[:1]
+    return (
+        MedicalRecord.objects.filter(treated_at__lt=before)
+        .exclude(id=Subquery(latest))
+        .exclude(Exists(Recommendation.objects.filter(medical_record=OuterRef("pk"))))
+    )
+
+
+def archive_medical_records(before, chunk_size=10000, stdout=None):
+    """
+    Move archivable_records(before) to the archive, with their eligible
+    scheme ids and RecordTerm rows. Returns the number moved.
+    """
+    columns = [name for name in RECORD_SCHEMA.names if name != "eligible_schemes"]
+    through = MedicalRecord.eligible_schemes.through
+    sort_keys = ["patient_id", "treated_at"]
+    touched, touched_terms = set(), set()
+    moved = 0
+    for rows in _chunks(archivable_records(before), "treated_at", before, columns, chunk_size):
+        for row in rows:
+            row["qr_code_uuid"] = str(row["qr_code_uuid"])
+        ids = [row["id"] for row in rows]
+        placement = {row["id"]: (row["hospital_id"], row["treated_at"]) for row in rows}
+        # Range scans on the indexed foreign keys, narrowed to this chunk in Python
+        schemes = defaultdict(list)
+        for record_id, scheme_id in through.objects.filter(
+            medicalrecord_id__gte=ids[0], medicalrecord_id__lte=ids[-1]
+        ).values_list("medicalrecord_id", "scheme_id"):
+            if record_id in placement:
+                schemes[record_id].append(scheme_id)
+        for row in rows:
+            row["eligible_schemes"] = sorted(schemes[row["id"]])
+        terms = [
+            term for term in RecordTerm.objects.filter(
+                record_id__gte=ids[0], record_id__lte=ids[-1]
+            ).values(*TERM_SCHEMA.names)
+            if term["record_id"] in placement
+        ]
+
+        groups = _write_parts(RECORDS, RECORD_SCHEMA, rows, lambda row: placement[row["id"]], sort_keys)
+        term_groups = _write_parts(TERMS, TERM_SCHEMA, terms, lambda term: placement[term["record_id"]], ["record_id"])
+        _save_cutoff(RECORDS, before)
+        _save_cutoff(TERMS, before)
+        with transaction.atomic():
+            _index(RECORDS, groups)
+            delete_rows(through, ids, field="medicalrecord")
+            delete_rows(RecordTerm, ids, field="record")
+            delete_rows(MedicalRecord, ids)
+        _drop_deleted(RECORDS, groups)
+        touched.update(groups)
+        touched_terms.update(term_groups)
+        moved += len(rows)
+        if stdout is not None:
+            stdout.write(f"Archived {moved} medical records (through {rows[-1]['treated_at']:%Y-%m})")
+    _compact(RECORDS, touched, sort_keys)
+    _compact(TERMS, touched_terms, ["record_id"])
+    return moved
+
+
+# -------------------------------
+# Purging
+# -------------------------------
+def _rewrite_partition(name, hospital, month, matches):
+    """
+    Rewrite one partition as a single file without the rows for which
+    matches(table) is true. Returns the removed rows (None if no files).
+    """
+    if not _partition_dir(name, hospital, month).is_dir():
+        return None
+    with _partition_lock(name, hospital, month):
+        files = sorted(_partition_dir(name, hospital, month).glob("part-*.parquet"))
+        if not files:
+            return None
+        table = _unique_ids(ds.dataset([str(path) for path in files], format="parquet").to_table())
+        mask = matches(table)
+        removed = table.filter(mask)
+        if removed.num_rows == 0:
+            return removed
+        kept = table.filter(pc.invert(mask))
+        if kept.num_rows:
+            _write_file(files[0].parent, kept, f"part-{uuid.uuid4().hex}.parquet")
+        for path in files:
+            path.unlink()
+        return removed
+
+
+def _drop_deleted(name, groups):
+    """
+    Rewrite the partitions a move just wrote without the rows of patients
+    deleted meanwhile: their delete saw neither the rows nor the partitions.
+    The cascade already took their database rows out of the rollups.
+    """
+    patients = {row["patient_id"] for rows in groups.values() for row in rows}
+    deleted = patients - set(Profile.objects.filter(id__in=patients).values_list("id", flat=True))
+    if not deleted:
+        return
+    value_set = pa.array(sorted(deleted), type=pa.int64())
+    for (hospital, month), rows in groups.items():
+        if not any(row["patient_id"] in deleted for row in rows):
+            continue
+        removed = _rewrite_partition(name, hospital, month, lambda table: pc.is_in(table["patient_id"], value_set=value_set))
+        if name == RECORDS and removed is not None and removed.num_rows:
+            ids = removed["id"].combine_chunks()
+            _rewrite_partition(TERMS, hospital, month, lambda table: pc.is_in(table["record_id"], value_set=ids))
+
+
+def purge_patient_archive(patient_id, partitions):
+    """
+    Remove a deleted patient's archived rows from `partitions`, the (table,
+    hospital, month) ArchivedPartition entries read before the delete, and
+    take their archived records out of OutbreakRollup. Returns the rows removed.
+    """
+    removed = 0
+    deltas = Counter()
+    for name, hospital, month in partitions:
+        rows = _rewrite_partition(name, hospital, month, lambda table: pc.equal(table["patient_id"], patient_id))
+        if rows is None:
+            continue
+        removed += rows.num_rows
+        if name != RECORDS or rows.num_rows == 0:
+            continue
+        # Terms are partitioned like their records and keyed by record id
+        terms = _rewrite_partition(TERMS, hospital, month,
+                                   lambda table: pc.is_in(table["record_id"], value_set=rows["id"].combine_chunks()))
+        if terms is None:
+            continue
+        for term in terms.filter(pc.equal(terms["kind"], RecordTerm.DISEASE)).to_pylist():
+            if term["day"] is not None:
+                deltas[(term["region"], term["term"], term["day"])] -= 1
+    apply_rollup_deltas(deltas)
+    return removed
+
+
+# -------------------------------
+# Reading
+# -------------------------------
+def _dataset(name):
+    """The whole archived table, partition columns included, or None when nothing was archived."""
+    if archive_cutoff(name) is None:
+        return None
+    return ds.dataset(str(table_root(name)), format="parquet", partitioning=PARTITIONING, filesystem=MMAP)
+
+
+def _patient_rows(name, patient_id, column, date_from, date_to, columns):
+    """
+    One patient's archived rows with `column` in [date_from, date_to), read
+    from only the partitions ArchivedPartition lists for them; None if none.
+    """
+    cutoff = archive_cutoff(name)
+    if cutoff is None or (date_from and date_from >= cutoff):
+        return None
+    partitions = ArchivedPartition.objects.filter(table=name, patient_id=patient_id)
+    condition = ds.field("patient_id") == patient_id
+    if date_from:
+        partitions = partitions.filter(month__gte=_month(date_from))
+        condition &= ds.field(column) >= date_from
+    if date_to:
+        partitions = partitions.filter(month__lte=_month(date_to))
+        condition &= ds.field(column) < date_to
+    directories = [_partition_dir(name, hospital, month) for hospital, month in partitions.values_list("hospital", "month")]
+    for attempt in range(2):
+        files = [str(path) for directory in directories for path in sorted(directory.glob("part-*.parquet"))]
+        if not files:
+            return None
+        try:
+            return _unique_ids(ds.dataset(files, format="parquet", filesystem=MMAP).to_table(columns=columns, filter=condition))
+        except FileNotFoundError:
+            if attempt:
+                raise  # a compaction replaced the files we listed; list them again
+
+
+def _months(name):
+    return sorted({path.name.split("=", 1)[1] for path in table_root(name).glob("hospital=*/month=*")})
+
+
+def _unique_ids(table):
+    """Drop repeated ids (left by an interrupted move), keeping the first copy."""
+    _, first = np.unique(table["id"].to_numpy(), return_index=True)
+    return table if len(first) == table.num_rows else table.take(np.sort(first))
+
+
+def archived_vitals(patient_id, date_from=None, date_to=None, limit=None):
+    """The patient's archived vitals in [date_from, date_to) as unsaved Vital instances, newest first."""
+    table = _patient_rows(VITALS, patient_id, "timestamp", date_from, date_to, VITAL_SCHEMA.names)
+    if table is None:
+        return []
+    table = table.sort_by([("timestamp", "descending"), ("id", "descending")])
+    if limit is not None:
+        table = table.slice(0, limit)
+    return [Vital(**row) for row in table.to_pylist()]
+
+
+def _prefetched(model, pks):
+    """A queryset that already holds `pks`, for a prefetch cache (only the pks are serialized)."""
+    queryset = model.objects.all()
+    queryset._result_cache = [model(pk=pk) for pk in pks]
+    queryset._prefetch_done = True
+    return queryset
+
+
+def archived_medical_records(profile, date_from=None, date_to=None):
+    """
+    The patient's archived records treated in [date_from, date_to), oldest
+    first, as unsaved MedicalRecord instances MedicalRecordSerializer can
+    render: doctors and hospitals cost one query each, schemes none (plus
+    the ArchivedPartition lookup).
+    """
+    table = _patient_rows(RECORDS, profile.pk, "treated_at", date_from, date_to, RECORD_SCHEMA.names)
+    if table is None:
+        return []
+    rows = table.sort_by([("treated_at", "ascending"), ("id", "ascending")]).to_pylist()
+    if not rows:
+        return []
+    doctors = DoctorProfile.objects.select_related("user").in_bulk({row["doctor_id"] for row in rows} - {None})
+    hospitals = Hospital.objects.in_bulk({row["hospital_id"] for row in rows} - {None})
+    records = []
+    for row in rows:
+        schemes = row.pop("eligible_schemes") or []
+        row["qr_code_uuid"] = uuid.UUID(row["qr_code_uuid"])
+        record = MedicalRecord(**row)
+        record.patient = profile
+        record.doctor = doctors.get(row["doctor_id"])
+        record.hospital = hospitals.get(row["hospital_id"])
+        record._prefetched_objects_cache = {"eligible_schemes": _prefetched(Scheme, schemes)}
+        records.append(record)
+    return records
+
+
+def _hour_rollups(table, metrics):
+    """Hour rollup rows (VitalRollup field names, plus patient_id and bucket) from a table of vitals."""
+    parts = ("count", "min", "max", "sum")
+    grouped = table.group_by(["patient_id", "bucket"]).aggregate(
+        [("id", "count")] + [(metric, part) for metric in metrics for part in parts]
+    )
+    for row in grouped.to_pylist():
+        rollup = {"patient_id": row["patient_id"], "bucket": row["bucket"], "count": row["id_count"]}
+        for metric in metrics:
+            rollup.update({f"{metric}_{part}": row[f"{metric}_{part}"] for part in parts})
+            rollup[f"{metric}_sum"] = rollup[f"{metric}_sum"] or 0
+        yield rollup
+
+
+def _with_hour(table):
+    return table.append_column("bucket", pc.floor_temporal(table["timestamp"], unit="hour"))
+
+
+def archived_vital_hours(metrics):
+    """Hour rollup rows aggregated from all the archived vitals, one month at a time."""
+    dataset = _dataset(VITALS)
+    if dataset is None:
+        return
+    for month in _months(VITALS):
+        table = _unique_ids(dataset.to_table(columns=["id", "patient_id", "timestamp", *metrics],
+                                             filter=ds.field("month") == month))
+        yield from _hour_rollups(_with_hour(table), metrics)
+
+
+def archived_vital_buckets(hours, metrics):
+    """
+    Hour rollup rows from the archived vitals in `hours` ({hour start:
+    {patient ids}}), reading only the partitions each patient is listed in.
+    """
+    starts_by_patient = defaultdict(set)
+    for start, patients in hours.items():
+        for patient_id in patients:
+            starts_by_patient[patient_id].add(start)
+    for patient_id, starts in starts_by_patient.items():
+        table = _patient_rows(VITALS, patient_id, "timestamp", min(starts), max(starts) + timedelta(hours=1),
+                              ["id", "patient_id", "timestamp", *metrics])
+        if table is None or table.num_rows == 0:
+            continue
+        table = _with_hour(table)
+        wanted = pa.array(sorted(starts), type=table["bucket"].type)
+        yield from _hour_rollups(table.filter(pc.is_in(table["bucket"], value_set=wanted)), metrics)
+
+
+def archived_disease_counts():
+    """{(region, disease, day): records} from the archived RecordTerm rows."""
+    dataset = _dataset(TERMS)
+    if dataset is None:
+        return {}
+    condition = (ds.field("kind") == RecordTerm.DISEASE) & ds.field("day").is_valid()
+    table = _unique_ids(dataset.to_table(columns=["id", "term", "region", "day"], filter=condition))
+    grouped = table.group_by(["region", "term", "day"]).aggregate([("id", "count")])
+    return {(row["region"], row["term"], row["day"]): row["id_count"] for row in grouped.to_pylist()}
@@ -0,0 +1,31 @@
+# HealthBridge/utils/archive_state.py
+
+import json
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+
+# -------------------------------
+# Archive cutoffs
+# -------------------------------
+# Where each archived table lives and how far it reaches, without importing
+# pyarrow: writers that only need to know whether a row may be archived
+# (e.g. a vital rollup refresh) check the cutoff first and load the archive
+# reader (HealthBridge/utils/archive.py) only when it is.
+
+VITALS = "vitals"
+RECORDS = "medical_records"
+TERMS = "record_terms"
+
+
+def table_root(name):
+    return Path(settings.ARCHIVE_ROOT) / name
+
+
+def archive_cutoff(name):
+    """Everything archived from table `name` is older than this; None when nothing is."""
+    try:
+        return datetime.fromisoformat(json.loads((table_root(name) / "_state.json").read_text())["cutoff"])
+    except FileNotFoundError:
+        return None
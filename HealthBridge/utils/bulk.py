@@ -0,0 +1,132 @@
+# HealthBridge/utils/bulk.py
+
+from django.db import connections
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+
+# -------------------------------
+# Raw bulk insert / delete
+# -------------------------------
+# bulk_create builds a model instance per row and runs every value through the
+# SQL compiler; for narrow, pre-validated rows that is most of the cost. This
+# writes plain dicts with a single executemany. It skips save(), signals and
+# returned primary keys, so callers either don't need ids or assign them.
+# With unique_fields/update_fields it upserts (ON CONFLICT ... DO UPDATE).
+# delete_rows is the matching raw DELETE, for moves that must not look like
+# deletes to signal handlers (rollups, indexes).
+
+# Bound the parameters in one DELETE (SQLite's limit is 999 on older builds)
+MAX_DELETE_PARAMS = 900
+
+
+def _column_getter(field, default, db):
+    """Return row -> database value for one column."""
+    name = field.attname
+    if callable(default):
+        def raw(row):
+            return row[name] if name in row else default()
+    else:
+        def raw(row):
+            return row.get(name, default)
+
+    kind = field.get_internal_type()
+    if kind in ("DateTimeField", "DateField"):
+        # Adapting datetimes dominates the Python side; repeated values are adapted once
+        prepared = {}
+
+        def get(row):
+            value = raw(row)
+            if value is None:
+                return None
+            if value not in prepared:
+                prepared[value] = field.get_db_prep_save(value, db)
+            return prepared[value]
+        return get
+    if kind in ("UUIDField", "DecimalField"):
+        def get(row):
+            value = raw(row)
+            return None if value is None else field.get_db_prep_save(value, db)
+        return get
+    return raw
+
+
+def _column_default(field, now):
+    if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False):
+        return now
+    if field.has_default() and callable(field.default):
+        # One timestamp per batch, as for auto_now; other callables (uuid4) per row
+        return now if field.default is timezone.now else field.default
+    return field.get_default()
+
+
+def insert_rows(model, rows, using="default", unique_fields=None, update_fields=None, ignore_conflicts=False):
+    """
+    INSERT `rows` (dicts keyed by attname) into the model's table with one
+    executemany. Columns not given fall back to the field default, so the
+    row shape follows the model; an auto primary key missing from the first
+    row is left to the database. Rows whose `unique_fields` already exist
+    get their `update_fields` overwritten instead; update_fields may also map
+    field names to SQL expressions over the table and EXCLUDED, to merge.
+    With ignore_conflicts, rows that violate a unique constraint are skipped.
+    """
+    if not rows:
+        return
+    db = connections[using]
+    now = timezone.now()
+    auto = model._meta.auto_field
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not (field is auto and field.attname not in rows[0])
+    ]
+    getters = [_column_getter(field, _column_default(field, now), db) for field in fields]
+    quote = db.ops.quote_name
+    on_conflict = OnConflict.IGNORE if ignore_conflicts else None
+    sql = "{} {} ({}) VALUES ({})".format(
+        db.ops.insert_statement(on_conflict=on_conflict),
+        quote(model._meta.db_table),
+        ", ".join(quote(field.column) for field in fields),
+        ", ".join(["%s"] * len(fields)),
+    )
+    if isinstance(update_fields, dict):
+        columns = {field.name: field.column for field in fields}
+        sql += " ON CONFLICT({}) DO UPDATE SET {}".format(
+            ", ".join(quote(columns[name]) for name in unique_fields),
+            ", ".join(f"{quote(columns[name])} = {expression}" for name, expression in update_fields.items()),
+        )
+    elif ignore_conflicts:
+        # SQLite says it in the INSERT OR IGNORE prefix, PostgreSQL in this suffix
+        sql = " ".join(filter(None, [sql, db.ops.on_conflict_suffix_sql(fields, on_conflict, None, None)]))
+    elif update_fields:
+        columns = {field.name: field.column for field in fields}
+        sql += " " + db.ops.on_conflict_suffix_sql(
+            fields,
+            OnConflict.UPDATE,
+            [columns[name] for name in update_fields],
+            [columns[name] for name in unique_fields],
+        )
+    params = [[get(row) for get in getters] for row in rows]
+    with db.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def delete_rows(model, values, field="id", using="default"):
+    """
+    DELETE the model's rows whose `field` is in `values`, in chunks, without
+    collecting related objects or sending signals. Returns the rows deleted.
+    """
+    db = connections[using]
+    quote = db.ops.quote_name
+    column = model._meta.get_field(field).column
+    values = list(values)
+    deleted = 0
+    with db.cursor() as cursor:
+        for start in range(0, len(values), MAX_DELETE_PARAMS):
+            chunk = values[start:start + MAX_DELETE_PARAMS]
+            cursor.execute(
+                "DELETE FROM {} WHERE {} IN ({})".format(
+                    quote(model._meta.db_table), quote(column), ", ".join(["%s"] * len(chunk))
+                ),
+                chunk,
+            )
+            deleted += cursor.rowcount
+    return deleted
@@ -0,0 +1,175 @@
+# HealthBridge/utils/change_feed.py
+
+import base64
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from HealthBridge.models import Consent, FeedEvent, MedicalRecord, Profile, Recommendation, Vital
+from HealthBridge.serializers import (
+    FeedEventSerializer,
+    MedicalRecordSerializer,
+    ProfileSerializer,
+    RecommendationSerializer,
+    VitalSerializer,
+)
+
+# -------------------------------
+# Change feed for federated sync
+# -------------------------------
+# A peer hospital pulls rows changed since its last cursor, ordered by
+# (updated_at, id). The cursor is the last row it received, so each page is
+# a single index range scan however large the table grows.
+#
+# Only rows covered by an active consent to the requesting hospital are
+# visible: records and vitals must originate at the consent's from_hospital;
+# profiles and recommendations (no provenance field) are scoped by patient.
+#
+# Rows younger than CHANGE_FEED_SETTLE_SECONDS are held back so that a
+# transaction committing late with an older updated_at is not skipped.
+#
+# What leaves no row behind goes to the "events" feed (FeedEvent), one per
+# hospital that could see the row, written in the same transaction:
+#   delete  a row the hospital may hold was deleted (a deleted profile takes
+#           all of the patient's rows with it)
+#   revoke  the hospital lost consent to the patient's rows from
+#           from_hospital_id, or to all of them when that is null
+#   grant   a consent became active (or was extended to expires_at); the
+#           patient's older rows are behind the peer's cursors, so it pulls
+#           them again with ?patient=<id> on each feed from an empty cursor
+# Consents that simply run out send nothing: the peer drops the rows at the
+# expires_at of the patient's latest grant.
+
+
+class CursorError(ValueError):
+    pass
+
+
+# feed name -> (model, serializer, patient field, provenance hospital field or None)
+FEEDS = {
+    "medical_records": (MedicalRecord, MedicalRecordSerializer, "patient_id", "hospital_id"),
+    "vitals": (Vital, VitalSerializer, "patient_id", "hospital_id"),
+    "profiles": (Profile, ProfileSerializer, "id", None),
+    "recommendations": (Recommendation, RecommendationSerializer, "patient_id", None),
+    "events": (FeedEvent, FeedEventSerializer, None, None),
+}
+
+
+def encode_cursor(updated_at, pk):
+    raw = f"{updated_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        stamp, pk = raw.rsplit("|", 1)
+        updated_at = parse_datetime(stamp)
+        pk = int(pk)
+    except (ValueError, UnicodeDecodeError):
+        raise CursorError("Invalid cursor")
+    if updated_at is None:
+        raise CursorError("Invalid cursor")
+    return updated_at, pk
+
+
+def live_consents(now=None):
+    return Consent.objects.filter(
+        approved_by_patient=True,
+        approved_by_to_hospital=True,
+        expires_at__gt=now or timezone.now(),
+    )
+
+
+def active_consents(hospital_id, now=None):
+    return live_consents(now).filter(to_hospital_id=hospital_id)
+
+
+def feed_queryset(feed, hospital_id, now=None):
+    """Rows of `feed` the hospital may receive, in cursor order."""
+    model, _, patient_field, provenance_field = FEEDS[feed]
+    if patient_field is None:
+        return model.objects.filter(hospital_id=hospital_id).order_by("updated_at", "id")
+    consent = active_consents(hospital_id, now).filter(patient_id=OuterRef(patient_field))
+    if provenance_field:
+        consent = consent.filter(from_hospital_id=OuterRef(provenance_field))
+    return model.objects.filter(Exists(consent)).order_by("updated_at", "id")
+
+
+def read_feed(feed, hospital_id, cursor=None, limit=None, patient_id=None):
+    """
+    Return one page: {"results", "next_cursor", "has_more"}.
+    Pass next_cursor back to continue; it is returned even on an empty page
+    so a caught-up peer can keep polling from the same position. With
+    patient_id, only that patient's rows (the backfill after a grant event).
+    """
+    limit = min(limit or getattr(settings, "CHANGE_FEED_PAGE_SIZE", 500),
+                getattr(settings, "CHANGE_FEED_MAX_PAGE_SIZE", 5000))
+    serializer_class = FEEDS[feed][1]
+
+    now = timezone.now()
+    queryset = feed_queryset(feed, hospital_id, now).filter(
+        updated_at__lte=now - timedelta(seconds=getattr(settings, "CHANGE_FEED_SETTLE_SECONDS", 2))
+    )
+    if patient_id is not None:
+        queryset = queryset.filter(**{FEEDS[feed][2]: patient_id})
+    if cursor:
+        updated_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pk))
+
+    rows = list(serializer_class.setup_eager_loading(queryset)[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1].updated_at, rows[-1].pk) if rows else cursor
+    return {
+        "results": serializer_class(rows, many=True).data,
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+    }
+
+
+# -------------------------------
+# Events
+# -------------------------------
+def record_deletion(feed, instance):
+    """Tell every hospital that could have received `instance` that it was deleted."""
+    _, _, patient_field, provenance_field = FEEDS[feed]
+    patient_id = getattr(instance, patient_field)
+    consents = live_consents().filter(patient_id=patient_id)
+    if provenance_field:
+        consents = consents.filter(from_hospital_id=getattr(instance, provenance_field))
+    FeedEvent.objects.bulk_create([
+        FeedEvent(hospital_id=hospital_id, kind=FeedEvent.DELETE, patient_id=patient_id, feed=feed, object_id=instance.pk)
+        for hospital_id in set(consents.values_list("to_hospital_id", flat=True))
+    ])
+
+
+def consent_scope(consent):
+    """(patient, from hospital, to hospital, expires_at) while the consent is active, else None."""
+    if consent is None or not consent.is_active():
+        return None
+    return consent.patient_id, consent.from_hospital_id, consent.to_hospital_id, consent.expires_at
+
+
+def record_consent_change(before, after):
+    """
+    Events for a consent whose consent_scope went from `before` to `after`
+    (saved already). A revocation is only sent once no other active consent
+    still covers the same rows.
+    """
+    if before and (after is None or before[:3] != after[:3]):
+        patient_id, from_hospital_id, to_hospital_id, _ = before
+        remaining = set(active_consents(to_hospital_id).filter(patient_id=patient_id).values_list(
+            "from_hospital_id", flat=True))
+        if not remaining:
+            FeedEvent.objects.create(hospital_id=to_hospital_id, kind=FeedEvent.REVOKE, patient_id=patient_id)
+        elif from_hospital_id not in remaining:
+            FeedEvent.objects.create(hospital_id=to_hospital_id, kind=FeedEvent.REVOKE, patient_id=patient_id,
+                                     from_hospital_id=from_hospital_id)
+    if after and after != before:
+        patient_id, from_hospital_id, to_hospital_id, expires_at = after
+        FeedEvent.objects.create(hospital_id=to_hospital_id, kind=FeedEvent.GRANT, patient_id=patient_id,
+                                 from_hospital_id=from_hospital_id, expires_at=expires_at)
@@ -0,0 +1,95 @@
+# HealthBridge/utils/dashboard.py
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from HealthBridge.models import MedicalRecord, Profile, Recommendation
+from HealthBridge.utils.outbreak import disease_counts
+
+SNAPSHOT_KEY = "authority_dashboard:snapshot"
+VERSION_KEY = "authority_dashboard:version"
+LOCK_KEY = "authority_dashboard:lock"
+
+
+def compute_dashboard_metrics():
+    total_migrants = Profile.objects.count()
+    eligible_count = MedicalRecord.objects.filter(eligible_schemes__isnull=False).count()
+    ai_alerts = Recommendation.objects.count()
+    region_data = (
+        Profile.objects.values('location').annotate(count=Count('id')).order_by('-count')
+    )
+    return {
+        "total_migrants": total_migrants,
+        "eligible_count": eligible_count,
+        "ai_alerts": ai_alerts,
+        "region_data": list(region_data),
+        "disease_data": list(disease_counts()),
+    }
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def mark_dashboard_stale():
+    """Bump the data version; the next read after the minimum refresh interval recomputes."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 1, timeout=None)
+
+
+def _is_fresh(snapshot, version, now):
+    age = now - snapshot["computed_at"]
+    if age >= settings.AUTHORITY_DASHBOARD_TTL:
+        return False
+    return snapshot["version"] == version or age < settings.AUTHORITY_DASHBOARD_MIN_REFRESH
+
+
+def _recompute(version):
+    snapshot = {
+        "version": version,
+        "computed_at": time.time(),
+        "payload": compute_dashboard_metrics(),
+    }
+    cache.set(SNAPSHOT_KEY, snapshot, timeout=None)
+    return snapshot
+
+
+def get_dashboard_snapshot():
+    """
+    Return the cached metrics snapshot, recomputing it when it is older than
+    AUTHORITY_DASHBOARD_TTL or the data version has moved on.
+    Recomputation is single-flight: the worker that wins cache.add() on the
+    lock recomputes while everyone else keeps serving the previous snapshot.
+    """
+    version = current_version()
+    snapshot = cache.get(SNAPSHOT_KEY)
+    if snapshot is not None and _is_fresh(snapshot, version, time.time()):
+        return snapshot
+
+    lock_timeout = settings.AUTHORITY_DASHBOARD_LOCK_TIMEOUT
+    if cache.add(LOCK_KEY, 1, timeout=lock_timeout):
+        try:
+            return _recompute(version)
+        finally:
+            cache.delete(LOCK_KEY)
+
+    if snapshot is not None:
+        return snapshot
+
+    # First request on a cold cache while another worker computes: wait for it.
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        snapshot = cache.get(SNAPSHOT_KEY)
+        if snapshot is not None:
+            return snapshot
+    return _recompute(version)
@@ -0,0 +1,65 @@
+# HealthBridge/utils/fieldsets.py
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import ManyRelatedField
+
+# -------------------------------
+# Sparse fieldsets (?fields=a,b,c)
+# -------------------------------
+# The serializer drops unrequested fields (SparseFieldsetMixin in
+# serializers.py) and the viewset narrows the SQL to the columns those
+# fields read, joining only the relations they traverse.
+
+
+def requested_fields(request):
+    """Field names from ?fields= on a read request, or None when not narrowing."""
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    value = request.query_params.get("fields")
+    if not value:
+        return None
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+def project_queryset(queryset, fields, always=()):
+    """
+    Restrict `queryset` with .only()/.select_related() to what the serializer
+    `fields` read. Falls back to the unmodified queryset when a field reads
+    something that is not a plain model column (methods, properties, "*").
+    Requested many-to-many fields are prefetched.
+    """
+    model = queryset.model
+    only = {model._meta.pk.name, *always}
+    related, prefetch = set(), set()
+
+    for field in fields.values():
+        if field.source == "*":
+            return queryset
+        if isinstance(field, ManyRelatedField):
+            prefetch.add(field.source)
+            continue
+
+        current, path = model, []
+        for position, attr in enumerate(field.source_attrs):
+            try:
+                model_field = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                return queryset
+            if model_field.many_to_many or model_field.one_to_many:
+                break
+            if not model_field.concrete:
+                return queryset
+            path.append(attr)
+            if position < len(field.source_attrs) - 1:
+                if not model_field.is_relation:
+                    return queryset
+                related.add("__".join(path))
+                current = model_field.related_model
+            only.add("__".join(path))
+
+    if related:
+        queryset = queryset.select_related(*related)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset.only(*only)
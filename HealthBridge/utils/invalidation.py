@@ -0,0 +1,99 @@
+# HealthBridge/utils/invalidation.py
+
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+# -------------------------------
+# Cross-process cache invalidation
+# -------------------------------
+# Compiled indexes and cached tokens live in each worker's memory, and CACHES
+# is per-process LocMem by default, so an eviction made by the worker that
+# handled a write never reaches the others. Writers therefore also append the
+# evicted tag ("<channel>:<value>") to CacheInvalidation once their
+# transaction commits. InvalidationMiddleware polls the table at most every
+# INVALIDATION_POLL_INTERVAL seconds and hands new rows to the handler
+# registered for their channel, so other workers follow within that interval.
+#
+# Rows are read by created_at with an INVALIDATION_OVERLAP margin (late
+# commits, clock skew between hosts); rows already applied are skipped.
+
+PRUNE_EVERY = 1000
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+_lock = threading.Lock()
+_applied = set()   # (row id, created_at) of rows inside the overlap window
+_next_poll = 0.0
+_polled_at = None
+
+
+def register(channel, handler):
+    """Call handler(value) in every process for each published "<channel>:<value>"."""
+    _handlers[channel] = handler
+
+
+def publish(channel, value=""):
+    """
+    Tell the other processes to evict `channel:value`. The caller evicts its
+    own copy directly; the row is written when the current transaction commits.
+    """
+    from HealthBridge.models import CacheInvalidation
+
+    def write():
+        row = CacheInvalidation.objects.create(tag=f"{channel}:{value}")
+        if row.pk % PRUNE_EVERY == 0:
+            retention = getattr(settings, "INVALIDATION_RETENTION", 86400)
+            CacheInvalidation.objects.filter(created_at__lt=row.created_at - timedelta(seconds=retention)).delete()
+
+    transaction.on_commit(write)
+
+
+def poll_invalidations(force=False):
+    """Apply rows published since the last poll. Runs at most once per interval unless forced."""
+    global _next_poll, _polled_at
+    from HealthBridge.models import CacheInvalidation
+
+    now = time.monotonic()
+    if not force and now < _next_poll:
+        return 0
+    with _lock:
+        _next_poll = now + getattr(settings, "INVALIDATION_POLL_INTERVAL", 1)
+        overlap = timedelta(seconds=getattr(settings, "INVALIDATION_OVERLAP", 10))
+        started = timezone.now()
+        since = (_polled_at or started) - overlap
+        rows = list(CacheInvalidation.objects.filter(created_at__gte=since).order_by("id").values_list("id", "tag", "created_at"))
+        applied = 0
+        for pk, tag, created_at in rows:
+            if (pk, created_at) in _applied:
+                continue
+            _applied.add((pk, created_at))
+            channel, _, value = tag.partition(":")
+            handler = _handlers.get(channel)
+            if handler is not None:
+                handler(value)
+                applied += 1
+        _applied.difference_update([row for row in _applied if row[1] < since])
+        _polled_at = started
+        return applied
+
+
+class InvalidationMiddleware:
+    """Apply other workers' invalidations before the request touches any in-process cache."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            poll_invalidations()
+        except DatabaseError:
+            # Views that can work offline (signed QR lookups) still get their chance
+            logger.warning("Could not poll cache invalidations", exc_info=True)
+        return self.get_response(request)
@@ -0,0 +1,262 @@
+# HealthBridge/utils/keys.py
+
+import logging
+import os
+import re
+import threading
+import uuid
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.conf import settings
+from django.db import DatabaseError
+
+from HealthBridge.utils.cache import LRUCache
+from HealthBridge.utils.invalidation import publish, register
+
+logger = logging.getLogger(__name__)
+
+
+def keys_dir():
+    return getattr(settings, "HOSPITAL_KEYS_DIR", "keys")
+
+
+def pool_dir():
+    return os.path.join(keys_dir(), "pool")
+
+
+def public_keys_dir():
+    return getattr(settings, "HOSPITAL_PUBLIC_KEYS_DIR", "") or os.path.join(keys_dir(), "public")
+
+
+def private_key_path(hospital_id):
+    return os.path.join(keys_dir(), f"{hospital_id}_private.pem")
+
+
+def generate_private_pem():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    ).decode()
+
+
+def public_pem_from_private(private_pem, generated=False):
+    """
+    The public PEM matching `private_pem`. Only keys this node generated
+    (generated=True: the pool or an inline fallback) skip the RSA consistency
+    check, which is most of the parse cost; any other PEM is validated.
+    """
+    private_key = serialization.load_pem_private_key(
+        private_pem.encode(), password=None, unsafe_skip_rsa_key_validation=generated
+    )
+    return private_key.public_key().public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+
+
+# -------------------------------
+# Pre-generated key pool
+# -------------------------------
+# Each pooled key is one PEM file in keys/pool/. A key is claimed by moving its
+# file to keys/<hospital_id>_private.pem; os.replace is atomic, so two
+# processes can never hand out the same key.
+
+def _pooled_files():
+    try:
+        names = os.listdir(pool_dir())
+    except FileNotFoundError:
+        return []
+    return sorted(name for name in names if name.endswith(".pem"))
+
+
+def key_pool_size():
+    return len(_pooled_files())
+
+
+def add_pooled_key():
+    os.makedirs(pool_dir(), exist_ok=True)
+    name = uuid.uuid4().hex
+    tmp_path = os.path.join(pool_dir(), f"{name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(generate_private_pem())
+    os.replace(tmp_path, os.path.join(pool_dir(), f"{name}.pem"))
+
+
+def fill_key_pool(target=None):
+    """Generate keys until the pool holds `target` of them. Returns how many were added."""
+    target = getattr(settings, "KEY_POOL_TARGET", 20) if target is None else target
+    added = 0
+    while key_pool_size() < target:
+        add_pooled_key()
+        added += 1
+    return added
+
+
+def claim_pooled_key(dest_path):
+    """Move one pooled key to `dest_path` and return its PEM, or None if the pool is empty."""
+    for name in _pooled_files():
+        try:
+            os.replace(os.path.join(pool_dir(), name), dest_path)
+        except FileNotFoundError:
+            continue  # claimed by another process first
+        with open(dest_path, encoding="utf-8") as f:
+            return f.read()
+    return None
+
+
+class KeyPoolFiller:
+    """Refills the pool on a background thread; at most one refill runs at a time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def trigger(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="key-pool-filler", daemon=True)
+            self._thread.start()
+
+    def wait(self):
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        try:
+            fill_key_pool()
+        except Exception:
+            logger.exception("Key pool refill failed")
+
+
+key_pool_filler = KeyPoolFiller()
+
+
+def provision_hospital_key(hospital_id):
+    """
+    Give a hospital its private key file and return the matching public PEM.
+    Draws from the pool when possible and only generates inline when it is
+    empty; a background refill starts once the pool falls below the low-water mark.
+    """
+    os.makedirs(keys_dir(), exist_ok=True)
+    dest_path = private_key_path(hospital_id)
+
+    private_pem = claim_pooled_key(dest_path)
+    if private_pem is None:
+        logger.warning("Key pool empty; generating key for %s inline", hospital_id)
+        private_pem = generate_private_pem()
+        with open(dest_path, "w", encoding="utf-8") as f:
+            f.write(private_pem)
+
+    if getattr(settings, "KEY_POOL_AUTOFILL", True) and \
+            key_pool_size() < getattr(settings, "KEY_POOL_LOW_WATER", 5):
+        key_pool_filler.trigger()
+
+    return public_pem_from_private(private_pem, generated=True)
+
+
+# -------------------------------
+# Parsed key caches (token signing / verification)
+# -------------------------------
+# Parsing PEM is far more expensive than a signature check, so parsed keys
+# are kept per process. Both are evicted in every process when their Hospital
+# changes (through the invalidation log, see utils/invalidation.py).
+public_key_cache = LRUCache(maxsize=1024, ttl=getattr(settings, "PUBLIC_KEY_CACHE_TTL", 3600))
+_private_keys = {}
+_private_keys_lock = threading.Lock()
+
+
+def get_private_key(hospital_id):
+    """Parsed private key from keys/<hospital_id>_private.pem, or None if this node does not hold it."""
+    key = _private_keys.get(hospital_id)
+    if key is not None:
+        return key
+    try:
+        with open(private_key_path(hospital_id), "rb") as f:
+            pem = f.read()
+    except FileNotFoundError:
+        return None
+    key = serialization.load_pem_private_key(pem, password=None)
+    with _private_keys_lock:
+        _private_keys[hospital_id] = key
+    return key
+
+
+def get_issuer(hospital_id):
+    """(Hospital pk, parsed public key) for a hospital_id, or None; loaded from the database on first use."""
+    return _load_issuers([hospital_id]).get(hospital_id)
+
+
+def _evict_hospital_keys(hospital_id):
+    public_key_cache.delete(hospital_id)
+    with _private_keys_lock:
+        _private_keys.pop(hospital_id, None)
+
+
+def forget_hospital_keys(hospital_id):
+    """Stop using the parsed keys of a rotated or removed hospital, in every process."""
+    _evict_hospital_keys(hospital_id)
+    publish("hospital_key", hospital_id)
+
+
+register("hospital_key", _evict_hospital_keys)
+
+
+def get_public_keys(hospital_ids):
+    """
+    {hospital_id: parsed public key}, loading every cache miss in one query.
+    When the database is unreachable, misses fall back to offline_public_key
+    so signed QR codes still verify.
+    """
+    return {hospital_id: key for hospital_id, (_, key) in _load_issuers(hospital_ids, offline=True).items()}
+
+
+def offline_public_key(hospital_id):
+    """
+    The public key of a hospital this node holds the private key of, or one
+    preloaded as HOSPITAL_PUBLIC_KEYS_DIR/<hospital_id>.pem; None otherwise.
+    """
+    if not isinstance(hospital_id, str) or not re.fullmatch(r"[\w-]+", hospital_id):
+        return None  # ids come from unverified token headers; never let them name another path
+    private_key = get_private_key(hospital_id)
+    if private_key is not None:
+        return private_key.public_key()
+    try:
+        with open(os.path.join(public_keys_dir(), f"{hospital_id}.pem"), "rb") as f:
+            return serialization.load_pem_public_key(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def _load_issuers(hospital_ids, offline=False):
+    from HealthBridge.models import Hospital
+
+    issuers, missing = {}, []
+    for hospital_id in set(hospital_ids):
+        issuer = public_key_cache.get(hospital_id)
+        if issuer is None:
+            missing.append(hospital_id)
+        else:
+            issuers[hospital_id] = issuer
+    if not missing:
+        return issuers
+    try:
+        rows = list(Hospital.objects.filter(hospital_id__in=missing).values_list("pk", "hospital_id", "public_key_pem"))
+    except DatabaseError:
+        if not offline:
+            raise
+        # Not cached: these carry no hospital pk, which token verification needs
+        for hospital_id in missing:
+            key = offline_public_key(hospital_id)
+            if key is not None:
+                issuers[hospital_id] = (None, key)
+        return issuers
+    for pk, hospital_id, pem in rows:
+        if pem:
+            issuers[hospital_id] = (pk, serialization.load_pem_public_key(pem.encode()))
+            public_key_cache.set(hospital_id, issuers[hospital_id])
+    return issuers
@@ -0,0 +1,83 @@
+# HealthBridge/utils/lookup.py
+
+from uuid import UUID
+
+from django.conf import settings
+from django.db.models import Q
+
+from HealthBridge.utils.cache import LRUCache
+from HealthBridge.utils.invalidation import publish, register
+
+# Serialized patient cards keyed by the scanned identifier.
+patient_card_cache = LRUCache(
+    maxsize=getattr(settings, "QR_LOOKUP_CACHE_SIZE", 2048),
+    ttl=getattr(settings, "QR_LOOKUP_CACHE_TTL", 300),
+)
+
+
+def invalidate_cards(tag):
+    """Drop the cards tagged `tag` ("profile:3", "user:5", "hospital:1") in every process."""
+    patient_card_cache.invalidate_tag(tag)
+    publish("card", tag)
+
+
+register("card", patient_card_cache.invalidate_tag)
+
+
+def _as_uuid(value):
+    try:
+        return UUID(value)
+    except ValueError:
+        return None
+
+
+def resolve_profile(value):
+    """
+    Find the Profile matching a scanned identifier with a single query.
+    awaz_id, migrant_id and qr_code_uuid are all unique columns, so the OR
+    below is answered from their indexes. Precedence matches the old lookup
+    chain: awaz_id, then migrant_id, then qr_code_uuid.
+    """
+    from HealthBridge.models import Profile
+
+    condition = Q(awaz_id=value) | Q(migrant_id=value)
+    as_uuid = _as_uuid(value)
+    if as_uuid is not None:
+        condition |= Q(qr_code_uuid=as_uuid)
+
+    candidates = list(
+        Profile.objects.select_related("user", "home_hospital").filter(condition)[:3]
+    )
+    for matches in (
+        lambda p: p.awaz_id == value,
+        lambda p: p.migrant_id == value,
+        lambda p: as_uuid is not None and p.qr_code_uuid == as_uuid,
+    ):
+        for profile in candidates:
+            if matches(profile):
+                return profile
+    return None
+
+
+def lookup_patient_card(value):
+    """
+    Return the serialized patient card for an identifier, or None.
+    Cards are tagged with their profile, user and home hospital so that the
+    signals in HealthBridge/signals.py can drop them when any of those change.
+    """
+    from HealthBridge.serializers import PatientProfileSerializer
+
+    data = patient_card_cache.get(value)
+    if data is not None:
+        return data
+
+    profile = resolve_profile(value)
+    if profile is None:
+        return None
+
+    data = dict(PatientProfileSerializer(profile).data)
+    tags = [f"profile:{profile.pk}", f"user:{profile.user_id}"]
+    if profile.home_hospital_id:
+        tags.append(f"hospital:{profile.home_hospital_id}")
+    patient_card_cache.set(value, data, tags=tags)
+    return data
@@ -0,0 +1,86 @@
+# HealthBridge/utils/outbreak.py
+
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from HealthBridge.models import MedicalRecord, OutbreakRollup, RecordTerm
+
+
+def apply_rollup_deltas(deltas):
+    """
+    Add `deltas` ({(region, disease, day): +/-n}) to OutbreakRollup.
+    Counts are adjusted with F() expressions so concurrent writers never lose
+    an increment; buckets that fall to zero are removed.
+    """
+    for (region, disease, day), delta in deltas.items():
+        if not delta or day is None:
+            continue
+        bucket = OutbreakRollup.objects.filter(region=region, disease=disease, day=day)
+        with transaction.atomic():
+            if bucket.update(count=F("count") + delta):
+                if delta < 0:
+                    bucket.filter(count__lte=0).delete()
+                continue
+            if delta < 0:
+                continue
+            try:
+                with transaction.atomic():
+                    OutbreakRollup.objects.create(region=region, disease=disease, day=day, count=delta)
+            except IntegrityError:
+                # Another writer created the bucket first
+                bucket.update(count=F("count") + delta)
+
+
+def rebuild_outbreak_rollup(batch_size=1000):
+    """
+    Recompute OutbreakRollup from RecordTerm with one GROUP BY, plus the
+    terms of archived records. Terms still filed under a hospital region or
+    patient location that has since changed are moved first. Returns the
+    number of buckets.
+    """
+    from HealthBridge.utils.archive import archived_disease_counts  # pyarrow loads only for a rebuild
+    from HealthBridge.utils.terms import replace_record_terms  # terms imports this module
+
+    replace_record_terms(MedicalRecord.objects.all())
+    rows = (
+        RecordTerm.objects.filter(kind=RecordTerm.DISEASE, day__isnull=False)
+        .values("region", "term", "day")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    counts = Counter(archived_disease_counts())
+    for row in rows.iterator():
+        counts[(row["region"], row["term"], row["day"])] += row["count"]
+    buckets = [
+        OutbreakRollup(region=region, disease=disease, day=day, count=count)
+        for (region, disease, day), count in counts.items()
+    ]
+    with transaction.atomic():
+        OutbreakRollup.objects.all().delete()
+        OutbreakRollup.objects.bulk_create(buckets, batch_size=batch_size)
+    return len(buckets)
+
+
+def disease_counts(date_from=None, date_to=None, region=None, by=None):
+    """
+    Records per disease from the rollup, optionally restricted to a date range
+    and region and broken down further by "region" or "day".
+    Keeps the `recurring_diseases` / `count` keys the dashboards already use.
+    """
+    queryset = OutbreakRollup.objects.all()
+    if date_from:
+        queryset = queryset.filter(day__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(day__lte=date_to)
+    if region:
+        queryset = queryset.filter(region=region)
+
+    group = ["recurring_diseases"] + ([by] if by in ("region", "day") else [])
+    return (
+        queryset.annotate(recurring_diseases=F("disease"))
+        .values(*group)
+        .annotate(count=Sum("count"))
+        .order_by("-count", *group)
+    )
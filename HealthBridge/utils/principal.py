@@ -0,0 +1,124 @@
+# HealthBridge/utils/principal.py
+
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.contrib.auth.models import User
+
+from HealthBridge.utils.cache import LRUCache
+from HealthBridge.utils.invalidation import publish, register
+
+# Resolved principals keyed by auth token (or user id for session auth).
+principal_cache = LRUCache(
+    maxsize=getattr(settings, "PRINCIPAL_CACHE_SIZE", 4096),
+    ttl=getattr(settings, "PRINCIPAL_CACHE_TTL", 60),
+)
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Everything the permission classes need to know about the caller."""
+    user_id: int
+    groups: frozenset
+    profile_id: int = None
+    profile_role: str = None
+    hospital_id: int = None
+
+    def in_role(self, group, *profile_roles):
+        return group in self.groups or self.profile_role in profile_roles
+
+
+def resolve_principal(user):
+    """
+    Build a Principal with two queries: the user's group names, and one row
+    joining the reverse one-to-one profiles. The hospital is the doctor's
+    hospital, then the hospital admin's, then the profile's home hospital.
+
+    The old SameHospital tried authorityprofile.hospital second, but
+    AuthorityProfile has no hospital, so that step always fell through.
+    Hospital admins take its place: they are scoped to the hospital they
+    administer, not to their home hospital as a patient.
+    """
+    groups = frozenset(user.groups.values_list("name", flat=True))
+    row = User.objects.filter(pk=user.pk).values(
+        "profile__id", "profile__role", "profile__home_hospital_id", "doctorprofile__hospital_id",
+        "hospitaladminprofile__hospital_id",
+    ).first() or {}
+    return Principal(
+        user_id=user.pk,
+        groups=groups,
+        profile_id=row.get("profile__id"),
+        profile_role=row.get("profile__role"),
+        hospital_id=(
+            row.get("doctorprofile__hospital_id")
+            or row.get("hospitaladminprofile__hospital_id")
+            or row.get("profile__home_hospital_id")
+        ),
+    )
+
+
+def principal_from_claims(claims):
+    """Principal carried by a verified signed access token (utils/tokens.py)."""
+    return Principal(
+        user_id=int(claims["sub"]),
+        groups=frozenset(claims.get("roles", ())),
+        profile_id=claims.get("pid"),
+        profile_role=claims.get("prole"),
+        hospital_id=claims.get("hid"),
+    )
+
+
+def _cache_key(request):
+    token = getattr(request, "auth", None)
+    key = getattr(token, "key", None)
+    if key:
+        return f"token:{key}"
+    return f"user:{request.user.pk}"
+
+
+def get_principal(request):
+    """
+    The caller's Principal, resolved at most once per request and shared
+    across requests carrying the same token until it expires or the user's
+    groups/profiles change (see the invalidation receivers in signals.py).
+    """
+    principal = getattr(request, "_principal", None)
+    if principal is not None:
+        return principal
+
+    user = getattr(request, "user", None)
+    if not user or not user.is_authenticated:
+        return None
+
+    # Signed access tokens already carry the principal
+    claims = getattr(request, "auth", None)
+    if isinstance(claims, dict):
+        request._principal = principal_from_claims(claims)
+        return request._principal
+
+    key = _cache_key(request)
+    principal = principal_cache.get(key)
+    if principal is None:
+        principal = resolve_principal(user)
+        principal_cache.set(key, principal, tags=[f"user:{user.pk}"])
+    request._principal = principal
+    return principal
+
+
+def _evict_principal(user_id=""):
+    if user_id:
+        principal_cache.invalidate_tag(f"user:{user_id}")
+    else:
+        principal_cache.clear()
+
+
+def invalidate_principal(user_id=None):
+    """
+    Drop the cached principal of one user (every user when None) here at once,
+    and in the other workers on their next invalidation poll.
+    """
+    _evict_principal(user_id or "")
+    publish("principal", user_id or "")
+
+
+register("principal", _evict_principal)
@@ -0,0 +1,147 @@
+# HealthBridge/utils/qr.py
+
+import hashlib
+import logging
+import queue
+import threading
+from io import BytesIO
+
+import qrcode
+import qrcode.image.svg
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+def qr_payload(profile):
+    """The value encoded in a patient's QR: awaz_id, else migrant_id, else the local UUID."""
+    if profile.awaz_id:
+        return profile.awaz_id
+    if profile.migrant_id:
+        return profile.migrant_id
+    return str(profile.qr_code_uuid)
+
+
+def needs_qr_render(profile):
+    return not profile.qr_code_image or profile.qr_code_payload != qr_payload(profile)
+
+
+QR_CONTENT_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+QR_STORE_PREFIX = "qr_codes/cas"
+
+
+def qr_digest(payload):
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def qr_content_path(payload, fmt="png"):
+    """Content-addressed storage path: the same payload always maps to the same file."""
+    digest = qr_digest(payload)
+    return f"{QR_STORE_PREFIX}/{digest[:2]}/{digest}.{fmt}"
+
+
+def render_qr_png(payload):
+    img = qrcode.make(payload)
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def render_qr_svg(payload):
+    img = qrcode.make(payload, image_factory=qrcode.image.svg.SvgPathImage)
+    buffer = BytesIO()
+    img.save(buffer)
+    return buffer.getvalue()
+
+
+def ensure_qr_file(payload, fmt="png"):
+    """Return the storage path for `payload`, rendering it only if the file does not exist yet."""
+    path = qr_content_path(payload, fmt)
+    if not default_storage.exists(path):
+        content = render_qr_svg(payload) if fmt == "svg" else render_qr_png(payload)
+        # Two renders of one payload produce identical bytes, so a lost race is harmless.
+        if not default_storage.exists(path):
+            default_storage.save(path, ContentFile(content))
+    return path
+
+
+def read_qr(payload, fmt="png"):
+    with default_storage.open(ensure_qr_file(payload, fmt), "rb") as fh:
+        return fh.read()
+
+
+def render_profile_qr(profile_id, payload):
+    """
+    Point a profile's qr_code_image at the content-addressed PNG for `payload`,
+    rendering it if needed. Writes go through queryset.update() so no Profile
+    signals fire and the render cannot re-queue itself. Files that are no
+    longer referenced are left for `manage.py gc_qr_codes`.
+    """
+    from HealthBridge.models import Profile
+
+    row = Profile.objects.filter(pk=profile_id).values("qr_code_image", "qr_code_payload").first()
+    if row is None:
+        return False
+    if row["qr_code_image"] and row["qr_code_payload"] == payload:
+        return False
+
+    name = ensure_qr_file(payload, "png")
+    Profile.objects.filter(pk=profile_id).update(qr_code_image=name, qr_code_payload=payload)
+    return True
+
+
+class QRRenderer:
+    """
+    Background worker that renders patient QR codes off the request path.
+    Jobs are deduplicated per profile: if a profile is queued several times
+    before the worker gets to it, only its latest payload is rendered.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._pending = {}           # profile_id -> latest payload
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, profile_id, payload):
+        if not getattr(settings, "QR_RENDER_ASYNC", True):
+            render_profile_qr(profile_id, payload)
+            return
+        with self._lock:
+            already_queued = profile_id in self._pending
+            self._pending[profile_id] = payload
+            if not already_queued:
+                self._queue.put(profile_id)
+            self._ensure_worker()
+
+    def wait(self):
+        """Block until every queued render has finished."""
+        self._queue.join()
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="qr-renderer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            profile_id = self._queue.get()
+            try:
+                with self._lock:
+                    payload = self._pending.pop(profile_id, None)
+                if payload is not None:
+                    render_profile_qr(profile_id, payload)
+            except Exception:
+                logger.exception("QR render failed for profile %s", profile_id)
+            finally:
+                close_old_connections()
+                self._queue.task_done()
+
+
+qr_renderer = QRRenderer()
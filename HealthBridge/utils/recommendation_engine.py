@@ -1,14 +1,152 @@
-class RecommendationEngine:
-    def __init__(self, profile, medical_records):
-        self.profile = profile
-        self.records = medical_records
-
-    def generate(self):
-        recs = []
-        if self.profile.age > 60:
-            recs.append("Consider senior citizen health schemes.")
-        if any("fever" in r.description.lower() for r in self.records):
-            recs.append("Monitor for recurring fever symptoms.")
-        if self.profile.gender == "Female":
-            recs.append("Eligible for women-specific wellness programs.")
-        return recs
\ No newline at end of file
+# HealthBridge/utils/recommendation_engine.py
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from HealthBridge.models import CohortRecommendation, Profile, RecordTerm, Vital
+
+# Diseases/symptoms loaded as boolean feature columns
+TRACKED_TERMS = ["fever", "diabetes", "hypertension"]
+
+
+def _high_temperature(temperature):
+    # Vitals are entered in either Celsius or Fahrenheit; anything above 45 is Fahrenheit
+    return np.where(temperature > 45, temperature >= 100.4, temperature >= 38.0)
+
+
+# (rule_key, message, vectorized predicate over the feature columns)
+COHORT_RULES = [
+    ("senior_schemes", "Consider senior citizen health schemes.",
+     lambda f: f["age"] > 60),
+    ("recurring_fever", "Monitor for recurring fever symptoms.",
+     lambda f: f["fever"]),
+    ("womens_wellness", "Eligible for women-specific wellness programs.",
+     lambda f: f["gender"] == "F"),
+    ("high_temperature", "Latest temperature reading is high; rest, hydrate and see a doctor if it persists.",
+     lambda f: _high_temperature(f["temperature"])),
+    ("high_heart_rate", "Latest heart rate is above 100 bpm; get it rechecked.",
+     lambda f: f["heart_rate"] > 100),
+    ("high_blood_pressure", "Latest blood pressure reading is high; monitor it daily and reduce salt intake.",
+     lambda f: (f["systolic"] >= 140) | (f["diastolic"] >= 90)),
+    ("cardiometabolic_screening", "Diabetes with hypertension: regular cardiovascular screening recommended.",
+     lambda f: f["diabetes"] & f["hypertension"]),
+]
+
+
+class CohortRecommendationEngine:
+    """
+    Evaluates COHORT_RULES for many profiles at once.
+
+    Features for a chunk of profiles (age, gender, normalized diseases and
+    symptoms from RecordTerm, latest vitals) are loaded with two queries into
+    numpy columns; every rule is then a boolean mask over the whole chunk.
+    Results are written to CohortRecommendation as a per-chunk diff.
+    """
+
+    def __init__(self, rules=None, chunk_size=5000):
+        self.rules = rules or COHORT_RULES
+        self.chunk_size = chunk_size
+
+    def load_features(self, profile_ids):
+        latest = Vital.objects.filter(patient=OuterRef("pk")).order_by("-timestamp", "-id")
+        rows = (
+            Profile.objects.filter(id__in=profile_ids)
+            .annotate(
+                temperature=Subquery(latest.values("temperature")[:1]),
+                heart_rate=Subquery(latest.values("heart_rate")[:1]),
+                blood_pressure=Subquery(latest.values("blood_pressure")[:1]),
+            )
+            .order_by("id")
+            .values_list("id", "age", "gender", "temperature", "heart_rate", "blood_pressure")
+        )
+        frame = pd.DataFrame.from_records(
+            list(rows), columns=["id", "age", "gender", "temperature", "heart_rate", "blood_pressure"]
+        )
+        pressure = frame["blood_pressure"].astype("string").str.extract(r"(\d{2,3})\s*/\s*(\d{2,3})")
+
+        features = {
+            "id": frame["id"].to_numpy(),
+            "age": frame["age"].to_numpy(dtype=float),
+            "gender": frame["gender"].to_numpy(dtype=object),
+            "temperature": pd.to_numeric(frame["temperature"], errors="coerce").to_numpy(dtype=float),
+            "heart_rate": pd.to_numeric(frame["heart_rate"], errors="coerce").to_numpy(dtype=float),
+            "systolic": pd.to_numeric(pressure[0], errors="coerce").to_numpy(dtype=float),
+            "diastolic": pd.to_numeric(pressure[1], errors="coerce").to_numpy(dtype=float),
+        }
+
+        position = {profile_id: i for i, profile_id in enumerate(features["id"])}
+        for term in TRACKED_TERMS:
+            features[term] = np.zeros(len(position), dtype=bool)
+        for patient_id, term in (
+            RecordTerm.objects.filter(record__patient_id__in=profile_ids, term__in=TRACKED_TERMS)
+            .values_list("record__patient_id", "term")
+            .distinct()
+        ):
+            features[term][position[patient_id]] = True
+        return features
+
+    def evaluate(self, features):
+        """Return {profile_id: {rule_key: message}} for one chunk of features."""
+        results = {int(profile_id): {} for profile_id in features["id"]}
+        with np.errstate(invalid="ignore"):
+            for rule_key, message, predicate in self.rules:
+                mask = np.asarray(predicate(features), dtype=bool)
+                for profile_id in features["id"][mask]:
+                    results[int(profile_id)][rule_key] = message
+        return results
+
+    def write(self, results):
+        """Replace stored recommendations for these profiles with `results`, writing only the diff."""
+        existing = {}
+        for rec_id, patient_id, rule_key, message in CohortRecommendation.objects.filter(
+            patient_id__in=results.keys()
+        ).values_list("id", "patient_id", "rule_key", "message"):
+            existing[(patient_id, rule_key)] = (rec_id, message)
+
+        now = timezone.now()
+        upserts = []
+        for patient_id, rules in results.items():
+            for rule_key, message in rules.items():
+                current = existing.get((patient_id, rule_key))
+                if current is None or current[1] != message:
+                    upserts.append(CohortRecommendation(
+                        patient_id=patient_id, rule_key=rule_key, message=message, computed_at=now
+                    ))
+        stale = [
+            rec_id for (patient_id, rule_key), (rec_id, _) in existing.items()
+            if rule_key not in results.get(patient_id, {})
+        ]
+
+        with transaction.atomic():
+            if stale:
+                CohortRecommendation.objects.filter(id__in=stale).delete()
+            if upserts:
+                CohortRecommendation.objects.bulk_create(
+                    upserts,
+                    batch_size=self.chunk_size,
+                    update_conflicts=True,
+                    unique_fields=["patient", "rule_key"],
+                    update_fields=["message", "computed_at"],
+                )
+        return len(upserts), len(stale)
+
+    def run(self, queryset=None, progress=None):
+        """Evaluate every profile in `queryset` (default: all) chunk by chunk. Returns (profiles, written, removed)."""
+        queryset = Profile.objects.all() if queryset is None else queryset
+        last_id = 0
+        profiles = written = removed = 0
+        while True:
+            ids = list(queryset.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:self.chunk_size])
+            if not ids:
+                break
+            chunk_written, chunk_removed = self.write(self.evaluate(self.load_features(ids)))
+            profiles += len(ids)
+            written += chunk_written
+            removed += chunk_removed
+            last_id = ids[-1]
+            if progress is not None:
+                progress(profiles, written, removed)
+        return profiles, written, removed
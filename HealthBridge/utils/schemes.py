@@ -0,0 +1,203 @@
+# HealthBridge/utils/schemes.py
+
+import threading
+from bisect import bisect_right
+
+from django.db import transaction
+
+from HealthBridge.utils.invalidation import publish, register
+
+
+class SchemeIndex:
+    """
+    Immutable, pre-compiled view of the Scheme table.
+
+    - Age eligibility is an interval structure: the distinct min_age/max_age
+      boundaries split the age axis into segments, and each segment stores the
+      set of schemes covering it, so an age lookup is one bisect.
+    - applicable_diseases is inverted into disease -> scheme ids; schemes with
+      no listed disease apply to every diagnosis.
+    - Hospital scoping keeps global schemes apart from hospital-specific ones.
+    """
+
+    def __init__(self, schemes):
+        from HealthBridge.utils.terms import split_terms
+
+        self.data = {}
+        self.boundaries = []
+        self.segments = []
+        self.by_disease = {}
+        generic = set()
+        global_ids = set()
+        by_hospital = {}
+
+        points = set()
+        for scheme in schemes:
+            self.data[scheme["id"]] = scheme
+            points.add(scheme["min_age"])
+            points.add(scheme["max_age"] + 1)
+
+            diseases = split_terms(scheme["applicable_diseases"])
+            if diseases:
+                for disease in diseases:
+                    self.by_disease.setdefault(disease, set()).add(scheme["id"])
+            else:
+                generic.add(scheme["id"])
+
+            if scheme["hospital"] is None:
+                global_ids.add(scheme["id"])
+            else:
+                by_hospital.setdefault(scheme["hospital"], set()).add(scheme["id"])
+
+        self.boundaries = sorted(points)
+        for start in self.boundaries:
+            self.segments.append(frozenset(
+                scheme_id for scheme_id, scheme in self.data.items()
+                if scheme["min_age"] <= start <= scheme["max_age"]
+            ))
+
+        self.by_disease = {disease: frozenset(ids) for disease, ids in self.by_disease.items()}
+        self.generic = frozenset(generic)
+        self.global_ids = frozenset(global_ids)
+        self.by_hospital = {hospital_id: frozenset(ids) for hospital_id, ids in by_hospital.items()}
+
+    def for_age(self, age):
+        position = bisect_right(self.boundaries, age) - 1
+        if position < 0:
+            return frozenset()
+        return self.segments[position]
+
+    def eligible(self, age, diseases, hospital_id=None):
+        """
+        Ids of schemes a patient qualifies for: age in range, scoped to global
+        schemes plus those of `hospital_id`, and either disease-agnostic or
+        matching one of the (normalized) `diseases`.
+        """
+        candidates = set(self.generic)
+        for disease in diseases:
+            candidates |= self.by_disease.get(disease, frozenset())
+        allowed = self.global_ids | self.by_hospital.get(hospital_id, frozenset())
+        return sorted(candidates & allowed & self.for_age(age))
+
+    def serialized(self, scheme_ids):
+        return [self.data[scheme_id] for scheme_id in scheme_ids]
+
+
+_lock = threading.Lock()
+_index = None
+_index_version = None
+_version = 0  # bumped by every invalidation, local or published by another worker
+
+
+def _load_index():
+    from HealthBridge.models import Scheme
+    from HealthBridge.serializers import SchemeSerializer
+
+    schemes = SchemeSerializer(Scheme.objects.order_by("id"), many=True).data
+    return SchemeIndex([dict(scheme) for scheme in schemes])
+
+
+def get_scheme_index():
+    """
+    The process-wide SchemeIndex, rebuilt only after a Scheme changes.
+    Changes made in other workers arrive through utils/invalidation.py.
+    """
+    global _index, _index_version
+    version = _version
+    index = _index
+    if index is not None and _index_version == version:
+        return index
+    with _lock:
+        if _index is None or _index_version != version:
+            _index = _load_index()
+            _index_version = version
+        return _index
+
+
+def _drop_index(value=""):
+    global _version
+    _version += 1
+
+
+def invalidate_scheme_index():
+    """Rebuild on the next lookup here, and in every other worker after its next poll."""
+    _drop_index()
+    publish("scheme_index")
+
+
+register("scheme_index", _drop_index)
+
+
+# -------------------------------
+# Bulk (re)assignment
+# -------------------------------
+def reassign_schemes(queryset=None, chunk_size=2000, start_after=0, progress=None):
+    """
+    Recompute eligible_schemes for every record in `queryset` (default: all)
+    in primary-key order, `chunk_size` records at a time.
+
+    Each chunk reads its records and current through-table rows in two
+    queries and writes only the difference with one bulk delete and one
+    bulk insert. After every chunk `progress(done, total, last_id, added,
+    removed)` is called; passing the last_id back as `start_after` resumes
+    an interrupted run. Returns (records, added, removed).
+    """
+    from HealthBridge.models import MedicalRecord
+    from HealthBridge.utils.dashboard import mark_dashboard_stale
+    from HealthBridge.utils.terms import split_terms
+
+    queryset = MedicalRecord.objects.all() if queryset is None else queryset
+    through = MedicalRecord.eligible_schemes.through
+    index = get_scheme_index()
+
+    total = queryset.filter(id__gt=start_after).count()
+    last_id = start_after
+    done = added = removed = 0
+    while True:
+        rows = list(
+            queryset.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "patient__age", "hospital_id", "recurring_diseases")[:chunk_size]
+        )
+        if not rows:
+            break
+
+        desired = {
+            record_id: set(index.eligible(age, split_terms(diseases), hospital_id))
+            for record_id, age, hospital_id, diseases in rows
+        }
+        current = {record_id: {} for record_id in desired}
+        for link_id, record_id, scheme_id in through.objects.filter(
+            medicalrecord_id__in=desired.keys()
+        ).values_list("id", "medicalrecord_id", "scheme_id"):
+            current[record_id][scheme_id] = link_id
+
+        to_add = [
+            through(medicalrecord_id=record_id, scheme_id=scheme_id)
+            for record_id, scheme_ids in desired.items()
+            for scheme_id in scheme_ids - current[record_id].keys()
+        ]
+        to_remove = [
+            link_id
+            for record_id, links in current.items()
+            for scheme_id, link_id in links.items()
+            if scheme_id not in desired[record_id]
+        ]
+
+        with transaction.atomic():
+            if to_remove:
+                through.objects.filter(id__in=to_remove).delete()
+            if to_add:
+                through.objects.bulk_create(to_add, batch_size=chunk_size, ignore_conflicts=True)
+
+        done += len(rows)
+        added += len(to_add)
+        removed += len(to_remove)
+        last_id = rows[-1][0]
+        if progress is not None:
+            progress(done, total, last_id, added, removed)
+
+    if added or removed:
+        # Bulk through-table writes bypass m2m_changed
+        mark_dashboard_stale()
+    return done, added, removed
@@ -0,0 +1,117 @@
+# HealthBridge/utils/signed_qr.py
+
+import jwt
+from django.conf import settings
+
+from HealthBridge.utils.keys import get_private_key, get_public_keys
+from HealthBridge.utils.qr import qr_payload
+
+# -------------------------------
+# Signed QR payloads ("HC1:" + JWS)
+# -------------------------------
+# The code embeds the patient identifier and the fields emergency triage
+# needs, signed with the issuing hospital's key (kid = hospital_id). Any node
+# holding the hospital's public key can read and trust it without a lookup.
+# There is no iat/exp, so the same data always yields the same code and the
+# rendered image is shared through the content-addressed QR store.
+# Access tokens are signed with the same hospital keys, so codes carry
+# typ = "qr" and nothing else is accepted as one (or the other way round).
+
+SIGNED_QR_PREFIX = "HC1:"
+ALGORITHM = "RS256"
+QR_TYPE = "qr"
+
+
+class SignedQRError(Exception):
+    pass
+
+
+def is_signed_qr(value):
+    return value.startswith(SIGNED_QR_PREFIX)
+
+
+def signed_qr_issuer(profile):
+    if profile.home_hospital_id:
+        return profile.home_hospital.hospital_id
+    return getattr(settings, "JWT_DEFAULT_ISSUER", "") or None
+
+
+def signed_qr_claims(profile, issuer):
+    return {
+        "iss": issuer,
+        "typ": QR_TYPE,
+        "pid": qr_payload(profile),
+        "bg": profile.blood_group,
+        "ec": {
+            "name": profile.emergency_contact_name,
+            "phone": profile.emergency_contact_phone,
+            "rel": profile.emergency_contact_relation,
+        },
+    }
+
+
+def sign_profile_qr(profile):
+    """Return the signed QR payload for a profile, or raise SignedQRError."""
+    issuer = signed_qr_issuer(profile)
+    key = get_private_key(issuer) if issuer else None
+    if key is None:
+        raise SignedQRError("No signing key available for this patient's hospital")
+    token = jwt.encode(signed_qr_claims(profile, issuer), key, algorithm=ALGORITHM, headers={"kid": issuer})
+    return SIGNED_QR_PREFIX + token
+
+
+def _split(value):
+    if not is_signed_qr(value):
+        raise SignedQRError("Not a signed QR code")
+    token = value[len(SIGNED_QR_PREFIX):]
+    try:
+        kid = jwt.get_unverified_header(token).get("kid")
+    except jwt.InvalidTokenError:
+        raise SignedQRError("Malformed signed QR code")
+    if not kid:
+        raise SignedQRError("Signed QR code has no issuer")
+    return token, kid
+
+
+def _decode(token, kid, key):
+    if key is None:
+        raise SignedQRError("Unknown issuer")
+    try:
+        claims = jwt.decode(token, key, algorithms=[ALGORITHM], issuer=kid, options={"require": ["iss", "typ", "pid"]})
+    except jwt.InvalidTokenError:
+        raise SignedQRError("Invalid signature")
+    if claims["typ"] != QR_TYPE or not isinstance(claims["pid"], str) or not claims["pid"]:
+        raise SignedQRError("Not a patient QR code")
+    return claims
+
+
+def verify_signed_qr(value):
+    """Verified claims of one signed QR code, or raise SignedQRError."""
+    token, kid = _split(value)
+    return _decode(token, kid, get_public_keys([kid]).get(kid))
+
+
+def verify_signed_qrs(values):
+    """
+    Verify many codes at once. Issuer keys are resolved together (one query
+    for all cache misses), then each code is a local signature check.
+    Returns one {"valid": True, "data": claims} or {"valid": False, "error": ...} per input, in order.
+    """
+    parsed = []
+    for value in values:
+        try:
+            parsed.append(_split(value))
+        except SignedQRError as exc:
+            parsed.append(exc)
+    keys = get_public_keys(item[1] for item in parsed if not isinstance(item, SignedQRError))
+
+    results = []
+    for item in parsed:
+        try:
+            if isinstance(item, SignedQRError):
+                raise item
+            token, kid = item
+            results.append({"valid": True, "data": _decode(token, kid, keys.get(kid))})
+        except SignedQRError as exc:
+            results.append({"valid": False, "error": str(exc)})
+    return results
@@ -0,0 +1,144 @@
+# HealthBridge/utils/symptom_matcher.py
+
+import re
+import threading
+import unicodedata
+from collections import deque
+
+from HealthBridge.utils.invalidation import publish, register
+
+URGENCY_RANK = {"urgent": 0, "soon": 1, "routine": 2}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """NFC + casefold + single spaces, applied to both keywords and patient text."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text).casefold()).strip()
+
+
+def _is_word_char(char):
+    # Letters, combining marks (Indic vowel signs / viramas) and digits
+    return unicodedata.category(char)[0] in ("L", "M", "N")
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over all keywords of all rules.
+
+    search() walks the text once, so the cost per request depends on the
+    text length and the number of matches, not on how many keywords exist.
+    A keyword only counts when it starts at a word boundary, so "cough"
+    matches "coughing" but "pani" does not match inside "company".
+    """
+
+    def __init__(self, keywords):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]   # state -> [(keyword length, payload)]
+
+        for keyword, payload in keywords:
+            keyword = normalize_text(keyword)
+            if not keyword:
+                continue
+            state = 0
+            for char in keyword:
+                nxt = self.goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][char] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = nxt
+            self.output[state].append((len(keyword), payload))
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(char, 0)
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def search(self, text):
+        """Return the set of payloads whose keywords occur in `text`."""
+        text = normalize_text(text)
+        goto, fail, output = self.goto, self.fail, self.output
+        found = set()
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, payload in output[state]:
+                start = position - length + 1
+                if start == 0 or not _is_word_char(text[start - 1]):
+                    found.add(payload)
+        return found
+
+
+class SymptomMatcher:
+    """All active SymptomRules compiled into one automaton."""
+
+    def __init__(self, rules, keywords):
+        self.rules = {rule["id"]: rule for rule in rules}
+        self.automaton = KeywordAutomaton(
+            (keyword, rule_id) for rule_id, keyword in keywords if rule_id in self.rules
+        )
+
+    def match(self, text):
+        """Matching rules, most urgent first, then by priority."""
+        rules = [self.rules[rule_id] for rule_id in self.automaton.search(text)]
+        rules.sort(key=lambda rule: (URGENCY_RANK.get(rule["urgency"], 99), -rule["priority"], rule["key"]))
+        return rules
+
+
+_lock = threading.Lock()
+_matcher = None
+_matcher_version = None
+_version = 0  # bumped by every invalidation, local or published by another worker
+
+
+def _load_matcher():
+    from HealthBridge.models import SymptomKeyword, SymptomRule
+
+    rules = list(
+        SymptomRule.objects.filter(is_active=True).values("id", "key", "title", "description", "priority", "urgency")
+    )
+    keywords = SymptomKeyword.objects.filter(rule__is_active=True).values_list("rule_id", "keyword")
+    return SymptomMatcher(rules, keywords)
+
+
+def get_symptom_matcher():
+    """
+    The process-wide matcher, recompiled after any rule or keyword edit,
+    including edits made in other workers (see utils/invalidation.py).
+    """
+    global _matcher, _matcher_version
+    version = _version
+    matcher = _matcher
+    if matcher is not None and _matcher_version == version:
+        return matcher
+    with _lock:
+        if _matcher is None or _matcher_version != version:
+            _matcher = _load_matcher()
+            _matcher_version = version
+        return _matcher
+
+
+def _drop_matcher(value=""):
+    global _version
+    _version += 1
+
+
+def invalidate_symptom_matcher():
+    """Recompile on the next match here, and in every other worker after its next poll."""
+    _drop_matcher()
+    publish("symptom_matcher")
+
+
+register("symptom_matcher", _drop_matcher)
@@ -0,0 +1,232 @@
+# HealthBridge/utils/synthetic.py
+
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from HealthBridge.models import (
+    Consent, DoctorProfile, Hospital, MedicalRecord, Profile, Recommendation, Scheme, Vital,
+)
+from HealthBridge.utils.bulk import insert_rows
+from HealthBridge.utils.synthetic_worker import init_worker, write_chunk_job
+
+# -------------------------------
+# Synthetic data for load tests and benchmarks
+# -------------------------------
+# Patients are written in chunks with utils/bulk.insert_rows: no
+# model instances, no save(), no signals (QR rendering, key provisioning,
+# term indexing, vital rollups, group assignment). Every row of patient i gets an id
+# derived from i, so chunks are independent and can be written by several
+# processes at once. The same seed and chunk size always produce the same
+# dataset, whatever the number of workers.
+
+REGIONS = ["Ernakulam", "Thiruvananthapuram", "Kozhikode", "Thrissur", "Kollam", "Kannur", "Palakkad", "Malappuram"]
+DISEASES = ["diabetes", "hypertension", "asthma", "tuberculosis", "malaria", "dengue", "anemia", "arthritis"]
+SYMPTOMS = ["fever", "cough", "headache", "fatigue", "nausea", "chest pain", "body pain", "dizziness"]
+BLOOD_GROUPS = ["A+", "A-", "B+", "B-", "O+", "O-", "AB+", "AB-"]
+LANGUAGES = ["Malayalam", "Hindi", "Bengali", "Odia", "Tamil", "Assamese"]
+RELATIONS = ["spouse", "parent", "sibling", "friend"]
+HISTORY_DAYS = 180
+
+
+def _next_id(model):
+    return (model.objects.aggregate(top=Max("id"))["top"] or 0) + 1
+
+
+# -------------------------------
+# Dataset
+# -------------------------------
+class SyntheticDataset:
+    """
+    prepare() creates the small shared tables (hospitals, schemes, doctors,
+    one authority) with bulk_create and fixes the id ranges; write_chunk()
+    then adds patients [start, start + size) with their user, profile,
+    group membership, medical records, vitals, recommendations and consents.
+    """
+
+    def __init__(self, patients, seed=0, prefix="syn", records_per_patient=2, vitals_per_patient=3,
+                 consent_rate=0.2, hospitals=None, password=None):
+        self.patients = patients
+        self.seed = seed
+        self.prefix = prefix
+        self.records_per_patient = records_per_patient
+        self.vitals_per_patient = vitals_per_patient
+        self.consent_rate = consent_rate
+        self.hospital_count = hospitals or max(2, min(200, patients // 500))
+        # One hash for every generated user; unusable unless a password is given
+        self.password_hash = make_password(password)
+        self.plan = None
+        self.rows = 0
+
+    def prepare(self):
+        rng = random.Random(self.seed)
+        groups = {name: Group.objects.get_or_create(name=name)[0].pk for name in ("Patient", "Doctor", "Authority")}
+
+        hospitals = Hospital.objects.bulk_create([
+            Hospital(hospital_id=f"{self.prefix.upper()}-H{i:04d}", name=f"{self.prefix} Hospital {i}",
+                     region=REGIONS[i % len(REGIONS)])
+            for i in range(self.hospital_count)
+        ])
+        Scheme.objects.bulk_create([
+            Scheme(name=f"{self.prefix} scheme {i}", description=f"Synthetic scheme {i}",
+                   min_age=rng.choice([0, 18, 40, 60]), max_age=rng.choice([60, 80, 120]),
+                   applicable_diseases=", ".join(rng.sample(DISEASES, 2)) if i % 2 else "")
+            for i in range(10)
+        ])
+
+        staff = User.objects.bulk_create(
+            [User(username=f"{self.prefix}-doctor-{i}", password=self.password_hash)
+             for i in range(2 * len(hospitals))]
+            + [User(username=f"{self.prefix}-authority", password=self.password_hash)]
+        )
+        doctor_users, authority = staff[:-1], staff[-1]
+        User.groups.through.objects.bulk_create(
+            [User.groups.through(user_id=user.pk, group_id=groups["Doctor"]) for user in doctor_users]
+            + [User.groups.through(user_id=authority.pk, group_id=groups["Authority"])]
+        )
+        doctors = DoctorProfile.objects.bulk_create([
+            DoctorProfile(user=user, hospital=hospitals[i // 2], department="General Medicine",
+                          designation="Medical Officer", contact_number=f"9{i:09d}")
+            for i, user in enumerate(doctor_users)
+        ])
+
+        # Everything write_chunk needs, picklable for worker processes
+        self.plan = {
+            "seed": self.seed,
+            "prefix": self.prefix,
+            "password": self.password_hash,
+            "records_per_patient": self.records_per_patient,
+            "vitals_per_patient": self.vitals_per_patient,
+            "recommendations_per_patient": (self.records_per_patient + 1) // 2,
+            "consent_rate": self.consent_rate,
+            "patient_group": groups["Patient"],
+            "hospitals": [hospital.pk for hospital in hospitals],
+            "doctors": [(doctor.pk, doctor.hospital_id) for doctor in doctors],
+            "now": timezone.now(),
+            "base": {
+                "user": _next_id(User),
+                "profile": _next_id(Profile),
+                "record": _next_id(MedicalRecord),
+                "vital": _next_id(Vital),
+                "recommendation": _next_id(Recommendation),
+                "consent": _next_id(Consent),
+            },
+        }
+        return {"hospitals": hospitals, "doctors": doctors, "authority": authority}
+
+    def run(self, chunk_size=10000, workers=1, progress=None):
+        """Write every patient chunk, in this process or in `workers` processes."""
+        chunks = [(start, min(chunk_size, self.patients - start)) for start in range(0, self.patients, chunk_size)]
+        if workers <= 1:
+            for start, size in chunks:
+                self.rows += write_chunk(self.plan, start, size)
+                if progress is not None:
+                    progress(start + size)
+        else:
+            # Children open their own connections; never share the parent's
+            connections.close_all()
+            context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+            done = 0
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker) as pool:
+                for size, rows in pool.map(write_chunk_job, [(self.plan, start, size) for start, size in chunks]):
+                    done += size
+                    self.rows += rows
+                    if progress is not None:
+                        progress(done)
+        self.finish()
+
+    def finish(self):
+        """Explicit ids bypass sequences; move them past the new rows (no-op on SQLite)."""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, Profile, MedicalRecord, Vital, Recommendation, Consent]
+        )
+        if statements:
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
+
+
+def write_chunk(plan, start, size):
+    """
+    Insert patients [start, start + size) and everything that hangs off them,
+    in one transaction. Returns the number of rows written.
+    """
+    rng = random.Random(f"{plan['seed']}:{start}")
+    base, prefix, now = plan["base"], plan["prefix"], plan["now"]
+    per_record, per_vital, per_rec = plan["records_per_patient"], plan["vitals_per_patient"], plan["recommendations_per_patient"]
+
+    users, memberships, profiles, records, vitals, recommendations, consents = [], [], [], [], [], [], []
+    for i in range(start, start + size):
+        user_id, profile_id = base["user"] + i, base["profile"] + i
+        home = rng.choice(plan["hospitals"])
+        users.append({"id": user_id, "username": f"{prefix}-patient-{i}", "password": plan["password"],
+                      "date_joined": now})
+        memberships.append({"user_id": user_id, "group_id": plan["patient_group"]})
+        profiles.append({
+            "id": profile_id, "user_id": user_id, "role": "migrant", "home_hospital_id": home,
+            "migrant_id": f"{prefix.upper()}-M{i:08d}", "name": f"Patient {i}",
+            "age": rng.randint(1, 90), "gender": rng.choice("MFO"),
+            "location": rng.choice(REGIONS), "language": rng.choice(LANGUAGES),
+            "blood_group": rng.choice(BLOOD_GROUPS),
+            "emergency_contact_name": f"Contact {i}", "emergency_contact_phone": f"8{i:09d}",
+            "emergency_contact_relation": rng.choice(RELATIONS),
+        })
+
+        for j in range(per_record):
+            doctor_id, hospital_id = rng.choice(plan["doctors"])
+            record_id = base["record"] + i * per_record + j
+            records.append({
+                "id": record_id, "patient_id": profile_id, "hospital_id": hospital_id, "doctor_id": doctor_id,
+                "recurring_diseases": ", ".join(rng.sample(DISEASES, rng.randint(0, 2))),
+                "current_symptoms": ", ".join(rng.sample(SYMPTOMS, rng.randint(1, 3))),
+                "treated_at": now - timedelta(days=rng.randint(0, HISTORY_DAYS), minutes=rng.randint(0, 1439)),
+            })
+            if j % 2 == 0:
+                recommendations.append({
+                    "id": base["recommendation"] + i * per_rec + j // 2, "patient_id": profile_id,
+                    "medical_record_id": record_id, "title": "Follow-up",
+                    "description": "Synthetic follow-up advice",
+                })
+
+        for j in range(per_vital):
+            systolic, diastolic = rng.randint(95, 170), rng.randint(60, 90)
+            vitals.append({
+                "id": base["vital"] + i * per_vital + j, "patient_id": profile_id, "hospital_id": home,
+                "timestamp": now - timedelta(days=rng.randint(0, HISTORY_DAYS), minutes=rng.randint(0, 1439)),
+                "temperature": round(rng.uniform(36.0, 39.5), 1),
+                "blood_pressure": f"{systolic}/{diastolic}", "systolic": systolic, "diastolic": diastolic,
+                "heart_rate": rng.randint(55, 125),
+            })
+
+        if rng.random() < plan["consent_rate"] and len(plan["hospitals"]) > 1:
+            consents.append({
+                "id": base["consent"] + i, "patient_id": profile_id, "from_hospital_id": home,
+                "to_hospital_id": rng.choice([h for h in plan["hospitals"] if h != home]),
+                "purpose": "treatment", "expires_at": now + timedelta(days=rng.randint(-30, 365)),
+                "approved_by_patient": True, "approved_by_to_hospital": rng.random() < 0.9,
+            })
+
+    tables = [
+        (User, users), (User.groups.through, memberships), (Profile, profiles), (MedicalRecord, records),
+        (Vital, vitals), (Recommendation, recommendations), (Consent, consents),
+    ]
+    with transaction.atomic():
+        for model, rows in tables:
+            insert_rows(model, rows)
+    return sum(len(rows) for _, rows in tables)
+
+
+def seed_dataset(patients, seed=0, prefix="syn", chunk_size=10000, workers=1, progress=None, **options):
+    """Create and fill a SyntheticDataset; returns its hospitals, doctors and authority user."""
+    dataset = SyntheticDataset(patients, seed=seed, prefix=prefix, **options)
+    created = dataset.prepare()
+    dataset.run(chunk_size=chunk_size, workers=workers, progress=progress)
+    return created
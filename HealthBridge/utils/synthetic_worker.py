@@ -0,0 +1,30 @@
+# HealthBridge/utils/synthetic_worker.py
+
+from django.db import connection, connections
+
+# -------------------------------
+# Worker processes for SyntheticDataset.run
+# -------------------------------
+# A spawned child unpickles these before Django is set up, so this module
+# must not import models (HealthBridge.utils.synthetic does); write_chunk is
+# imported only once init_worker has run django.setup().
+
+
+def init_worker():
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+    connections.close_all()
+    if connection.vendor == "sqlite":
+        # SQLite takes one writer at a time; queue behind the others instead of failing
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout = 600000")
+
+
+def write_chunk_job(args):
+    from HealthBridge.utils.synthetic import write_chunk
+
+    plan, start, size = args
+    return size, write_chunk(plan, start, size)
@@ -0,0 +1,165 @@
+# HealthBridge/utils/terms.py
+
+import re
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Value
+from django.db.models.functions import Coalesce, NullIf, Substr
+
+from HealthBridge.models import MedicalRecord, RecordTerm
+from HealthBridge.utils.outbreak import apply_rollup_deltas
+
+_WHITESPACE = re.compile(r"\s+")
+TERM_MAX_LENGTH = RecordTerm._meta.get_field("term").max_length
+
+
+def normalize_term(value):
+    return _WHITESPACE.sub(" ", value.strip().lower())[:TERM_MAX_LENGTH]
+
+
+def split_terms(text):
+    """
+    Split a comma-separated disease/symptom field into normalized terms.
+    "Diabetes, fever" and "fever,diabetes" yield the same sorted list.
+    """
+    terms = {normalize_term(part) for part in (text or "").split(",")}
+    terms.discard("")
+    return sorted(terms)
+
+
+def record_term_keys(recurring_diseases, current_symptoms):
+    """The (kind, term) pairs a record with these field values should be indexed under."""
+    return (
+        {(RecordTerm.DISEASE, term) for term in split_terms(recurring_diseases)}
+        | {(RecordTerm.SYMPTOM, term) for term in split_terms(current_symptoms)}
+    )
+
+
+def record_rows(queryset):
+    """Fetch the fields sync_terms needs, with region/day inputs joined in the same query."""
+    return queryset.values_list(
+        "id", "recurring_diseases", "current_symptoms", "hospital__region", "patient__location", "treated_at"
+    )
+
+
+def _region_and_day(hospital_region, patient_location, treated_at):
+    region = (hospital_region or patient_location or "")[:120]
+    return region, (treated_at.date() if treated_at else None)
+
+
+def sync_terms(rows):
+    """
+    Bring RecordTerm in line with `rows` from record_rows(). Reads the
+    existing terms for all rows in one query, writes only the difference and
+    applies the matching OutbreakRollup deltas. Returns (added, removed).
+    """
+    desired = {}
+    placement = {}
+    for record_id, diseases, symptoms, hospital_region, patient_location, treated_at in rows:
+        desired[record_id] = record_term_keys(diseases, symptoms)
+        placement[record_id] = _region_and_day(hospital_region, patient_location, treated_at)
+    if not desired:
+        return 0, 0
+
+    existing = {record_id: {} for record_id in desired}
+    for term in RecordTerm.objects.filter(record_id__in=desired.keys()).only(
+        "id", "record_id", "kind", "term", "region", "day"
+    ):
+        existing[term.record_id][(term.kind, term.term)] = term
+
+    to_create = []
+    to_move = []
+    to_delete = []
+    deltas = Counter()
+    for record_id, keys in desired.items():
+        region, day = placement[record_id]
+        current = existing[record_id]
+        for kind, term in keys - current.keys():
+            to_create.append(RecordTerm(record_id=record_id, kind=kind, term=term, region=region, day=day))
+            if kind == RecordTerm.DISEASE:
+                deltas[(region, term, day)] += 1
+        for key, row in current.items():
+            counted_at = (row.region, row.term, row.day)
+            if key not in keys:
+                to_delete.append(row.id)
+            elif (row.region, row.day) != (region, day):
+                row.region, row.day = region, day
+                to_move.append(row)
+                if row.kind == RecordTerm.DISEASE:
+                    deltas[(region, row.term, day)] += 1
+            else:
+                continue
+            if row.kind == RecordTerm.DISEASE:
+                deltas[counted_at] -= 1
+
+    with transaction.atomic():
+        if to_delete:
+            RecordTerm.objects.filter(id__in=to_delete).delete()
+        if to_move:
+            RecordTerm.objects.bulk_update(to_move, ["region", "day"])
+        if to_create:
+            RecordTerm.objects.bulk_create(to_create, ignore_conflicts=True)
+        apply_rollup_deltas(deltas)
+    return len(to_create), len(to_delete)
+
+
+def sync_record_terms(record):
+    return sync_terms(record_rows(MedicalRecord.objects.filter(pk=record.pk)))
+
+
+def unindex_record(record):
+    """Reverse a record's OutbreakRollup contribution before it is deleted."""
+    deltas = Counter()
+    for region, term, day in RecordTerm.objects.filter(
+        record_id=record.pk, kind=RecordTerm.DISEASE
+    ).values_list("region", "term", "day"):
+        deltas[(region, term, day)] -= 1
+    apply_rollup_deltas(deltas)
+
+
+def stale_records(records):
+    """
+    The records in `records` with a term filed under a region their hospital
+    (or, without one, their patient) no longer has. Same rule as _region_and_day.
+    """
+    expected = Substr(
+        Coalesce(NullIf("record__hospital__region", Value("")), "record__patient__location", Value("")), 1, 120
+    )
+    stale = RecordTerm.objects.annotate(expected_region=expected).exclude(region=F("expected_region"))
+    return records.filter(Exists(stale.filter(record_id=OuterRef("pk"))))
+
+
+def replace_record_terms(records, chunk_size=1000):
+    """
+    Move the terms of stale_records(records) to their current region, with the
+    matching OutbreakRollup deltas. Returns the number of records moved.
+    """
+    stale = stale_records(records).order_by("id")
+    last_id = moved = 0
+    while True:
+        rows = list(record_rows(stale.filter(id__gt=last_id))[:chunk_size])
+        if not rows:
+            break
+        sync_terms(rows)
+        moved += len(rows)
+        last_id = rows[-1][0]
+    return moved
+
+
+def backfill_record_terms(chunk_size=1000, stdout=None):
+    """Re-index every MedicalRecord in primary-key chunks. Returns (records, added, removed)."""
+    last_id = 0
+    records = added = removed = 0
+    while True:
+        rows = list(record_rows(MedicalRecord.objects.filter(id__gt=last_id).order_by("id"))[:chunk_size])
+        if not rows:
+            break
+        chunk_added, chunk_removed = sync_terms(rows)
+        records += len(rows)
+        added += chunk_added
+        removed += chunk_removed
+        last_id = rows[-1][0]
+        if stdout is not None:
+            stdout.write(f"Indexed {records} records (last id {last_id})")
+    return records, added, removed
@@ -0,0 +1,185 @@
+# HealthBridge/utils/tokens.py
+
+import hashlib
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+import jwt
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from HealthBridge.models import Hospital, TokenSession, UsedRefreshToken
+from HealthBridge.utils.keys import get_issuer, get_private_key
+from HealthBridge.utils.principal import resolve_principal
+
+# -------------------------------
+# Signed (RS256) access / refresh tokens
+# -------------------------------
+# Tokens are signed with the private key of the caller's hospital
+# (keys/<hospital_id>_private.pem) and carry its hospital_id as `kid`, so any
+# API node can verify them against Hospital.public_key_pem without touching
+# the auth tables. Users without a hospital are signed by JWT_DEFAULT_ISSUER.
+#
+# A hospital key only vouches for its own staff: an access token signed by
+# it must carry that hospital as `hid`, and `staff` is honoured only from
+# JWT_DEFAULT_ISSUER (staff users are always signed by it when it is set).
+# A leaked hospital key therefore cannot mint tokens for other hospitals.
+#
+# Refresh tokens are single-use: each exchange records its jti, and a jti seen
+# twice (a stolen token racing its owner) revokes all of the user's sessions.
+# Logout revokes them by bumping TokenSession.epoch. Access tokens are not
+# checked against either and stay valid until they expire (JWT_ACCESS_TTL).
+
+ALGORITHM = "RS256"
+ACCESS = "access"
+REFRESH = "refresh"
+
+
+class TokenError(Exception):
+    pass
+
+
+def session_version(user):
+    """
+    Changes whenever the password does or the user logs out, which
+    invalidates outstanding refresh tokens.
+    """
+    try:
+        epoch = user.token_session.epoch
+    except TokenSession.DoesNotExist:
+        epoch = 0
+    return hashlib.sha256(f"{user.password}:{epoch}".encode()).hexdigest()[:16]
+
+
+def end_sessions(user_id):
+    """Revoke every refresh token issued to the user so far."""
+    if not TokenSession.objects.filter(user_id=user_id).update(epoch=F("epoch") + 1):
+        try:
+            with transaction.atomic():
+                TokenSession.objects.create(user_id=user_id, epoch=1)
+        except IntegrityError:
+            # Created concurrently
+            TokenSession.objects.filter(user_id=user_id).update(epoch=F("epoch") + 1)
+
+
+def _default_issuer():
+    return getattr(settings, "JWT_DEFAULT_ISSUER", "") or None
+
+
+def _issuer_for(user, principal):
+    if user.is_staff and _default_issuer():
+        return _default_issuer()
+    if principal.hospital_id:
+        hospital_id = Hospital.objects.filter(pk=principal.hospital_id).values_list("hospital_id", flat=True).first()
+        if hospital_id:
+            return hospital_id
+    return _default_issuer()
+
+
+def _sign(claims, kid):
+    key = get_private_key(kid)
+    if key is None:
+        raise TokenError(f"No signing key available for {kid}")
+    return jwt.encode(claims, key, algorithm=ALGORITHM, headers={"kid": kid})
+
+
+def issue_token_pair(user, principal=None):
+    """Return {"access", "refresh", "expires_in"} for an authenticated user."""
+    principal = principal or resolve_principal(user)
+    kid = _issuer_for(user, principal)
+    if not kid:
+        raise TokenError("No issuing hospital for this user")
+
+    now = int(time.time())
+    access_ttl = getattr(settings, "JWT_ACCESS_TTL", 300)
+    access = {
+        "iss": kid,
+        "sub": str(user.pk),
+        "name": user.username,
+        "staff": user.is_staff,
+        "roles": sorted(principal.groups),
+        "pid": principal.profile_id,
+        "prole": principal.profile_role,
+        "hid": principal.hospital_id,
+        "typ": ACCESS,
+        "iat": now,
+        "exp": now + access_ttl,
+    }
+    refresh = {
+        "iss": kid,
+        "sub": str(user.pk),
+        "ver": session_version(user),
+        "typ": REFRESH,
+        "jti": uuid.uuid4().hex,
+        "iat": now,
+        "exp": now + getattr(settings, "JWT_REFRESH_TTL", 86400),
+    }
+    return {"access": _sign(access, kid), "refresh": _sign(refresh, kid), "expires_in": access_ttl}
+
+
+def verify_token(token, expected_type=ACCESS):
+    """Check signature, expiry and type; return the claims or raise TokenError."""
+    try:
+        kid = jwt.get_unverified_header(token).get("kid")
+    except jwt.InvalidTokenError:
+        raise TokenError("Malformed token")
+    issuer = get_issuer(kid) if kid else None
+    if issuer is None:
+        raise TokenError("Unknown signing key")
+    hospital_pk, key = issuer
+    try:
+        claims = jwt.decode(
+            token, key, algorithms=[ALGORITHM], issuer=kid,
+            options={"require": ["exp", "sub", "typ"]},
+            leeway=getattr(settings, "JWT_LEEWAY", 10),
+        )
+    except jwt.ExpiredSignatureError:
+        raise TokenError("Token expired")
+    except jwt.InvalidTokenError:
+        raise TokenError("Invalid token")
+    if claims["typ"] != expected_type:
+        raise TokenError("Wrong token type")
+    if kid != _default_issuer() and expected_type == ACCESS:
+        if claims.get("hid") != hospital_pk:
+            raise TokenError("Token hospital does not match its signing key")
+        if claims.get("staff"):
+            raise TokenError("Staff tokens must be signed by the default issuer")
+    return claims
+
+
+def refresh_token_pair(refresh):
+    """
+    Exchange a refresh token for a new pair. This is the only step that reads
+    the database: the user must still be active, the session not ended and
+    this token not exchanged before.
+    """
+    claims = verify_token(refresh, expected_type=REFRESH)
+    user = User.objects.select_related("token_session").filter(pk=claims["sub"], is_active=True).first()
+    if user is None or claims.get("ver") != session_version(user) or "jti" not in claims:
+        raise TokenError("Refresh token revoked")
+
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            UsedRefreshToken.objects.create(
+                jti=claims["jti"], expires_at=datetime.fromtimestamp(claims["exp"], dt_timezone.utc)
+            )
+    except IntegrityError:
+        end_sessions(user.pk)
+        raise TokenError("Refresh token reused; all sessions revoked")
+    UsedRefreshToken.objects.filter(expires_at__lt=now).delete()
+    return issue_token_pair(user)
+
+
+def user_from_claims(claims):
+    """A User built from verified access token claims alone, without a query."""
+    is_staff = bool(claims.get("staff")) and claims["iss"] == _default_issuer()
+    user = User(pk=int(claims["sub"]), username=claims.get("name", ""), is_staff=is_staff)
+    user._state.adding = False
+    user._state.db = "default"
+    return user
+
@@ -0,0 +1,342 @@
+# HealthBridge/utils/vital_rollups.py
+
+import re
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from HealthBridge.models import Profile, Vital, VitalRollup
+from HealthBridge.utils.archive_state import VITALS, archive_cutoff
+from HealthBridge.utils.bulk import insert_rows
+
+# -------------------------------
+# Hourly / daily vital rollups
+# -------------------------------
+# VitalRollup keeps count/min/max/sum per patient and UTC hour or day, so a
+# range query returns at most one row per bucket however densely a patient
+# is monitored. New vitals are merged in (counts and sums added, min/max
+# widened) with one upsert per resolution, so ingest cost follows the batch,
+# not the history. Min and max cannot be decremented, so an edited or deleted
+# vital recomputes its buckets instead: the hour from the raw vitals in that
+# hour (index range on patient, timestamp), the day from its 24 hour rows.
+# An hour older than the archive cutoff may also hold archived readings; its
+# share is read back from the patient's Parquet partitions and merged in.
+
+METRICS = ("temperature", "heart_rate", "systolic", "diastolic")
+BLOOD_PRESSURE_RE = re.compile(r"(\d{2,3})\s*/\s*(\d{2,3})")
+STEPS = {VitalRollup.HOUR: timedelta(hours=1), VitalRollup.DAY: timedelta(days=1)}
+# Bound the parameters in one aggregate query (SQLite's limit is 999 on older builds)
+MAX_QUERY_PARAMS = 900
+UNIQUE_FIELDS = ["patient", "resolution", "bucket"]
+UPDATE_FIELDS = ["count"] + [f"{metric}_{part}" for metric in METRICS for part in ("count", "min", "max", "sum")]
+
+
+def parse_blood_pressure(text):
+    """(systolic, diastolic) from free text such as "120/80" or "BP 130 / 85 mmHg", else (None, None)."""
+    match = BLOOD_PRESSURE_RE.search(text) if text else None
+    if match is None:
+        return None, None
+    systolic, diastolic = int(match.group(1)), int(match.group(2))
+    if not systolic > diastolic > 0:
+        return None, None
+    return systolic, diastolic
+
+
+def parse_range_bound(value, end=False):
+    """
+    Aware datetime from an ISO datetime or date query parameter; a date means
+    the start of that UTC day, or with end=True the start of the next one.
+    None for an empty value, ValueError for anything else.
+    """
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date or datetime: {value}")
+        moment = datetime.combine(day + timedelta(days=1) if end else day, time.min, tzinfo=dt_timezone.utc)
+    elif timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, dt_timezone.utc)
+    return moment
+
+
+def bucket_start(moment, resolution):
+    moment = moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0) if resolution == VitalRollup.DAY else moment
+
+
+def _raw_aggregates():
+    aggregates = {"count": Count("id")}
+    for metric in METRICS:
+        aggregates[f"{metric}_count"] = Count(metric)
+        aggregates[f"{metric}_min"] = Min(metric)
+        aggregates[f"{metric}_max"] = Max(metric)
+        aggregates[f"{metric}_sum"] = Sum(metric)
+    return aggregates
+
+
+def _rollup_aggregates():
+    aggregates = {"total": Sum("count")}
+    for metric in METRICS:
+        aggregates[f"{metric}_total"] = Sum(f"{metric}_count")
+        aggregates[f"{metric}_low"] = Min(f"{metric}_min")
+        aggregates[f"{metric}_high"] = Max(f"{metric}_max")
+        aggregates[f"{metric}_added"] = Sum(f"{metric}_sum")
+    return aggregates
+
+
+def _rollup_from_rollups(row, resolution):
+    """VitalRollup row from a _rollup_aggregates() row (aliases avoid clashing with the model's fields)."""
+    values = {"patient_id": row["patient_id"], "resolution": resolution, "bucket": row["bucket"], "count": row["total"]}
+    for metric in METRICS:
+        values[f"{metric}_count"] = row[f"{metric}_total"]
+        values[f"{metric}_min"] = row[f"{metric}_low"]
+        values[f"{metric}_max"] = row[f"{metric}_high"]
+        values[f"{metric}_sum"] = row[f"{metric}_added"] or 0
+    return values
+
+
+def _rollup_from_vitals(row):
+    values = {**row, "resolution": VitalRollup.HOUR}
+    for metric in METRICS:
+        values[f"{metric}_sum"] = values[f"{metric}_sum"] or 0
+    return values
+
+
+def _bucket_filters(buckets, resolution, field):
+    """
+    Q objects selecting `field` within each bucket for its patients
+    ({bucket start: {patient ids}}), chunked to bound the query size.
+    """
+    step = STEPS[resolution]
+    chunk, size = Q(), 0
+    for start, patients in sorted(buckets.items()):
+        if size and size + len(patients) > MAX_QUERY_PARAMS:
+            yield chunk
+            chunk, size = Q(), 0
+        chunk |= Q(**{f"{field}__gte": start, f"{field}__lt": start + step, "patient_id__in": sorted(patients)})
+        size += len(patients) + 2
+    if size:
+        yield chunk
+
+
+def _store(resolution, buckets, rollups):
+    """Upsert the recomputed rollup rows; buckets left without vitals are deleted."""
+    # One executemany upsert: bulk_create(update_conflicts=True) splits these
+    # wide rows into many small statements and dominated ingest time
+    insert_rows(VitalRollup, rollups, unique_fields=UNIQUE_FIELDS, update_fields=UPDATE_FIELDS)
+    kept = {(rollup["patient_id"], bucket_start(rollup["bucket"], resolution)) for rollup in rollups}
+    emptied = defaultdict(set)
+    for start, patients in buckets.items():
+        for patient_id in patients:
+            if (patient_id, start) not in kept:
+                emptied[start].add(patient_id)
+    for condition in _bucket_filters(emptied, resolution, "bucket"):
+        VitalRollup.objects.filter(condition, resolution=resolution).delete()
+
+
+def _merge_expressions():
+    """SET expressions folding an EXCLUDED rollup row into the stored one."""
+    quote = connection.ops.quote_name
+    table = quote(VitalRollup._meta.db_table)
+
+    def added(column):
+        return f"{table}.{quote(column)} + EXCLUDED.{quote(column)}"
+
+    def widened(column, op):
+        stored, new = f"{table}.{quote(column)}", f"EXCLUDED.{quote(column)}"
+        return f"CASE WHEN {stored} IS NULL OR {new} {op} {stored} THEN {new} ELSE {stored} END"
+
+    expressions = {"count": added("count")}
+    for metric in METRICS:
+        expressions[f"{metric}_count"] = added(f"{metric}_count")
+        expressions[f"{metric}_min"] = widened(f"{metric}_min", "<")
+        expressions[f"{metric}_max"] = widened(f"{metric}_max", ">")
+        expressions[f"{metric}_sum"] = added(f"{metric}_sum")
+    return expressions
+
+
+def add_vital_rollups(vitals):
+    """
+    Fold newly inserted vitals (dicts with patient_id, timestamp and the
+    metric values) into their hour and day rollups.
+    """
+    if not connection.features.supports_update_conflicts_with_target:
+        refresh_vital_rollups((vital["patient_id"], vital["timestamp"]) for vital in vitals)
+        return
+    expressions = _merge_expressions()
+    for resolution in (VitalRollup.HOUR, VitalRollup.DAY):
+        rollups = {}
+        for vital in vitals:
+            key = (vital["patient_id"], bucket_start(vital["timestamp"], resolution))
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollup = rollups[key] = {"patient_id": key[0], "resolution": resolution, "bucket": key[1], "count": 0}
+                for metric in METRICS:
+                    rollup.update({f"{metric}_count": 0, f"{metric}_min": None, f"{metric}_max": None, f"{metric}_sum": 0})
+            rollup["count"] += 1
+            for metric in METRICS:
+                value = vital.get(metric)
+                if value is None:
+                    continue
+                rollup[f"{metric}_count"] += 1
+                rollup[f"{metric}_sum"] += value
+                if rollup[f"{metric}_min"] is None or value < rollup[f"{metric}_min"]:
+                    rollup[f"{metric}_min"] = value
+                if rollup[f"{metric}_max"] is None or value > rollup[f"{metric}_max"]:
+                    rollup[f"{metric}_max"] = value
+        insert_rows(VitalRollup, list(rollups.values()), unique_fields=UNIQUE_FIELDS, update_fields=expressions)
+
+
+def refresh_vital_rollups(points):
+    """
+    Recompute the hour and day rollups covering `points` ((patient_id,
+    timestamp) pairs of vitals that were added, changed or removed).
+    """
+    hours = defaultdict(set)
+    for patient_id, timestamp in points:
+        hours[bucket_start(timestamp, VitalRollup.HOUR)].add(patient_id)
+    if not hours:
+        return
+    days = defaultdict(set)
+    for start, patients in hours.items():
+        days[bucket_start(start, VitalRollup.DAY)].update(patients)
+
+    utc = dt_timezone.utc
+    with transaction.atomic():
+        hourly = []
+        for condition in _bucket_filters(hours, VitalRollup.HOUR, "timestamp"):
+            rows = (
+                Vital.objects.filter(condition)
+                .annotate(bucket=TruncHour("timestamp", tzinfo=utc))
+                .values("patient_id", "bucket")
+                .annotate(**_raw_aggregates())
+                .order_by()
+            )
+            hourly += [_rollup_from_vitals(row) for row in rows]
+        hourly = _with_archived_hours(hours, hourly)
+        _store(VitalRollup.HOUR, hours, hourly)
+
+        daily = []
+        for condition in _bucket_filters(days, VitalRollup.DAY, "bucket"):
+            rows = (
+                VitalRollup.objects.filter(condition, resolution=VitalRollup.HOUR)
+                .annotate(day=TruncDay("bucket", tzinfo=utc))
+                .values("patient_id", "day")
+                .annotate(**_rollup_aggregates())
+                .order_by()
+            )
+            daily += [_rollup_from_rollups({**row, "bucket": row["day"]}, VitalRollup.DAY) for row in rows]
+        _store(VitalRollup.DAY, days, daily)
+
+
+def _merge_rollup(rollup, other):
+    """Fold the counts, sums and bounds of hour rollup `other` into `rollup`."""
+    rollup["count"] += other["count"]
+    for metric in METRICS:
+        rollup[f"{metric}_count"] += other[f"{metric}_count"]
+        rollup[f"{metric}_sum"] += other[f"{metric}_sum"]
+        for part, pick in (("min", min), ("max", max)):
+            values = [value for value in (rollup[f"{metric}_{part}"], other[f"{metric}_{part}"]) if value is not None]
+            rollup[f"{metric}_{part}"] = pick(values) if values else None
+
+
+def _with_archived_hours(hours, hourly):
+    """`hourly` plus the archived readings of the hours in `hours` that precede the archive cutoff."""
+    cutoff = archive_cutoff(VITALS)
+    archived = {start: patients for start, patients in hours.items() if cutoff is not None and start < cutoff}
+    if not archived:
+        return hourly
+    from HealthBridge.utils.archive import archived_vital_buckets  # pyarrow loads only for archived hours
+
+    merged = {(rollup["patient_id"], bucket_start(rollup["bucket"], VitalRollup.HOUR)): rollup for rollup in hourly}
+    for row in archived_vital_buckets(archived, METRICS):
+        key = (row["patient_id"], bucket_start(row["bucket"], VitalRollup.HOUR))
+        row = {**row, "bucket": key[1], "resolution": VitalRollup.HOUR}
+        if key in merged:
+            _merge_rollup(merged[key], row)
+        else:
+            merged[key] = row
+    return list(merged.values())
+
+
+def rebuild_vital_rollups(batch_size=5000):
+    """
+    Recompute every VitalRollup with two GROUP BYs, plus the archived vitals.
+    Returns (hour buckets, day buckets).
+    """
+    from HealthBridge.utils.archive import archived_vital_hours  # pyarrow loads only for a rebuild
+
+    utc = dt_timezone.utc
+    hourly = (
+        Vital.objects.annotate(bucket=TruncHour("timestamp", tzinfo=utc))
+        .values("patient_id", "bucket")
+        .annotate(**_raw_aggregates())
+        .order_by()
+    )
+    with transaction.atomic():
+        VitalRollup.objects.all().delete()
+        batch = []
+        for row in hourly.iterator(chunk_size=batch_size):
+            batch.append(_rollup_from_vitals(row))
+            if len(batch) >= batch_size:
+                insert_rows(VitalRollup, batch)
+                batch = []
+        insert_rows(VitalRollup, batch)
+
+        # Archived vitals are merged in (a bucket can also hold readings that
+        # arrived late for an archived day); deleted patients' are skipped
+        expressions = _merge_expressions()
+        patients = set(Profile.objects.values_list("id", flat=True))
+        batch = []
+        for row in archived_vital_hours(METRICS):
+            if row["patient_id"] not in patients:
+                continue
+            batch.append({**row, "resolution": VitalRollup.HOUR})
+            if len(batch) >= batch_size:
+                insert_rows(VitalRollup, batch, unique_fields=UNIQUE_FIELDS, update_fields=expressions)
+                batch = []
+        insert_rows(VitalRollup, batch, unique_fields=UNIQUE_FIELDS, update_fields=expressions)
+        hours = VitalRollup.objects.filter(resolution=VitalRollup.HOUR).count()
+
+        daily = (
+            VitalRollup.objects.filter(resolution=VitalRollup.HOUR)
+            .annotate(day=TruncDay("bucket", tzinfo=utc))
+            .values("patient_id", "day")
+            .annotate(**_rollup_aggregates())
+            .order_by()
+        )
+        days = [_rollup_from_rollups({**row, "bucket": row["day"]}, VitalRollup.DAY) for row in daily]
+        for start in range(0, len(days), batch_size):
+            insert_rows(VitalRollup, days[start:start + batch_size])
+    return hours, len(days)
+
+
+def rollup_points(patient, resolution, date_from=None, date_to=None):
+    """
+    One point per bucket in [date_from, date_to): {"bucket", "count", and per
+    metric {"min", "max", "avg"} or None}, oldest first.
+    """
+    queryset = VitalRollup.objects.filter(patient=patient, resolution=resolution)
+    if date_from:
+        queryset = queryset.filter(bucket__gte=bucket_start(date_from, resolution))
+    if date_to:
+        queryset = queryset.filter(bucket__lt=date_to)
+    points = []
+    for rollup in queryset.order_by("bucket"):
+        point = {"bucket": rollup.bucket, "count": rollup.count}
+        for metric in METRICS:
+            count = getattr(rollup, f"{metric}_count")
+            point[metric] = {
+                "min": getattr(rollup, f"{metric}_min"),
+                "max": getattr(rollup, f"{metric}_max"),
+                "avg": round(getattr(rollup, f"{metric}_sum") / count, 2),
+            } if count else None
+        points.append(point)
+    return points
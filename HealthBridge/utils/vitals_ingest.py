@@ -0,0 +1,194 @@
+# HealthBridge/utils/vitals_ingest.py
+
+import re
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from HealthBridge.models import Profile, Vital
+from HealthBridge.utils.bulk import insert_rows
+from HealthBridge.utils.change_feed import active_consents
+from HealthBridge.utils.vital_rollups import add_vital_rollups
+
+# -------------------------------
+# Batched vitals ingestion
+# -------------------------------
+# Bedside devices upload readings as a JSON array or an NDJSON stream. Each
+# reading is checked in plain Python (no serializer per row); valid ones are
+# buffered and every VITALS_INGEST_BATCH_SIZE of them cost two queries at most
+# to resolve patients (migrants whose home hospital is the uploader's, or who
+# have an active consent to it; others are rejected per row), then one executemany insert (plus one upsert each into
+# the hour and day rollups) in its own transaction. A bad row is reported
+# by its position and never blocks the rest, and a large upload never holds
+# one long write lock.
+
+TEMPERATURE_RANGE = (25.0, 45.0)   # deg C
+HEART_RATE_RANGE = (20, 300)       # bpm
+SYSTOLIC_RANGE = (40, 300)         # mmHg
+DIASTOLIC_RANGE = (20, 200)
+BLOOD_PRESSURE_RE = re.compile(r"^\s*(\d{2,3})\s*/\s*(\d{2,3})\s*$")
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_reading(raw, latest):
+    """
+    Return (values, errors) for one incoming reading. `values` holds the
+    patient reference as ("id", pk) or ("uuid", UUID) and the cleaned fields;
+    readings timestamped after `latest` are rejected.
+    """
+    if isinstance(raw, ValueError):
+        return None, {"non_field_errors": [f"Invalid JSON: {raw}"]}
+    if not isinstance(raw, dict):
+        return None, {"non_field_errors": ["Expected an object"]}
+
+    errors = {}
+    values = {}
+
+    patient, patient_uuid = raw.get("patient"), raw.get("patient_uuid")
+    if isinstance(patient, int) and not isinstance(patient, bool) and patient > 0:
+        values["patient"] = ("id", patient)
+    elif patient is None and isinstance(patient_uuid, str):
+        try:
+            values["patient"] = ("uuid", uuid.UUID(patient_uuid))
+        except ValueError:
+            errors["patient_uuid"] = ["Must be a valid UUID"]
+    else:
+        errors["patient"] = ["Provide a patient id or patient_uuid"]
+
+    stamp = raw.get("timestamp")
+    if stamp is None:
+        values["timestamp"] = None
+    else:
+        try:
+            parsed = parse_datetime(stamp) if isinstance(stamp, str) else None
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            errors["timestamp"] = ["Must be an ISO 8601 datetime"]
+        else:
+            if timezone.is_naive(parsed):
+                parsed = timezone.make_aware(parsed)
+            if parsed > latest:
+                errors["timestamp"] = ["Reading is in the future"]
+            values["timestamp"] = parsed
+
+    temperature = raw.get("temperature")
+    if temperature is not None:
+        if not _is_number(temperature) or not TEMPERATURE_RANGE[0] <= temperature <= TEMPERATURE_RANGE[1]:
+            errors["temperature"] = ["Must be a number between %s and %s" % TEMPERATURE_RANGE]
+        values["temperature"] = temperature
+
+    heart_rate = raw.get("heart_rate")
+    if heart_rate is not None:
+        if not isinstance(heart_rate, int) or isinstance(heart_rate, bool) \
+                or not HEART_RATE_RANGE[0] <= heart_rate <= HEART_RATE_RANGE[1]:
+            errors["heart_rate"] = ["Must be an integer between %s and %s" % HEART_RATE_RANGE]
+        values["heart_rate"] = heart_rate
+
+    blood_pressure = raw.get("blood_pressure")
+    if blood_pressure is not None:
+        match = BLOOD_PRESSURE_RE.match(blood_pressure) if isinstance(blood_pressure, str) else None
+        systolic, diastolic = (int(match.group(1)), int(match.group(2))) if match else (0, 0)
+        if not (SYSTOLIC_RANGE[0] <= systolic <= SYSTOLIC_RANGE[1]
+                and DIASTOLIC_RANGE[0] <= diastolic <= DIASTOLIC_RANGE[1] and systolic > diastolic):
+            errors["blood_pressure"] = ['Must look like "120/80"']
+        values["blood_pressure"] = f"{systolic}/{diastolic}"
+        values["systolic"], values["diastolic"] = systolic, diastolic
+
+    if temperature is None and heart_rate is None and blood_pressure is None:
+        errors.setdefault("non_field_errors", []).append("No measurement in reading")
+
+    return (None, errors) if errors else (values, None)
+
+
+def _write_batch(batch, hospital_id, now, reject):
+    """Resolve the batch's patients, then insert its vitals and add them to their rollups in one transaction."""
+    ids = {ref for _, values in batch for kind, ref in [values["patient"]] if kind == "id"}
+    uuids = {ref for _, values in batch for kind, ref in [values["patient"]] if kind == "uuid"}
+    # Staff profiles are never vitals subjects; migrants need a home or consent link to the uploader
+    patients = Profile.objects.exclude(role__in=("doctor", "authority")).annotate(
+        treatable=Q(home_hospital_id=hospital_id)
+        | Exists(active_consents(hospital_id, now).filter(patient_id=OuterRef("pk")))
+    )
+    by_id = {
+        patient_id: (patient_id, treatable)
+        for patient_id, treatable in patients.filter(id__in=ids).values_list("id", "treatable")
+    } if ids else {}
+    by_uuid = {
+        ref: (patient_id, treatable)
+        for ref, patient_id, treatable in patients.filter(qr_code_uuid__in=uuids).values_list(
+            "qr_code_uuid", "id", "treatable")
+    } if uuids else {}
+
+    vitals = []
+    for index, values in batch:
+        kind, ref = values["patient"]
+        patient_id, treatable = (by_id if kind == "id" else by_uuid).get(ref, (None, False))
+        if patient_id is None:
+            reject(index, {"patient": ["Unknown patient"]})
+            continue
+        if not treatable:
+            reject(index, {"patient": ["Patient is not registered at or consented to this hospital"]})
+            continue
+        vitals.append({
+            "patient_id": patient_id,
+            "hospital_id": hospital_id,
+            "timestamp": values["timestamp"] or now,
+            "temperature": values.get("temperature"),
+            "blood_pressure": values.get("blood_pressure"),
+            "heart_rate": values.get("heart_rate"),
+            "systolic": values.get("systolic"),
+            "diastolic": values.get("diastolic"),
+        })
+    with transaction.atomic():
+        insert_rows(Vital, vitals)
+        add_vital_rollups(vitals)
+    return len(vitals)
+
+
+def ingest_vitals(readings, hospital_id, batch_size=None):
+    """
+    Validate and store an iterable of readings recorded at `hospital_id`.
+    Returns {"accepted", "rejected", "errors", "truncated"}; errors are
+    {"index", "errors"} for the first VITALS_INGEST_MAX_ERRORS rejects, and
+    truncated means readings past VITALS_INGEST_MAX_READINGS were not read.
+    """
+    batch_size = batch_size or getattr(settings, "VITALS_INGEST_BATCH_SIZE", 1000)
+    limit = getattr(settings, "VITALS_INGEST_MAX_READINGS", 100000)
+    max_errors = getattr(settings, "VITALS_INGEST_MAX_ERRORS", 100)
+    now = timezone.now()
+    latest = now + timedelta(seconds=getattr(settings, "VITALS_INGEST_MAX_SKEW_SECONDS", 300))
+
+    result = {"accepted": 0, "rejected": 0, "errors": [], "truncated": False}
+
+    def reject(index, errors):
+        result["rejected"] += 1
+        if len(result["errors"]) < max_errors:
+            result["errors"].append({"index": index, "errors": errors})
+
+    batch = []
+    for index, raw in enumerate(readings):
+        if index >= limit:
+            result["truncated"] = True
+            break
+        values, errors = validate_reading(raw, latest)
+        if errors:
+            reject(index, errors)
+            continue
+        batch.append((index, values))
+        if len(batch) >= batch_size:
+            result["accepted"] += _write_batch(batch, hospital_id, now, reject)
+            batch = []
+    if batch:
+        result["accepted"] += _write_batch(batch, hospital_id, now, reject)
+    # Unknown patients are only found when their batch is written
+    result["errors"].sort(key=lambda error: error["index"])
+    return result
@@ -1,25 +1,25 @@
 from django.shortcuts import render, get_object_or_404
 from django.http import HttpResponse
-from django.db.models import Count
 
 from rest_framework import viewsets, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
 
-from HealthBridge.models import Profile, MedicalRecord, Scheme, Recommendation, Vital
+from HealthBridge.models import Profile, MedicalRecord, Scheme, Recommendation, Vital, VitalRollup, RecordTerm, OutbreakAlert
 from HealthBridge.serializers import (
     ProfileSerializer,
     MedicalRecordSerializer,
     SchemeSerializer,
     RecommendationSerializer,
     VitalSerializer,
+    OutbreakAlertSerializer,
 )
-from HealthBridge.utils.recommendation_engine import RecommendationEngine
-from HealthBridge.permissions import IsDoctor, IsAuthority, IsMigrant, SameHospital
+from HealthBridge.permissions import IsDoctor, IsAuthority, IsMigrant, IsFederationPeer, IsHospitalStaff, SameHospital
 
 # HealthBridge/views.py
 from rest_framework.views import APIView
@@ -28,7 +28,29 @@ from rest_framework import status, permissions
 from django.shortcuts import get_object_or_404
 from .models import Profile
 from .serializers import PatientProfileSerializer
-from uuid import UUID
+from .utils.lookup import lookup_patient_card, patient_card_cache
+from .utils.qr import QR_CONTENT_TYPES, qr_digest, qr_payload, read_qr
+from django.urls import reverse
+from django.conf import settings
+from .utils.keys import key_pool_size
+from .utils.terms import normalize_term
+from .utils.outbreak import disease_counts
+from .utils.dashboard import get_dashboard_snapshot
+import time
+from .utils.schemes import get_scheme_index
+from .utils.symptom_matcher import get_symptom_matcher
+from .utils.principal import get_principal, principal_cache
+from .utils.change_feed import FEEDS, CursorError, read_feed
+from .utils.fieldsets import project_queryset, requested_fields
+from .utils.vitals_ingest import ingest_vitals
+from .utils.vital_rollups import parse_range_bound, rollup_points
+from .utils.archive import archived_medical_records, archived_vitals
+from .parsers import NDJSONParser
+from .authentication import token_cache
+from .utils.tokens import TokenError, end_sessions, issue_token_pair, refresh_token_pair
+from .utils.signed_qr import SignedQRError, is_signed_qr, sign_profile_qr, verify_signed_qr, verify_signed_qrs
+from django.db import DatabaseError
+from django.utils.dateparse import parse_date
 
 # HealthBridge/views.py (add a simple view)
 from django.contrib.auth.decorators import login_required
@@ -46,29 +68,59 @@ class QRLookupView(APIView):
         if not value:
             return Response({"detail": "No value provided"}, status=status.HTTP_400_BAD_REQUEST)
 
-        profile = None
+        signed = None
+        if is_signed_qr(value):
+            try:
+                signed = verify_signed_qr(value)
+            except SignedQRError as exc:
+                return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            value = signed["pid"]
+
+        # awaz_id / migrant_id / qr_code_uuid resolved in one query, cached per identifier
+        try:
+            data = lookup_patient_card(value)
+        except DatabaseError:
+            if signed is None:
+                raise
+            # The signed fields are trustworthy on their own; serve them for triage
+            return Response({"signed": signed, "offline": True}, status=status.HTTP_200_OK)
+        if data is None:
+            if signed is not None:
+                return Response({"signed": signed, "offline": True}, status=status.HTTP_200_OK)
+            return Response({"detail": "No matching profile found"}, status=status.HTTP_404_NOT_FOUND)
 
-        # Try awaz_id
-        if not profile:
-            profile = Profile.objects.filter(awaz_id=value).first()
+        if signed is not None:
+            data = {**data, "signed": signed}
+        return Response(data, status=status.HTTP_200_OK)
 
-        # Try migrant_id
-        if not profile:
-            profile = Profile.objects.filter(migrant_id=value).first()
 
-        # Try UUID
-        if not profile:
-            try:
-                UUID(value)  # validate format
-                profile = Profile.objects.filter(qr_code_uuid=value).first()
-            except ValueError:
-                pass
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def verify_qr_codes(request):
+    """
+    Verify signed ("HC1:") QR codes against the issuing hospitals' public keys,
+    without reading patient data. Send {"code": "..."} or {"codes": [...]}.
+    """
+    if "codes" in request.data:
+        codes = request.data.get("codes")
+        limit = getattr(settings, "SIGNED_QR_BATCH_LIMIT", 500)
+        if not isinstance(codes, list) or not all(isinstance(code, str) for code in codes):
+            return Response({"detail": "codes must be a list of strings"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(codes) > limit:
+            return Response({"detail": f"At most {limit} codes per request"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"results": verify_signed_qrs(codes)})
+
+    code = request.data.get("code")
+    if not isinstance(code, str) or not code:
+        return Response({"detail": "No code provided"}, status=status.HTTP_400_BAD_REQUEST)
+    result = verify_signed_qrs([code])[0]
+    return Response(result, status=status.HTTP_200_OK if result["valid"] else status.HTTP_400_BAD_REQUEST)
 
-        if not profile:
-            return Response({"detail": "No matching profile found"}, status=status.HTTP_404_NOT_FOUND)
 
-        data = PatientProfileSerializer(profile).data
-        return Response(data, status=status.HTTP_200_OK)
+@api_view(["GET"])
+@permission_classes([IsAuthority])
+def qr_lookup_cache_stats(request):
+    return Response(patient_card_cache.stats())
 # -------------------------------
 # Authentication
 # -------------------------------
@@ -88,12 +140,54 @@ class CustomLoginView(APIView):
                 role = groups[0].lower() if groups else "patient"
             
             token, _ = Token.objects.get_or_create(user=user)
-            return Response({
+            data = {
                 "token": token.key,
                 "username": user.username,
                 "role": role
-            })
+            }
+            # Optional stateless access/refresh pair signed with the hospital key
+            if request.data.get("token_type") == "jwt":
+                try:
+                    data.update(issue_token_pair(user))
+                except TokenError as exc:
+                    return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(data)
         return Response({"error": "Invalid credentials"}, status=401)
+
+
+class TokenRefreshView(APIView):
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def post(self, request):
+        refresh = request.data.get("refresh")
+        if not refresh:
+            return Response({"error": "refresh is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            return Response(refresh_token_pair(refresh))
+        except TokenError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_401_UNAUTHORIZED)
+
+class LogoutView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        # Deleting the token also evicts it from the authentication cache (signals.py)
+        Token.objects.filter(user=request.user).delete()
+        # Signed refresh tokens stop working too; access tokens run out within JWT_ACCESS_TTL
+        end_sessions(request.user.pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def auth_cache_stats(request):
+    return Response({
+        "tokens": token_cache.stats(),
+        "principals": principal_cache.stats(),
+    })
+
+
 def home(request):
     return HttpResponse("Welcome to Migrant Care Nexus!")
 
@@ -104,25 +198,57 @@ def my_profile(request):
         profile = Profile.objects.get(user=request.user)
         serializer = PatientProfileSerializer(profile)
         data = serializer.data
-        # Add QR image URL
-        if profile.qr_code_image:
-            data['qr_code_url'] = request.build_absolute_uri(profile.qr_code_image.url)
+        # Versioned, content-addressed QR URL (cacheable until the payload changes)
+        data['qr_code_url'] = request.build_absolute_uri(patient_qr_url(profile))
+        try:
+            data['signed_qr_code_url'] = request.build_absolute_uri(patient_qr_url(profile, signed=True))
+        except SignedQRError:
+            data['signed_qr_code_url'] = None
         return Response(data)
     except Profile.DoesNotExist:
         return Response({"error": "Profile not found"}, status=404)
 # -------------------------------
 # CRUD APIs
 # -------------------------------
-class ProfileViewSet(viewsets.ModelViewSet):
+class QueryPlanMixin:
+    """
+    Applies the serializer's declared joins (EagerLoadingMixin) to the
+    queryset. With ?fields=a,b only those serializer fields are rendered and
+    only the columns and relations they read are queried instead.
+    `sparse_always` lists model fields the view needs regardless (e.g. for
+    object permissions).
+    """
+    sparse_always = ()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if requested_fields(self.request) is None:
+            return self.get_serializer_class().setup_eager_loading(queryset)
+        return project_queryset(queryset, self.get_serializer().fields, self.sparse_always)
+
+
+class ProfileViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     queryset = Profile.objects.all()
     serializer_class = ProfileSerializer
     permission_classes = [IsAuthenticated]
 
 
-class MedicalRecordViewSet(viewsets.ModelViewSet):
+class MedicalRecordViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     queryset = MedicalRecord.objects.all()
     serializer_class = MedicalRecordSerializer
     permission_classes = [IsDoctor & SameHospital]
+    sparse_always = ("patient", "hospital")
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # ?disease=diabetes / ?symptom=fever filter through the RecordTerm index
+        for kind in (RecordTerm.DISEASE, RecordTerm.SYMPTOM):
+            value = self.request.query_params.get(kind)
+            if value:
+                queryset = queryset.filter(
+                    id__in=RecordTerm.objects.filter(kind=kind, term=normalize_term(value)).values('record_id')
+                )
+        return queryset
 
     def perform_create(self, serializer):
         record = serializer.save(updated_by=self.request.user)
@@ -133,18 +259,28 @@ class MedicalRecordViewSet(viewsets.ModelViewSet):
         Recommendation.generate_ai_recommendations(record)
 
 
-class SchemeViewSet(viewsets.ModelViewSet):
+class SchemeViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     queryset = Scheme.objects.all()
     serializer_class = SchemeSerializer
     permission_classes = [IsAuthenticated]
 
 
-class RecommendationViewSet(viewsets.ModelViewSet):
+class RecommendationViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     queryset = Recommendation.objects.all()
     serializer_class = RecommendationSerializer
     permission_classes = [IsAuthenticated]
 
 
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def key_pool_status(request):
+    return Response({
+        "available": key_pool_size(),
+        "target": settings.KEY_POOL_TARGET,
+        "low_water": settings.KEY_POOL_LOW_WATER,
+    })
+
+
 # -------------------------------
 # Dashboards
 # -------------------------------
@@ -170,28 +306,20 @@ def authority_dashboard_data(request):
 @api_view(["GET"])
 @permission_classes([IsAuthority])
 def authority_dashboard_metrics(request):
-    total_migrants = Profile.objects.count()
-    eligible_count = MedicalRecord.objects.filter(eligible_schemes__isnull=False).count()
-    ai_alerts = Recommendation.objects.count()
-    region_data = (
-        Profile.objects.values('location').annotate(count=Count('id')).order_by('-count')
-    )
-    disease_data = (
-        MedicalRecord.objects.values('recurring_diseases').annotate(count=Count('id')).order_by('-count')
-    )
+    snapshot = get_dashboard_snapshot()
     return Response({
-        "total_migrants": total_migrants,
-        "eligible_count": eligible_count,
-        "ai_alerts": ai_alerts,
-        "region_data": list(region_data),
-        "disease_data": list(disease_data)
+        **snapshot["payload"],
+        "snapshot_version": snapshot["version"],
+        "snapshot_age": round(time.time() - snapshot["computed_at"], 1),
     })
 
 
 @api_view(["GET"])
 @permission_classes([IsAuthority])
 def hospital_dashboard(request, hospital_name):
-    records = MedicalRecord.objects.filter(doctor__hospital_name=hospital_name)
+    records = MedicalRecordSerializer.setup_eager_loading(
+        MedicalRecord.objects.filter(doctor__hospital__name=hospital_name)
+    )
     serializer = MedicalRecordSerializer(records, many=True)
     return Response(serializer.data)
 
@@ -207,12 +335,8 @@ def get_eligible_schemes(request, user_id):
     except Profile.DoesNotExist:
         return Response({"error": "User not found"}, status=404)
 
-    eligible_schemes = Scheme.objects.filter(
-        min_age__lte=user.age,
-        max_age__gte=user.age
-    )
-    serializer = SchemeSerializer(eligible_schemes, many=True)
-    return Response(serializer.data)
+    index = get_scheme_index()
+    return Response(index.serialized(sorted(index.for_age(user.age))))
 
 
 @api_view(["POST"])
@@ -223,13 +347,13 @@ def generate_recommendations(request, user_id):
     except Profile.DoesNotExist:
         return Response({"error": "User not found"}, status=404)
 
-    schemes = Scheme.objects.filter(min_age__lte=user.age, max_age__gte=user.age)
+    index = get_scheme_index()
     recommendations = []
-    for scheme in schemes:
+    for scheme in index.serialized(sorted(index.for_age(user.age))):
         rec = Recommendation.objects.create(
             patient=user,
-            title=f"Eligible for {scheme.name}",
-            description=scheme.description
+            title=f"Eligible for {scheme['name']}",
+            description=scheme["description"]
         )
         recommendations.append(rec)
 
@@ -244,7 +368,7 @@ def generate_recommendations(request, user_id):
 @permission_classes([IsDoctor])
 def get_patient_by_qr(request, qr_uuid):
     try:
-        record = MedicalRecord.objects.get(qr_code_uuid=qr_uuid)
+        record = MedicalRecordSerializer.setup_eager_loading(MedicalRecord.objects.all()).get(qr_code_uuid=qr_uuid)
     except MedicalRecord.DoesNotExist:
         return Response({"error": "Record not found"}, status=404)
     serializer = MedicalRecordSerializer(record)
@@ -255,32 +379,169 @@ def get_patient_by_qr(request, qr_uuid):
 @permission_classes([IsDoctor])
 def get_full_patient_info_by_qr(request, qr_uuid):
     try:
-        profile = Profile.objects.get(qr_code_uuid=qr_uuid)
+        profile = ProfileSerializer.setup_eager_loading(Profile.objects.all()).get(qr_code_uuid=qr_uuid)
     except Profile.DoesNotExist:
         return Response({"error": "Patient not found"}, status=404)
 
+    # ?from= / ?to= bound treated_at; records past the hot window come from the archive
+    try:
+        date_from = parse_range_bound(request.query_params.get("from"))
+        date_to = parse_range_bound(request.query_params.get("to"), end=True)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
     medical_records = profile.medical_records.all()
-    recommendations = profile.recommendations.all()
+    if date_from:
+        medical_records = medical_records.filter(treated_at__gte=date_from)
+    if date_to:
+        medical_records = medical_records.filter(treated_at__lt=date_to)
+    medical_records = list(MedicalRecordSerializer.setup_eager_loading(medical_records))
+    hot = {record.id for record in medical_records}
+    archived = [record for record in archived_medical_records(profile, date_from, date_to) if record.id not in hot]
+
+    recommendations = RecommendationSerializer.setup_eager_loading(profile.recommendations.all())
     data = {
         "profile": ProfileSerializer(profile).data,
-        "medical_records": MedicalRecordSerializer(medical_records, many=True).data,
+        "medical_records": MedicalRecordSerializer(archived + medical_records, many=True).data,
         "recommendations": RecommendationSerializer(recommendations, many=True).data
     }
     return Response(data)
 
 
+def patient_qr_url(profile, fmt="png", signed=False):
+    if signed:
+        digest = qr_digest(sign_profile_qr(profile))
+        return f"{reverse('patient-qr', args=[profile.qr_code_uuid, fmt])}?signed=1&v={digest[:16]}"
+    digest = qr_digest(qr_payload(profile))
+    return f"{reverse('patient-qr', args=[profile.qr_code_uuid, fmt])}?v={digest[:16]}"
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def patient_qr_image(request, qr_uuid, fmt):
+    """
+    Serve a patient's QR as PNG or SVG from the content-addressed store.
+    The ETag is the payload hash, so revalidation never touches storage; when
+    the URL carries the current ?v= version the response is cacheable for a year.
+    ?signed=1 serves the signed (HC1:) variant instead of the bare identifier.
+    """
+    if request.query_params.get("signed") == "1":
+        profile = get_object_or_404(Profile.objects.select_related("home_hospital"), qr_code_uuid=qr_uuid)
+        try:
+            payload = sign_profile_qr(profile)
+        except SignedQRError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_409_CONFLICT)
+    else:
+        profile = get_object_or_404(Profile.objects.only("awaz_id", "migrant_id", "qr_code_uuid"), qr_code_uuid=qr_uuid)
+        payload = qr_payload(profile)
+    digest = qr_digest(payload)
+    etag = f'"{digest}.{fmt}"'
+
+    if request.query_params.get("v") == digest[:16]:
+        cache_control = "private, max-age=31536000, immutable"
+    else:
+        cache_control = "private, no-cache"
+
+    if etag in [t.strip() for t in request.headers.get("If-None-Match", "").split(",")]:
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(read_qr(payload, fmt), content_type=QR_CONTENT_TYPES[fmt])
+    response["ETag"] = etag
+    response["Cache-Control"] = cache_control
+    return response
+
+
 # -------------------------------
 # Authority API
 # -------------------------------
 @api_view(["GET"])
 @permission_classes([IsAuthority])
 def outbreak_summary(request):
-    data = (
-        MedicalRecord.objects.values('recurring_diseases').annotate(count=Count('id')).order_by('-count')
+    """
+    Disease counts from the region x disease x day rollup.
+    Optional filters: ?from=YYYY-MM-DD&to=YYYY-MM-DD&region=...; ?by=region|day adds a breakdown.
+    """
+    filters = {}
+    for param in ("from", "to"):
+        value = request.query_params.get(param)
+        if value:
+            try:
+                filters[param] = parse_date(value)
+            except ValueError:  # well formed but impossible, e.g. 2024-02-30
+                filters[param] = None
+            if filters[param] is None:
+                return Response({"error": f"Invalid '{param}' date, expected YYYY-MM-DD"}, status=400)
+
+    data = disease_counts(
+        date_from=filters.get("from"),
+        date_to=filters.get("to"),
+        region=request.query_params.get("region"),
+        by=request.query_params.get("by"),
     )
     return Response(list(data))
 
 
+@api_view(["GET"])
+@permission_classes([IsAuthority])
+def outbreak_alerts(request):
+    """
+    Anomalies stored by `manage.py detect_outbreaks`, newest and strongest first.
+    Optional filters: ?from=YYYY-MM-DD&region=...&disease=...&method=zscore|ewma|seasonal
+    """
+    alerts = OutbreakAlert.objects.all()
+    date_from = request.query_params.get("from")
+    if date_from:
+        try:
+            date_from = parse_date(date_from)
+        except ValueError:  # well formed but impossible, e.g. 2024-02-30
+            date_from = None
+        if date_from is None:
+            return Response({"error": "Invalid 'from' date, expected YYYY-MM-DD"}, status=400)
+        alerts = alerts.filter(day__gte=date_from)
+    for field in ("region", "disease", "method"):
+        value = request.query_params.get(field)
+        if value:
+            alerts = alerts.filter(**{field: value})
+    alerts = alerts.order_by("-day", "-score")[:200]
+    return Response(OutbreakAlertSerializer(alerts, many=True).data)
+
+
+# -------------------------------
+# Federation change feed
+# -------------------------------
+@api_view(["GET"])
+@permission_classes([IsFederationPeer])
+def change_feed(request, feed):
+    """
+    Rows changed since ?cursor=..., oldest first, limited to patients with an
+    active consent to the caller's hospital. Pages are bounded by ?limit=,
+    and ?patient= restricts a feed to one patient (backfill after a grant).
+    """
+    if feed not in FEEDS:
+        return Response({"error": f"Unknown feed, expected one of {sorted(FEEDS)}"}, status=404)
+    limit = request.query_params.get("limit")
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=400)
+        if limit < 1:
+            return Response({"error": "limit must be at least 1"}, status=400)
+    patient_id = request.query_params.get("patient")
+    if patient_id is not None:
+        if feed == "events":
+            return Response({"error": "The events feed cannot be filtered by patient"}, status=400)
+        try:
+            patient_id = int(patient_id)
+        except ValueError:
+            return Response({"error": "patient must be an integer"}, status=400)
+    try:
+        page = read_feed(feed, get_principal(request).hospital_id, request.query_params.get("cursor"), limit,
+                         patient_id)
+    except CursorError as exc:
+        return Response({"error": str(exc)}, status=400)
+    return Response(page)
+
+
 # -------------------------------
 # Migrant Dashboard
 # -------------------------------
@@ -288,16 +549,18 @@ def outbreak_summary(request):
 @permission_classes([IsMigrant])
 def user_dashboard(request, user_id):
     try:
-        profile = Profile.objects.get(id=user_id)
+        profile = ProfileSerializer.setup_eager_loading(Profile.objects.all()).get(id=user_id)
     except Profile.DoesNotExist:
         return Response({"error": "User not found"}, status=404)
 
-    medical_records = MedicalRecord.objects.filter(patient=profile)
+    medical_records = MedicalRecordSerializer.setup_eager_loading(MedicalRecord.objects.filter(patient=profile))
     latest_record = medical_records.first()
     schemes = latest_record.eligible_schemes.all() if latest_record else []
 
-    engine = RecommendationEngine(profile, medical_records)
-    generated_recommendations = engine.generate()
+    # Precomputed in bulk by `manage.py compute_cohort_recommendations`
+    generated_recommendations = list(
+        profile.cohort_recommendations.order_by("rule_key").values_list("message", flat=True)
+    )
 
     return Response({
         "profile": ProfileSerializer(profile).data,
@@ -312,24 +575,12 @@ def ai_symptom_recommendations(request):
     if not symptoms:
         return Response({"error": "No symptoms provided"}, status=400)
     
-    recommendations = []
-    symptoms_lower = symptoms.lower()
-    
-    if "fever" in symptoms_lower:
-        recommendations.append({"title": " Fever Alert", "description": "Take rest, drink plenty of fluids, and consult a doctor if temperature exceeds 103°F or persists beyond 3 days."})
-    if "cough" in symptoms_lower:
-        recommendations.append({"title": " Respiratory Care", "description": "Persistent cough may indicate respiratory issues. Steam inhalation helps. See a doctor if coughing blood."})
-    if "cold" in symptoms_lower:
-        recommendations.append({"title": " Cold Relief", "description": "Rest, stay warm, drink warm fluids. Vitamin C helps. Usually resolves in 7-10 days."})
-    if "fatigue" in symptoms_lower or "tired" in symptoms_lower:
-        recommendations.append({"title": " Energy & Nutrition", "description": "Fatigue can be linked to poor nutrition or stress. Eat iron-rich foods and get 8 hours of sleep."})
-    if "headache" in symptoms_lower:
-        recommendations.append({"title": " Headache Care", "description": "Stay hydrated, rest in a dark room. If severe or sudden, seek immediate medical attention."})
-    if "stomach" in symptoms_lower or "vomit" in symptoms_lower or "nausea" in symptoms_lower:
-        recommendations.append({"title": " Digestive Care", "description": "Stick to light foods, stay hydrated with ORS if vomiting. See doctor if pain is severe."})
-    if "chest" in symptoms_lower:
-        recommendations.append({"title": " Chest Pain - URGENT", "description": "Chest pain can be serious. Please visit a doctor or emergency room immediately."})
-    
+    # All SymptomRule keywords (every language) compiled into one matcher; one pass over the text
+    recommendations = [
+        {"title": rule["title"], "description": rule["description"], "urgency": rule["urgency"]}
+        for rule in get_symptom_matcher().match(symptoms)
+    ]
+
     if not recommendations:
         recommendations.append({"title": "General Advice", "description": "Please consult a doctor for proper diagnosis. Stay hydrated and get adequate rest."})
     
@@ -340,8 +591,68 @@ def ai_symptom_recommendations(request):
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def get_patient_vitals(request, uuid):
-    patient = get_object_or_404(Profile, qr_code_uuid=uuid)
-    vitals = Vital.objects.filter(patient=patient).order_by("timestamp")
-    serializer = VitalSerializer(vitals, many=True)
-    return Response(serializer.data)
+    """
+    A patient's vitals, oldest first, within ?from= / ?to= (ISO datetimes, or
+    dates for whole days). ?resolution=hour or day returns min/max/avg per
+    bucket from the rollups instead of readings. Raw responses hold at most
+    VITALS_RAW_MAX_POINTS readings, the latest in range, read through to the
+    archive past the hot window; X-Vitals-Truncated says when older ones were
+    left out.
+    """
+    patient = get_object_or_404(Profile.objects.only("id"), qr_code_uuid=uuid)
+    resolution = request.query_params.get("resolution", "raw")
+    if resolution not in ("raw", VitalRollup.HOUR, VitalRollup.DAY):
+        return Response({"error": "resolution must be raw, hour or day"}, status=400)
+    try:
+        date_from = parse_range_bound(request.query_params.get("from"))
+        date_to = parse_range_bound(request.query_params.get("to"), end=True)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    if resolution != "raw":
+        return Response(rollup_points(patient, resolution, date_from, date_to))
+
+    vitals = Vital.objects.filter(patient=patient)
+    if date_from:
+        vitals = vitals.filter(timestamp__gte=date_from)
+    if date_to:
+        vitals = vitals.filter(timestamp__lt=date_to)
+    limit = getattr(settings, "VITALS_RAW_MAX_POINTS", 5000)
+    latest = list(vitals.order_by("-timestamp", "-id")[:limit + 1])
+    if len(latest) <= limit:
+        # Older readings may have been moved to the Parquet archive
+        hot = {vital.id for vital in latest}
+        latest += [vital for vital in archived_vitals(patient.pk, date_from, date_to, limit + 1) if vital.id not in hot]
+        latest = sorted(latest, key=lambda vital: (vital.timestamp, vital.id), reverse=True)[:limit + 1]
+    response = Response(VitalSerializer(latest[:limit][::-1], many=True).data)
+    if len(latest) > limit:
+        response["X-Vitals-Truncated"] = "true"
+    return response
+
+
+@api_view(["POST"])
+@permission_classes([IsHospitalStaff])
+@parser_classes([JSONParser, NDJSONParser])
+def vitals_ingest(request):
+    """
+    Store device readings recorded at the caller's hospital. Send a JSON array
+    (or {"readings": [...]}) or an application/x-ndjson stream of objects with
+    patient or patient_uuid, timestamp, temperature, blood_pressure, heart_rate.
+    Valid readings are stored even when others are rejected: 201 if all were
+    accepted, 207 if some were, 400 if none were.
+    """
+    readings = request.data
+    if isinstance(readings, dict):
+        readings = readings.get("readings")
+    if isinstance(readings, (dict, str, bytes)) or not hasattr(readings, "__iter__"):
+        return Response({"error": "Expected a JSON array or NDJSON stream of readings"}, status=400)
+
+    result = ingest_vitals(readings, get_principal(request).hospital_id)
+    if result["accepted"] == 0:
+        code = status.HTTP_400_BAD_REQUEST
+    elif result["rejected"] or result["truncated"]:
+        code = status.HTTP_207_MULTI_STATUS
+    else:
+        code = status.HTTP_201_CREATED
+    return Response(result, status=code)
 